@@ -4,26 +4,51 @@ SkinIntell - Flask Web Application
 AI-powered skincare and haircare recommendation platform
 """
 
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from startup import timed, configure_template_cache, get_startup_timings, boot
+
+with timed('import_flask'):
+    from flask import (
+        Flask, render_template, request, redirect, url_for, session, flash, jsonify,
+        Response, stream_with_context
+    )
+import json
 from functools import wraps
 import os
-from datetime import datetime
 
 # Import database module
-from database import (
-    init_db, create_user, verify_user, get_user_by_id, update_user_profile,
-    search_products, get_product_by_id, get_reviews_for_product, get_product_count,
-    get_all_categories, save_chatbot_query, get_user_chatbot_history,
-    save_search_history, get_user_search_history, get_recommended_products,
-    generate_skincare_routine, generate_haircare_routine,
-    get_vegan_cf_products, get_vegan_cf_stats
-)
+with timed('import_database'):
+    from database import (
+        create_user, verify_user, get_user_by_id, update_user_profile,
+        search_products, get_product_by_id, get_reviews_for_product, get_product_count,
+        get_all_categories, save_chatbot_query, get_user_chatbot_history,
+        save_search_history, get_user_search_history, recommend_products,
+        generate_skincare_routine, generate_haircare_routine,
+        get_vegan_cf_products, get_vegan_cf_stats, run_query_batch, get_catalog_version,
+        iter_products, get_similar_products, get_user_profile,
+        get_user_stats, get_search_facets, expand_search_term, SORT_MODES
+    )
+import assets
+import http_caching
+import query_cache
+import rate_limit
+import sessions
+from http_caching import make_etag, not_modified, with_etag, PRODUCT_CACHE_CONTROL, SEARCH_CACHE_CONTROL
+from rate_limit import rate_limited
+
+with timed('create_app'):
+    app = Flask(__name__)
+    app.secret_key = os.environ.get('SECRET_KEY', 'skinintel-secret-key-2024')
 
-app = Flask(__name__)
-app.secret_key = os.environ.get('SECRET_KEY', 'skinintel-secret-key-2024')
+    # Load compiled templates from the bytecode cache instead of re-parsing them per worker
+    configure_template_cache(app)
+    http_caching.init_app(app)
+    assets.init_app(app)
+    sessions.init_app(app)
+    rate_limit.init_app(app)
 
-# Initialize database on startup
-init_db()
+# Schema checks are no longer run at import time: startup.boot() runs them once,
+# in the gunicorn master (see gunicorn.conf.py), in asgi.py's lifespan startup or
+# in __main__ below. Other servers that import app need `python startup.py` first.
 
 # ============== DECORATORS ==============
 
@@ -62,6 +87,7 @@ def login():
         
         user = verify_user(email, password)
         if user:
+            session.clear()  # new session id, so one planted before login never becomes authenticated
             session['user_id'] = user['id']
             session['username'] = user['username']
             flash(f'Welcome back, {user["username"]}!', 'success')
@@ -102,6 +128,7 @@ def register():
         
         try:
             user_id = create_user(username, email, password, skin_type, hair_type, issues, goal)
+            session.clear()  # new session id, as on login
             session['user_id'] = user_id
             session['username'] = username
             flash('Registration successful! Welcome to SkinIntell.', 'success')
@@ -127,12 +154,15 @@ def logout():
 @login_required
 def dashboard():
     """User dashboard"""
-    user = get_user_by_id(session['user_id'])
-    chatbot_history = get_user_chatbot_history(session['user_id'], limit=5)
-    search_history = get_user_search_history(session['user_id'], limit=5)
-    product_count = get_product_count()
-    vegan_cf_products = get_vegan_cf_products(limit=6)
-    vegan_cf_stats = get_vegan_cf_stats()
+    user_id = session['user_id']
+    user, chatbot_history, search_history, product_count, vegan_cf_products, vegan_cf_stats = run_query_batch(
+        (get_user_by_id, (user_id,)),
+        (get_user_chatbot_history, (user_id,), {'limit': 5}),
+        (get_user_search_history, (user_id,), {'limit': 5}),
+        get_product_count,
+        (get_vegan_cf_products, (), {'limit': 6}),
+        get_vegan_cf_stats
+    )
     
     return render_template('dashboard.html', 
                          user=user, 
@@ -164,8 +194,10 @@ def profile():
 @login_required
 def chatbot():
     """AI Assistant / Chatbot page"""
-    user = get_user_by_id(session['user_id'])
-    history = get_user_chatbot_history(session['user_id'], limit=20)
+    user, history = run_query_batch(
+        (get_user_by_id, (session['user_id'],)),
+        (get_user_chatbot_history, (session['user_id'],), {'limit': 20})
+    )
     return render_template('chatbot.html', user=user, history=history)
 
 @app.route('/review-radar')
@@ -175,14 +207,28 @@ def review_radar():
     categories = get_all_categories()
     return render_template('review_radar.html', categories=categories)
 
-# ============== API ROUTES ==============
+# ============== API HELPERS ==============
 
-@app.route('/api/chatbot', methods=['POST'])
-@login_required
-def api_chatbot():
-    """API endpoint for chatbot queries"""
-    data = request.get_json()
-    
+def products_message(vegan, cruelty_free, count=None):
+    """Message for a 'products' reply; streamed replies send it before the count is known"""
+    if count is None:
+        message = "Based on your profile, here are your recommended products!"
+    else:
+        message = f"Based on your profile, here are {count} recommended products for you!"
+    if vegan or cruelty_free:
+        filter_tags = []
+        if vegan: filter_tags.append('🌿 Vegan')
+        if cruelty_free: filter_tags.append('🐰 Cruelty-Free')
+        message += f" (Filtered: {', '.join(filter_tags)})"
+    return message
+
+def chatbot_parts(data, user_id=None):
+    """Yield the chatbot reply for a request payload as (name, value) parts, each once it is ready.
+
+    The message comes first, then the routine or the products. Recommendations
+    are personalized when user_id is given, and repeated for the same profile
+    for a short while unless the payload sets refresh.
+    """
     skin_type = data.get('skin_type', '')
     hair_type = data.get('hair_type', '')
     issues = data.get('issues', '')
@@ -190,110 +236,276 @@ def api_chatbot():
     query_type = data.get('query_type', 'products')  # 'products', 'skincare_routine', 'haircare_routine'
     vegan = data.get('vegan', False)
     cruelty_free = data.get('cruelty_free', False)
+    refresh = bool(data.get('refresh', False))
+    
+    if query_type == 'skincare_routine':
+        yield 'message', "Here's your personalized skincare routine!"
+        yield 'routine', generate_skincare_routine(skin_type, issues, goal)
+        
+    elif query_type == 'haircare_routine':
+        yield 'message', "Here's your personalized haircare routine!"
+        yield 'routine', generate_haircare_routine(hair_type, issues, goal)
     
-    # Build the query string for history
+    else:
+        # 'products', and the default for anything else
+        if query_type == 'products':
+            message = products_message(vegan, cruelty_free)
+        else:
+            message = "Here are some product recommendations for you!"
+        yield 'message', message
+        products = recommend_products(skin_type, hair_type, issues, goal, limit=6, vegan=vegan, cruelty_free=cruelty_free,
+                                      user_id=user_id, refresh=refresh)
+        yield 'products', [dict(p) for p in products]
+
+def chatbot_history_entry(data, response_data):
+    """(query, response_text) recorded in ChatbotHistory for a request and its reply"""
     prefs = []
-    if vegan: prefs.append('Vegan')
-    if cruelty_free: prefs.append('Cruelty-Free')
+    if data.get('vegan'): prefs.append('Vegan')
+    if data.get('cruelty_free'): prefs.append('Cruelty-Free')
     pref_str = f", Preferences: {', '.join(prefs)}" if prefs else ''
-    query = f"Skin: {skin_type}, Hair: {hair_type}, Issues: {issues}, Goal: {goal}, Type: {query_type}{pref_str}"
+    query_type = data.get('query_type', 'products')
+    query = (f"Skin: {data.get('skin_type', '')}, Hair: {data.get('hair_type', '')}, Issues: {data.get('issues', '')}, "
+             f"Goal: {data.get('goal', '')}, Type: {query_type}{pref_str}")
     
-    response_data = {}
+    if 'routine' in response_data:
+        response_text = f"Generated {query_type.split('_')[0]} routine"
+    else:
+        response_text = f"Recommended {len(response_data.get('products', []))} products"
+    return query, response_text
+
+def build_chatbot_response(data, user_id=None):
+    """Build the whole chatbot reply for a request payload.
+
+    Shared by the WSGI route and the async variant in asgi.py.
+    Returns (response_data, query, response_text); the caller records history.
+    """
+    response_data = dict(chatbot_parts(data, user_id))
+    if data.get('query_type', 'products') == 'products':
+        # The whole reply is known here, so the message can include the count
+        response_data['message'] = products_message(data.get('vegan', False), data.get('cruelty_free', False),
+                                                     len(response_data['products']))
+    return (response_data, *chatbot_history_entry(data, response_data))
+
+def sse_event(name, value):
+    """One Server-Sent Events message carrying a JSON value"""
+    return f"event: {name}\ndata: {json.dumps(value, separators=(',', ':'))}\n\n"
+
+def record_search(args, user_id):
+    """Save a non-empty search (with its filters) to the user's history and preference profile"""
+    search_term = args.get('q', '').strip()
+    if search_term:
+        save_search_history(user_id, search_term, args.get('category', 'all'),
+                            vegan=args.get('vegan', '0') == '1', cruelty_free=args.get('cruelty_free', '0') == '1')
+
+def parse_price(value):
+    """A non-negative price from a query-string value, or None if absent or invalid"""
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    return price if price >= 0 else None
+
+def search_products_response(args, user_id, record=True):
+    """Run a personalized product search from query-string args (any mapping with .get)"""
+    search_term = args.get('q', '').strip()
+    category = args.get('category', 'all')
+    page = int(args.get('page', 1))
+    vegan = args.get('vegan', '0') == '1'
+    cruelty_free = args.get('cruelty_free', '0') == '1'
+    min_price = parse_price(args.get('min_price'))
+    max_price = parse_price(args.get('max_price'))
+    sort = args.get('sort', 'relevance')
+    if sort not in SORT_MODES:
+        sort = 'relevance'
+    fuzzy = args.get('fuzzy', '1') == '1'
+    per_page = 12
+    offset = (page - 1) * per_page
     
-    if query_type == 'products':
-        # Get recommended products
-        products = get_recommended_products(skin_type, hair_type, issues, goal, limit=6, vegan=vegan, cruelty_free=cruelty_free)
-        products_list = [dict(p) for p in products]
-        response_data['products'] = products_list
-        response_data['message'] = f"Based on your profile, here are {len(products_list)} recommended products for you!"
-        if vegan or cruelty_free:
-            filter_tags = []
-            if vegan: filter_tags.append('🌿 Vegan')
-            if cruelty_free: filter_tags.append('🐰 Cruelty-Free')
-            response_data['message'] += f" (Filtered: {', '.join(filter_tags)})"
-        response_text = f"Recommended {len(products_list)} products"
-        
-    elif query_type == 'skincare_routine':
-        routine = generate_skincare_routine(skin_type, issues, goal)
-        response_data['routine'] = routine
-        response_data['message'] = "Here's your personalized skincare routine!"
-        response_text = "Generated skincare routine"
-        
-    elif query_type == 'haircare_routine':
-        routine = generate_haircare_routine(hair_type, issues, goal)
-        response_data['routine'] = routine
-        response_data['message'] = "Here's your personalized haircare routine!"
-        response_text = "Generated haircare routine"
+    if record:
+        record_search(args, user_id)
     
-    else:
-        # Default: get products
-        products = get_recommended_products(skin_type, hair_type, issues, goal, limit=6, vegan=vegan, cruelty_free=cruelty_free)
-        products_list = [dict(p) for p in products]
-        response_data['products'] = products_list
-        response_data['message'] = "Here are some product recommendations for you!"
-        response_text = f"Recommended {len(products_list)} products"
+    # Typo-tolerant by default: misspelled words are corrected and synonyms also match
+    terms = expand_search_term(search_term) if fuzzy else search_term
+    corrected = terms[0] if fuzzy and terms and terms[0] != search_term else None
+    
+    # An empty search term returns the featured (unfiltered by text) products
+    products = search_products(terms, category, limit=per_page, offset=offset, vegan=vegan,
+                               cruelty_free=cruelty_free, user_id=user_id,
+                               min_price=min_price, max_price=max_price, sort=sort)
+    
+    products_list = [dict(p) for p in products]
+    
+    return {
+        'products': products_list,
+        'page': page,
+        'count': len(products_list),
+        'sort': sort,
+        'corrected': corrected,
+        'facets': get_search_facets(terms, category, vegan=vegan, cruelty_free=cruelty_free,
+                                    min_price=min_price, max_price=max_price)
+    }
+
+def product_detail_response(product_id):
+    """Get product details with reviews; returns (data, status)"""
+    product, reviews = run_query_batch(
+        (get_product_by_id, (product_id,)),
+        (get_reviews_for_product, (product_id,), {'limit': 10})
+    )
+    if not product:
+        return {'error': 'Product not found'}, 404
+    
+    return {
+        'product': dict(product),
+        'reviews': [dict(r) for r in reviews]
+    }, 200
+
+def user_stats_response(user_id):
+    """Get the user statistics payload, served from maintained counters"""
+    return get_user_stats(user_id)
+
+def ndjson_chunks(rows, chunk_bytes=64 * 1024):
+    """Encode rows as NDJSON, grouped into chunks of about chunk_bytes.
+
+    The server pulls the next chunk only after the previous one was written,
+    so a slow client slows the cursor down instead of buffering the export.
+    """
+    buffer, size = [], 0
+    for row in rows:
+        line = json.dumps(row, separators=(',', ':')) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+# ============== API ROUTES ==============
+
+@app.route('/api/chatbot', methods=['POST'])
+@login_required
+@rate_limited('chatbot')
+def api_chatbot():
+    """API endpoint for chatbot queries"""
+    data = request.get_json()
+    response_data, query, response_text = build_chatbot_response(data, session['user_id'])
     
     # Save to history
-    save_chatbot_query(session['user_id'], query, response_text)
+    save_chatbot_query(session['user_id'], query, response_text, data.get('query_type', 'products'))
     
     return jsonify(response_data)
 
+@app.route('/api/chatbot/stream', methods=['POST'])
+@login_required
+@rate_limited('chatbot')
+def api_chatbot_stream():
+    """Chatbot reply as Server-Sent Events: message, then routine or products, then done.
+
+    Each part is sent as soon as it is ready. The history row is written once
+    the response is closed - after the last event, or when the client goes away
+    early (then with whatever had been sent).
+    """
+    data = request.get_json()
+    user_id = session['user_id']
+    response_data = {}
+    
+    def events():
+        for name, value in chatbot_parts(data, user_id):
+            response_data[name] = value
+            yield sse_event(name, value)
+        yield sse_event('done', {})
+    
+    response = Response(events(), mimetype='text/event-stream')
+    response.call_on_close(lambda: save_chatbot_query(
+        user_id, *chatbot_history_entry(data, response_data), data.get('query_type', 'products')
+    ))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # let reverse proxies pass events straight through
+    return response
+
 @app.route('/api/search-products', methods=['GET'])
 @login_required
+@rate_limited('search')
 def api_search_products():
     """API endpoint for product search"""
-    search_term = request.args.get('q', '').strip()
-    category = request.args.get('category', 'all')
-    page = int(request.args.get('page', 1))
-    vegan = request.args.get('vegan', '0') == '1'
-    cruelty_free = request.args.get('cruelty_free', '0') == '1'
-    per_page = 12
-    offset = (page - 1) * per_page
+    # Record first: even a repeated (304) search belongs in the history, and it may shift the ranking
+    record_search(request.args, session['user_id'])
+    etag = make_etag('search', get_catalog_version(), get_user_profile(session['user_id']).signature,
+                     sorted(request.args.items(multi=True)))
+    cached = not_modified(etag, SEARCH_CACHE_CONTROL)
+    if cached:
+        return cached
     
-    if search_term:
-        # Save search history
-        save_search_history(session['user_id'], search_term)
-        
-        # Search products
-        products = search_products(search_term, category, limit=per_page, offset=offset, vegan=vegan, cruelty_free=cruelty_free)
-    else:
-        # Return some random/featured products if no search term
-        products = search_products('', category, limit=per_page, offset=offset, vegan=vegan, cruelty_free=cruelty_free)
-    
-    products_list = [dict(p) for p in products]
-    
-    return jsonify({
-        'products': products_list,
-        'page': page,
-        'count': len(products_list)
-    })
+    response = jsonify(search_products_response(request.args, session['user_id'], record=False))
+    return with_etag(response, etag, SEARCH_CACHE_CONTROL)
+
+@app.route('/api/export-products', methods=['GET'])
+@login_required
+@rate_limited('search')
+def api_export_products():
+    """Stream every product matching the filters as NDJSON (one product per line)"""
+    rows = iter_products(
+        request.args.get('q', '').strip(),
+        request.args.get('category', 'all'),
+        vegan=request.args.get('vegan', '0') == '1',
+        cruelty_free=request.args.get('cruelty_free', '0') == '1',
+        include_reviews=request.args.get('include_reviews', '0') == '1'
+    )
+    response = Response(stream_with_context(ndjson_chunks(rows)), mimetype='application/x-ndjson')
+    response.headers['Content-Disposition'] = 'attachment; filename="skinintel-products.ndjson"'
+    response.headers['X-Accel-Buffering'] = 'no'  # let reverse proxies pass chunks straight through
+    return response
 
 @app.route('/api/product/<int:product_id>', methods=['GET'])
 @login_required
 def api_get_product(product_id):
     """API endpoint to get product details with reviews"""
-    product = get_product_by_id(product_id)
-    if not product:
-        return jsonify({'error': 'Product not found'}), 404
+    etag = make_etag('product', product_id, get_catalog_version())
+    cached = not_modified(etag, PRODUCT_CACHE_CONTROL)
+    if cached:
+        return cached
     
-    reviews = get_reviews_for_product(product_id, limit=10)
+    data, status = product_detail_response(product_id)
+    response = jsonify(data)
+    response.status_code = status
+    return with_etag(response, etag, PRODUCT_CACHE_CONTROL)
+
+@app.route('/api/product/<int:product_id>/similar', methods=['GET'])
+@login_required
+def api_similar_products(product_id):
+    """API endpoint for "more like this" recommendations"""
+    limit = max(1, min(request.args.get('limit', 6, type=int), 10))
+    etag = make_etag('similar', product_id, limit, get_catalog_version())
+    cached = not_modified(etag, PRODUCT_CACHE_CONTROL)
+    if cached:
+        return cached
     
-    return jsonify({
-        'product': dict(product),
-        'reviews': [dict(r) for r in reviews]
-    })
+    products = [dict(p) for p in get_similar_products(product_id, limit=limit)]
+    return with_etag(jsonify({'products': products, 'count': len(products)}), etag, PRODUCT_CACHE_CONTROL)
 
 @app.route('/api/user-stats', methods=['GET'])
 @login_required
 def api_user_stats():
     """API endpoint for user statistics"""
-    chatbot_history = get_user_chatbot_history(session['user_id'], limit=100)
-    search_history = get_user_search_history(session['user_id'], limit=100)
-    
-    return jsonify({
-        'total_chatbot_queries': len(chatbot_history),
-        'total_searches': len(search_history)
-    })
+    return jsonify(user_stats_response(session['user_id']))
+
+@app.route('/api/startup-stats', methods=['GET'])
+@login_required
+def api_startup_stats():
+    """API endpoint for the import/boot time breakdown of this process"""
+    return jsonify(get_startup_timings())
+
+@app.route('/api/cache-stats', methods=['GET'])
+@login_required
+def api_cache_stats():
+    """API endpoint for the memoized query cache statistics of this process"""
+    return jsonify(query_cache.get_stats())
+
+@app.route('/api/rate-limit-stats', methods=['GET'])
+@login_required
+def api_rate_limit_stats():
+    """API endpoint for rate limiting and load shedding counters of this process"""
+    return jsonify(rate_limit.get_stats())
 
 # ============== ERROR HANDLERS ==============
 
@@ -309,5 +521,6 @@ def internal_error(e):
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
+    boot(app)
     app.run(host='0.0.0.0', port=port, debug=True)
 
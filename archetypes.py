@@ -0,0 +1,137 @@
+"""
+SkinIntell Recommendation Pools
+Offline batch job that stores a ranked candidate pool for every profile archetype
+
+Run after populate_db.py: python archetypes.py
+
+An archetype is one combination of the profile choices the forms offer: skin
+type, hair type (both normalized as in attributes.py), a set of up to
+MAX_CONCERNS concerns, and the vegan and cruelty-free filters. Its pool is the
+POOL_SIZE products matching the most of its skin type, hair type and concerns,
+higher-rated first among equal matches. Pools are computed from the bitmap index
+on a process pool (one process per core) and stored as packed uint32 ids in
+RecommendationPools. get_recommended_products() then samples a profile's pool
+instead of scoring the catalog; profiles outside the archetypes (more concerns)
+are still matched live.
+"""
+
+import itertools
+import os
+import random
+import sqlite3
+import time
+from array import array
+from multiprocessing import Pool
+
+import attributes
+import bitmap_index
+import database
+
+POOL_SIZE = 48
+MAX_CONCERNS = 2
+
+SKIN_CHOICES = (None, 'oily', 'dry', 'combination', 'normal', 'sensitive')
+HAIR_CHOICES = (None, 'straight', 'curly', 'fine', 'thick')  # wavy has no target; coily is curly
+
+# Ties within a match level are broken by whole stars, unrated products last
+STAR_ORDER = (5, 4, 3, 2, 1, None)
+
+# Bitmap index seen by pool workers (inherited without pickling under fork)
+_index = None
+
+def _init_worker(index):
+    global _index
+    _index = index
+
+def archetype_key(skin, hair, concerns, vegan, cruelty_free):
+    """Storage key for normalized profile values, or None if they are not a precomputed archetype"""
+    if not (skin or hair or concerns) or len(concerns) > MAX_CONCERNS:
+        return None
+    return f"{skin or ''}|{hair or ''}|{','.join(sorted(concerns))}|{int(bool(vegan))}|{int(bool(cruelty_free))}"
+
+def all_archetypes():
+    """Every (skin, hair, concerns, vegan, cruelty_free) the job precomputes"""
+    concerns = sorted(attributes.CONCERN_KEYWORDS)
+    concern_sets = [combo for n in range(MAX_CONCERNS + 1) for combo in itertools.combinations(concerns, n)]
+    for skin, hair, combo, vegan, cruelty_free in itertools.product(
+            SKIN_CHOICES, HAIR_CHOICES, concern_sets, (False, True), (False, True)):
+        if skin or hair or combo:
+            yield skin, hair, combo, vegan, cruelty_free
+
+def rank_pool(index, skin, hair, concerns, vegan, cruelty_free, rng):
+    """Up to POOL_SIZE product ids, best matches first"""
+    allowed = index.match(vegan=vegan, cruelty_free=cruelty_free)
+    wanted = []
+    if skin:
+        wanted.append(index.any_of('skin_type', (skin, 'all')))
+    if hair:
+        wanted.append(index.any_of('hair_type', (hair, 'all')))
+    wanted.extend(index.bitmap('concern', concern) for concern in concerns)
+
+    # at_least[n]: allowed products matching at least n of the wanted sets
+    at_least = [allowed] + [0] * len(wanted)
+    for bits in wanted:
+        for n in range(len(wanted), 0, -1):
+            at_least[n] |= at_least[n - 1] & bits
+
+    rated = index.any_of('stars', [s for s in STAR_ORDER if s is not None])
+    pool = []
+    for n in range(len(wanted), 0, -1):
+        level = at_least[n] & ~at_least[n + 1] if n < len(wanted) else at_least[n]
+        for stars in STAR_ORDER:
+            bucket = level & (index.bitmap('stars', stars) if stars is not None else ~rated)
+            ids = sorted(bitmap_index.sample_ids(bucket, POOL_SIZE - len(pool), rng))
+            pool.extend(ids)
+            if len(pool) >= POOL_SIZE:
+                return pool
+    return pool
+
+def _rank_block(archetypes):
+    """Pool task: packed pools for a list of archetypes"""
+    rows = []
+    for archetype in archetypes:
+        key = archetype_key(*archetype)
+        pool = rank_pool(_index, *archetype, random.Random(key))
+        rows.append((key, array('I', pool).tobytes()))
+    return rows
+
+def compute_pools(index, processes=None):
+    """Yield blocks of (archetype key, packed ids), computed in parallel (one block per skin/hair pair)"""
+    _init_worker(index)
+    blocks = {}
+    for archetype in all_archetypes():
+        blocks.setdefault(archetype[:2], []).append(archetype)
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        yield from map(_rank_block, blocks.values())
+        return
+    with Pool(processes, initializer=_init_worker, initargs=(index,)) as pool:
+        yield from pool.imap_unordered(_rank_block, blocks.values())
+
+def unpack(blob):
+    ids = array('I')
+    ids.frombytes(blob)
+    return ids.tolist()
+
+def build_recommendation_pools(processes=None):
+    """Recompute RecommendationPools for the whole catalog; returns the number of archetypes stored"""
+    database.init_db()
+    index = bitmap_index.BitmapIndex(database._bitmap_rows())
+    conn = sqlite3.connect(database.catalog_database())
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM RecommendationPools')
+    count = 0
+    for rows in compute_pools(index, processes):
+        cursor.executemany('INSERT INTO RecommendationPools (archetype, product_ids) VALUES (?, ?)', rows)
+        count += len(rows)
+    database.bump_table_version(cursor, 'RecommendationPools')
+    conn.commit()
+    conn.close()
+    return count
+
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    count = build_recommendation_pools()
+    print(f"[SUCCESS] Recommendation pools built for {count} archetypes "
+          f"(up to {POOL_SIZE} products each) in {time.perf_counter() - start:.1f}s")
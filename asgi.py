@@ -0,0 +1,224 @@
+"""
+SkinIntell ASGI Application
+Async variant of the /api/* endpoints, served alongside the Flask (WSGI) app:
+
+    uvicorn asgi:application --port 8001
+
+Uses the same database.py functions and app.py response builders. Each blocking
+call runs on the DB executor, so the event loop keeps accepting requests while
+SQLite works. Reads borrow pooled connections (database.read_connection), opened
+with check_same_thread=False and used by one executor thread at a time; writes
+open and close their own connection within the call.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+import rate_limit
+from app import (
+    app, build_chatbot_response, search_products_response,
+    product_detail_response, user_stats_response
+)
+from database import (
+    get_user_by_id, get_user_chatbot_history, get_user_search_history,
+    get_product_count, get_vegan_cf_products, get_vegan_cf_stats, save_chatbot_query
+)
+from sessions import read_session
+from startup import boot
+
+# Upper bound on SQLite calls running at once; extra requests wait on the event loop, not a thread
+DB_EXECUTOR_WORKERS = int(os.environ.get('ASGI_DB_THREADS', 16))
+
+_db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix='skinintel-db')
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking database function on the DB executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, functools.partial(func, *args, **kwargs))
+
+# ============== REQUEST HANDLING ==============
+
+class BadRequest(Exception):
+    """Raised by a handler to answer 400 with the message as the error"""
+
+class Request:
+    """The parts of an ASGI HTTP request the API handlers need"""
+
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True))
+        self.headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope.get('headers', [])}
+        self.client_ip = (scope.get('client') or ('',))[0]
+        self.body = body
+        self.session = load_session(self.headers.get('cookie', ''))
+
+    def get_json(self):
+        try:
+            return json.loads(self.body or b'{}')
+        except ValueError:
+            raise BadRequest('Invalid JSON body')
+
+def load_session(cookie_header):
+    """Decode the Flask session cookie so both apps share logins"""
+    return read_session(app, cookie_header)
+
+ROUTES = []
+
+def route(method, pattern):
+    """Register an async handler for a method and path regex"""
+    def decorator(handler):
+        ROUTES.append((method, re.compile(f'^{pattern}$'), handler))
+        return handler
+    return decorator
+
+def login_required(handler):
+    """Async counterpart of app.login_required; answers 401 instead of redirecting"""
+    @functools.wraps(handler)
+    async def decorated_handler(request, **kwargs):
+        if 'user_id' not in request.session:
+            return {'error': 'Login required'}, 401
+        return await handler(request, **kwargs)
+    return decorated_handler
+
+def rate_limited(endpoint):
+    """Async counterpart of rate_limit.rate_limited (use after login_required)"""
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def decorated_handler(request, **kwargs):
+            if not rate_limit.enabled(app):
+                return await handler(request, **kwargs)
+            status, retry_after, lease = await run_db(rate_limit.admit, endpoint, request.session.get('user_id'),
+                                                      request.client_ip)
+            if status != 200:
+                return rate_limit.rejection(status, retry_after), status
+            try:
+                return await handler(request, **kwargs)
+            finally:
+                await run_db(rate_limit.finish, lease)
+        return decorated_handler
+    return decorator
+
+def _dict_or_none(row):
+    return dict(row) if row is not None else None
+
+# ============== API ROUTES ==============
+
+@route('POST', '/api/chatbot')
+@login_required
+@rate_limited('chatbot')
+async def api_chatbot(request):
+    """API endpoint for chatbot queries"""
+    data = request.get_json()
+    response_data, query, response_text = await run_db(build_chatbot_response, data, request.session['user_id'])
+    await run_db(save_chatbot_query, request.session['user_id'], query, response_text, data.get('query_type', 'products'))
+    return response_data, 200
+
+@route('GET', '/api/search-products')
+@login_required
+@rate_limited('search')
+async def api_search_products(request):
+    """API endpoint for product search"""
+    return await run_db(search_products_response, request.args, request.session['user_id']), 200
+
+@route('GET', r'/api/product/(?P<product_id>\d+)')
+@login_required
+async def api_get_product(request, product_id):
+    """API endpoint to get product details with reviews"""
+    return await run_db(product_detail_response, int(product_id))
+
+@route('GET', '/api/user-stats')
+@login_required
+async def api_user_stats(request):
+    """API endpoint for user statistics"""
+    return await run_db(user_stats_response, request.session['user_id']), 200
+
+@route('GET', '/api/dashboard')
+@login_required
+async def api_dashboard(request):
+    """Dashboard data, with the independent reads running concurrently"""
+    user_id = request.session['user_id']
+    user, chatbot_history, search_history, product_count, vegan_cf_products, vegan_cf_stats = await asyncio.gather(
+        run_db(get_user_by_id, user_id),
+        run_db(get_user_chatbot_history, user_id, limit=5),
+        run_db(get_user_search_history, user_id, limit=5),
+        run_db(get_product_count),
+        run_db(get_vegan_cf_products, limit=6),
+        run_db(get_vegan_cf_stats)
+    )
+    user = _dict_or_none(user)
+    if user:
+        user.pop('password', None)
+    return {
+        'user': user,
+        'chatbot_history': [dict(h) for h in chatbot_history],
+        'search_history': [dict(h) for h in search_history],
+        'product_count': product_count,
+        'vegan_cf_products': [dict(p) for p in vegan_cf_products],
+        'vegan_cf_stats': vegan_cf_stats
+    }, 200
+
+# ============== ASGI ENTRY POINT ==============
+
+async def _send_json(send, data, status):
+    body = json.dumps(data).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Schema check, template and index warm-up: nothing else runs it when uvicorn imports this module
+            await run_db(boot, app)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            _db_executor.shutdown(wait=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    """ASGI callable"""
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    request = Request(scope, await _read_body(receive))
+    path_matched = False
+    for method, pattern, handler in ROUTES:
+        match = pattern.match(request.path)
+        if not match:
+            continue
+        path_matched = True
+        if method != request.method:
+            continue
+        try:
+            data, status = await handler(request, **match.groupdict())
+        except BadRequest as e:
+            data, status = {'error': str(e)}, 400
+        except Exception:
+            app.logger.exception('Unhandled error in %s %s', request.method, request.path)
+            data, status = {'error': 'Internal server error'}, 500
+        return await _send_json(send, data, status)
+
+    if path_matched:
+        return await _send_json(send, {'error': 'Method not allowed'}, 405)
+    return await _send_json(send, {'error': 'Not found'}, 404)
@@ -0,0 +1,62 @@
+"""
+SkinIntell Static Assets
+Serves the fingerprinted bundles written by build_assets.py
+
+url_for('static', filename='css/style.css') resolves to the fingerprinted file
+listed in static/dist/manifest.json. Fingerprinted files are served with
+far-future immutable caching, using their precompressed .br/.gz siblings when
+the client accepts them. Without a build (no manifest) the raw files are served
+exactly as before.
+"""
+
+import json
+import mimetypes
+import os
+
+from flask import request, send_from_directory
+
+from build_assets import DIST_DIRNAME, MANIFEST_NAME
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+def load_manifest(static_folder):
+    """Read the build manifest; empty if assets haven't been built"""
+    try:
+        with open(os.path.join(static_folder, DIST_DIRNAME, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def init_app(app):
+    """Install the fingerprinted url_for mapping and the static file handler"""
+    manifest = load_manifest(app.static_folder)
+    app.extensions['asset_manifest'] = manifest
+
+    @app.url_defaults
+    def fingerprinted_static_url(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    send_static_file = app.view_functions['static']
+
+    def static(filename):
+        if not filename.startswith(DIST_DIRNAME + '/'):
+            return send_static_file(filename=filename)
+        response = _send_precompressed(app.static_folder, filename) or send_static_file(filename=filename)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        response.vary.add('Accept-Encoding')
+        return response
+
+    app.view_functions['static'] = static
+
+def _send_precompressed(static_folder, filename):
+    """Send the best precompressed sibling the client accepts, if one was built"""
+    accepted = request.accept_encodings
+    for encoding, suffix in PRECOMPRESSED:
+        if accepted[encoding] and os.path.isfile(os.path.join(static_folder, filename + suffix)):
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = send_from_directory(static_folder, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            return response
+    return None
@@ -0,0 +1,177 @@
+"""
+SkinIntell Product Attributes
+Structured brand, product type, variant, target skin/hair type and concerns for each product
+
+populate_db.py knows these when it generates a product; describe() turns them
+into normalized values and store() writes them next to the product: brand_id
+and product_type_id (Brands, ProductTypes), variant, target_skin_type and
+target_hair_type columns, and one ProductConcerns row per concern. The
+recommender then matches a user's profile on these values by equality.
+
+Catalogs built before this module existed are filled in once by backfill(),
+which recovers the same values from each product's generated name and
+description. Products added later without explicit values go through the same
+parser.
+"""
+
+import functools
+import re
+
+SKIN_TYPES = ('dry', 'oily', 'combination', 'sensitive', 'normal', 'all')
+HAIR_TYPES = ('dry', 'oily', 'normal', 'fine', 'thick', 'curly', 'straight', 'all')
+
+# Profile values with no product target of their own
+HAIR_TYPE_ALIASES = {'coily': 'curly'}
+
+# Concern -> word prefixes that signal it in benefits, variants and free-text issues/goals
+CONCERN_KEYWORDS = {
+    'acne': ('acne', 'pimple', 'breakout', 'blemish'),
+    'aging': ('aging', 'ageing', 'anti-aging', 'wrinkle', 'fine line', 'peptide', 'retinol'),
+    'dullness': ('dull', 'bright', 'glow', 'radian', 'vitamin c'),
+    'hydration': ('hydrat', 'dehydrat', 'dryness', 'moistur', 'hyaluronic'),
+    'oil control': ('oiliness', 'oil control', 'oil-free', 'greas', 'mattif'),
+    'pores': ('pore',),
+    'dark spots': ('dark spot', 'pigment'),
+    'redness': ('redness', 'rosacea', 'irritat', 'sooth'),
+    'texture': ('texture', 'rough', 'exfoliat'),
+    'firming': ('firm', 'sagging'),
+    'damage': ('damage', 'breakage', 'repair', 'strengthen', 'split end'),
+    'color care': ('color', 'colour'),
+    'frizz': ('frizz',),
+    'thinning': ('thinning', 'hair loss', 'hair fall', 'growth'),
+    'dandruff': ('dandruff', 'flak'),
+    'scalp': ('scalp',),
+}
+
+_CONCERN_RES = {
+    concern: re.compile(r'\b(?:' + '|'.join(re.escape(k) for k in keywords) + ')')
+    for concern, keywords in CONCERN_KEYWORDS.items()
+}
+_TARGET_RE = re.compile(r'for (?:(?:very|all) )?([\w-]+ )?(skin|hair)( types?)?\b')
+
+# ============== NORMALISATION ==============
+
+def normalise_skin_type(value):
+    value = (value or '').strip().lower()
+    return value if value in SKIN_TYPES else None
+
+def normalise_hair_type(value):
+    value = (value or '').strip().lower()
+    value = HAIR_TYPE_ALIASES.get(value, value)
+    return value if value in HAIR_TYPES else None
+
+def concerns_in(text):
+    """Concerns mentioned in any free text, sorted"""
+    text = (text or '').lower()
+    return tuple(sorted(concern for concern, pattern in _CONCERN_RES.items() if pattern.search(text)))
+
+def parse_benefit(benefit):
+    """(target_skin_type, target_hair_type) from a benefit such as "for Oily Skin" or "for All Hair Types" """
+    match = _TARGET_RE.search((benefit or '').lower())
+    if not match:
+        return None, None
+    word, kind, plural = match.groups()
+    target = 'all' if plural else (word or '').strip()
+    if kind == 'skin':
+        return normalise_skin_type(target), None
+    return None, normalise_hair_type(target)
+
+def describe(brand, product_type, category, variant, benefit):
+    """Normalized attributes of a generated product"""
+    skin_type, hair_type = parse_benefit(benefit)
+    return {
+        'brand': brand,
+        'product_type': product_type,
+        'category': category,
+        'variant': variant,
+        'target_skin_type': skin_type,
+        'target_hair_type': hair_type,
+        'concerns': concerns_in(f'{variant} {benefit}'),
+    }
+
+# ============== STORAGE ==============
+
+def _lookup_id(cursor, table, name, **extra):
+    columns = ['name', *extra]
+    cursor.execute(
+        f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        (name, *extra.values())
+    )
+    return cursor.execute(f'SELECT id FROM {table} WHERE name = ?', (name,)).fetchone()[0]
+
+def store(cursor, product_id, attrs):
+    """Write a product's attributes (from describe()) inside the caller's transaction"""
+    brand_id = _lookup_id(cursor, 'Brands', attrs['brand']) if attrs.get('brand') else None
+    type_id = None
+    if attrs.get('product_type'):
+        type_id = _lookup_id(cursor, 'ProductTypes', attrs['product_type'], category=attrs.get('category'))
+    cursor.execute('''
+        UPDATE Products SET brand_id = ?, product_type_id = ?, variant = ?, target_skin_type = ?, target_hair_type = ?
+        WHERE id = ?
+    ''', (brand_id, type_id, attrs.get('variant'), attrs.get('target_skin_type'), attrs.get('target_hair_type'),
+          product_id))
+    cursor.execute('DELETE FROM ProductConcerns WHERE product_id = ?', (product_id,))
+    cursor.executemany(
+        'INSERT INTO ProductConcerns (concern, product_id) VALUES (?, ?)',
+        [(concern, product_id) for concern in attrs.get('concerns', ())]
+    )
+
+# ============== BACKFILL ==============
+
+def _alternation(words):
+    # Longest first, so "Hair Serum" wins over "Serum"
+    return '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+class Parser:
+    """Recovers describe() input from a generated name and description"""
+
+    def __init__(self, brands, product_types, benefits):
+        """brands: names; product_types: {category: [(type, [variants])]}; benefits: phrases"""
+        self.types = {}
+        self.variants = {}
+        for category, types in product_types.items():
+            for product_type, type_variants in types:
+                self.types[product_type.lower()] = (product_type, category)
+                self.variants.update(((v.lower(), product_type.lower()), v) for v in type_variants)
+        self.brand_re = re.compile(f'(?:^|by )({_alternation(brands)})(?: |$)')
+        # Descriptions always read "... {variant} {type} ..." in lower case; overlapping
+        # matches, since a word before the variant can be another type's variant
+        variants = {variant for variant, _ in self.variants}
+        self.product_re = re.compile(f'(?=\\b({_alternation(variants)}) ({_alternation(self.types)})\\b)')
+        self.benefit_re = re.compile(f'({_alternation(b.lower() for b in benefits)})')
+
+    def parse(self, name, description, category):
+        description = (description or '').lower()
+        brand = self.brand_re.search(name or '')
+        product = next((m.groups() for m in self.product_re.finditer(description) if m.groups() in self.variants), None)
+        benefit = self.benefit_re.search(description)
+        product_type, category = self.types[product[1]] if product else (None, category)
+        return describe(
+            brand.group(1) if brand else None,
+            product_type,
+            category,
+            self.variants[product] if product else None,
+            benefit.group(1) if benefit else ''
+        )
+
+@functools.lru_cache(maxsize=None)
+def default_parser():
+    """Parser for catalogs generated by populate_db.py (built once)"""
+    import populate_db
+
+    return Parser(
+        populate_db.SKINCARE_BRANDS + populate_db.HAIRCARE_BRANDS,
+        {**populate_db.SKINCARE_PRODUCTS, **populate_db.HAIRCARE_PRODUCTS},
+        {benefit for benefits in populate_db.BENEFITS.values() for benefit in benefits}
+    )
+
+def backfill(conn, parser=None):
+    """Derive attributes for every product that has none yet; returns products updated"""
+    parser = parser or default_parser()
+    cursor = conn.cursor()
+    rows = cursor.execute(
+        'SELECT id, name, description, category FROM Products WHERE product_type_id IS NULL AND brand_id IS NULL'
+    ).fetchall()
+    for product_id, name, description, category in rows:
+        store(cursor, product_id, parser.parse(name, description, category))
+    return len(rows)
@@ -0,0 +1,255 @@
+"""
+SkinIntell Benchmarks
+Times database code paths against a synthetic catalog of a chosen size.
+
+Run: python benchmark.py dashboard --products 100000
+     python benchmark.py search-sort --products 1000000
+     python benchmark.py fuzzy-search --products 100000
+     python benchmark.py chatbot-stream --products 100000
+     python benchmark.py sessions
+
+The catalog is built once per size (populate_db.py output, duplicated until it
+reaches the requested product count) and reused from the temp directory.
+"""
+
+import argparse
+import os
+import statistics
+import sqlite3
+import tempfile
+import time
+
+import database
+import populate_db
+
+SCENARIOS = {}
+
+def scenario(name):
+    """Register a benchmark scenario"""
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+# ============== CATALOG SETUP ==============
+
+def _copy_columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})') if row[1] != 'id']
+
+def build_catalog(products, rebuild=False):
+    """Create (or reuse) a benchmark database with at least `products` products"""
+    path = os.path.join(tempfile.gettempdir(), f'skinintel-bench-{products}.db')
+    database.DATABASE_NAME = path
+    if os.path.exists(path) and not rebuild:
+        database.init_db()  # bring a cached catalog up to the current schema
+        return path
+    if os.path.exists(path):
+        os.remove(path)
+
+    populate_db.populate_database()
+    conn = sqlite3.connect(path)
+    product_columns = ', '.join(_copy_columns(conn, 'Products'))
+    review_columns = [c for c in _copy_columns(conn, 'Reviews') if c != 'product_id']
+    while conn.execute('SELECT COUNT(*) FROM Products').fetchone()[0] < products:
+        offset = conn.execute('SELECT MAX(id) FROM Products').fetchone()[0]
+        conn.execute(f'INSERT INTO Products ({product_columns}) SELECT {product_columns} FROM Products ORDER BY id')
+        conn.execute(
+            f"INSERT INTO Reviews (product_id, {', '.join(review_columns)}) "
+            f"SELECT product_id + ?, {', '.join(review_columns)} FROM Reviews",
+            (offset,)
+        )
+        conn.commit()
+    conn.execute('DELETE FROM Products WHERE id > ?', (products,))
+    conn.execute('DELETE FROM Reviews WHERE product_id > ?', (products,))
+    conn.commit()
+    conn.close()
+    database.init_db(force=True)
+    return path
+
+def benchmark_user():
+    """Get (or create) the user the scenarios run as, with some history"""
+    user = database.get_user_by_email('bench@example.com')
+    if user:
+        return user['id']
+    user_id = database.create_user('bench', 'bench@example.com', 'benchpass', 'oily', 'curly', 'acne', 'clear skin')
+    for term in ('serum', 'vitamin c', 'shampoo', 'sunscreen', 'retinol'):
+        database.save_search_history(user_id, term)
+        database.save_chatbot_query(user_id, f'Type: products, Goal: {term}', 'Recommended 6 products')
+    return user_id
+
+# ============== TIMING ==============
+
+def measure(func, repeat):
+    """Run func `repeat` times after one warm-up call; returns timings in ms"""
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def report(name, timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"   {name:<32} median {statistics.median(timings):>9.2f} ms   p95 {p95:>9.2f} ms")
+    return statistics.median(timings)
+
+# ============== SCENARIOS ==============
+
+@scenario('dashboard')
+def bench_dashboard(args):
+    """Six independent dashboard reads: sequential vs run_query_batch"""
+    user_id = benchmark_user()
+
+    def sequential():
+        database.get_user_by_id(user_id)
+        database.get_user_chatbot_history(user_id, limit=5)
+        database.get_user_search_history(user_id, limit=5)
+        database.get_product_count()
+        database.get_vegan_cf_products(limit=6)
+        database.get_vegan_cf_stats()
+
+    def batched():
+        database.run_query_batch(
+            (database.get_user_by_id, (user_id,)),
+            (database.get_user_chatbot_history, (user_id,), {'limit': 5}),
+            (database.get_user_search_history, (user_id,), {'limit': 5}),
+            database.get_product_count,
+            (database.get_vegan_cf_products, (), {'limit': 6}),
+            database.get_vegan_cf_stats
+        )
+
+    before = report('sequential', measure(sequential, args.repeat))
+    after = report('run_query_batch', measure(batched, args.repeat))
+    print(f"   latency reduction: {(1 - after / before) * 100:.1f}%")
+
+@scenario('search-sort')
+def bench_search_sort(args):
+    """First and tenth result page for every sort mode, with and without category/price filters (uncached)"""
+    find = database._find_products.cache.func
+    filters = {
+        'all': ('', None, None, None, None, None),
+        'price 500-1000': ('', None, None, None, 500, 1000),
+        'Face Care': ('', 'Face Care', None, None, None, None),
+        'Face Care 500-1000': ('', 'Face Care', None, None, 500, 1000),
+        'text "serum"': ('serum', None, None, None, None, None),
+    }
+    for sort in database.SORT_MODES:
+        print(f"  sort={sort}")
+        for label, (term, category, vegan, cruelty_free, low, high) in filters.items():
+            for page in (1, 10):
+                report(f'{label}, page {page}', measure(
+                    lambda: find(term, category, vegan, cruelty_free, low, high, sort, 12, (page - 1) * 12),
+                    args.repeat
+                ))
+
+@scenario('fuzzy-search')
+def bench_fuzzy_search(args):
+    """Fuzzy index build, term correction (cold and cached) and typo searches with and without correction"""
+    import fuzzy
+
+    report('index build', measure(lambda: fuzzy.FuzzyIndex(database._vocabulary_rows()), max(1, args.repeat // 4)))
+    index = fuzzy.FuzzyIndex(database._vocabulary_rows())
+
+    typos = ('niacinimide', 'shampo', 'moisturiser', 'hyaluronc acid', 'vitamn c serum', 'spf', 'dandruf shampoo')
+    find = database._find_products.cache.func
+    for term in typos:
+        def cold():
+            index.cache.clear()
+            index.expand(term)
+
+        terms = index.expand(term)
+        print(f"  {term!r} -> {terms}")
+        report('correct (cold)', measure(cold, args.repeat))
+        report('correct (cached)', measure(lambda: index.expand(term), args.repeat))
+        report('search as typed', measure(
+            lambda: find(term, None, None, None, None, None, 'relevance', 12, 0), args.repeat))
+        report('search corrected', measure(
+            lambda: find(index.expand(term), None, None, None, None, None, 'relevance', 12, 0), args.repeat))
+
+@scenario('chatbot-stream')
+def bench_chatbot_stream(args):
+    """Chatbot time to first byte: /api/chatbot (whole JSON reply) vs /api/chatbot/stream (first event)"""
+    from app import app
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = benchmark_user()
+
+    def first_byte(url, payload):
+        def run():
+            response = client.post(url, json=payload, buffered=False)
+            next(iter(response.response))  # the body is produced lazily; stop at its first chunk
+            response.close()
+        return run
+
+    for query_type in ('products', 'skincare_routine'):
+        payload = {'skin_type': 'oily', 'hair_type': 'curly', 'issues': 'acne, frizz', 'query_type': query_type}
+        print(f"  query_type={query_type}")
+        for label, url in (('json, first byte', '/api/chatbot'), ('stream, first byte', '/api/chatbot/stream')):
+            report(label, measure(first_byte(url, {**payload, 'refresh': True}), args.repeat))
+        report('stream, complete', measure(
+            lambda: client.post('/api/chatbot/stream', json={**payload, 'refresh': True}).get_data(), args.repeat))
+
+@scenario('sessions')
+def bench_sessions(args):
+    """Per-request session overhead (open + save): signed-cookie vs server-side sessions"""
+    from flask.sessions import SecureCookieSessionInterface
+    from werkzeug.test import EnvironBuilder
+
+    import sessions
+    from app import app
+
+    directory = tempfile.TemporaryDirectory()
+    interfaces = {
+        'cookie': SecureCookieSessionInterface(),
+        'server': sessions.ServerSessionInterface(sessions.SessionStore(os.path.join(directory.name, 'sessions.db'))),
+    }
+    contents = {
+        'login only': {'user_id': 1, 'username': 'bench'},
+        'login + cached profile': {'user_id': 1, 'username': 'bench', 'profile': {
+            'skin_type': 'oily', 'hair_type': 'curly', 'issues': 'acne, frizz', 'goal': 'clear skin',
+            'recent_searches': ['serum', 'vitamin c', 'shampoo', 'sunscreen', 'retinol'] * 4,
+            'categories': {'Face Care': 12, 'Hair Care': 7, 'Body Care': 2}}},
+    }
+    name = app.config['SESSION_COOKIE_NAME']
+    for label, data in contents.items():
+        print(f"  session: {label}")
+        for backend, interface in interfaces.items():
+            # Issue the cookie the way a login response would
+            with app.test_request_context():
+                session = interface.open_session(app, app.request_class(EnvironBuilder().get_environ()))
+                session.update(data)
+                response = app.response_class()
+                interface.save_session(app, session, response)
+            cookie = response.headers['Set-Cookie'].split(';', 1)[0]
+            environ = EnvironBuilder(headers={'Cookie': cookie}).get_environ()
+
+            def request_cycle(modify):
+                def run():
+                    session = interface.open_session(app, app.request_class(environ))
+                    session['user_id']
+                    if modify:
+                        session['last_seen'] = time.time()
+                    interface.save_session(app, session, app.response_class())
+                return run
+
+            with app.test_request_context():
+                print(f"   {backend}: cookie {len(cookie) - len(name) - 1} bytes")
+                report(f'{backend}, read only', measure(request_cycle(False), args.repeat))
+                report(f'{backend}, modified', measure(request_cycle(True), args.repeat))
+    directory.cleanup()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('scenario', choices=sorted(SCENARIOS))
+    parser.add_argument('--products', type=int, default=100_000, help='catalog size')
+    parser.add_argument('--repeat', type=int, default=20, help='timed runs per variant')
+    parser.add_argument('--rebuild', action='store_true', help='regenerate the cached catalog')
+    args = parser.parse_args()
+
+    path = build_catalog(args.products, rebuild=args.rebuild)
+    print(f"Benchmark '{args.scenario}' on {database.get_product_count()} products ({path}):")
+    SCENARIOS[args.scenario](args)
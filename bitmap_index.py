@@ -0,0 +1,128 @@
+"""
+SkinIntell Bitmap Index
+In-memory bitsets over product ids for the catalog's low-cardinality attributes
+
+Bit i of a bitset is set when product i has the value. Bitsets are plain Python
+ints, so any filter combination is evaluated with & and | a machine word at a
+time in C (1M products is ~16k words), and counted with int.bit_count(). The
+matching ids then feed sampling (dashboard picks, recommendations) or facet
+counts without touching the table. The index is rebuilt from the database
+whenever the Products version moves (see get_index).
+"""
+
+import random
+import sys
+import threading
+
+# Attributes with a bitset per distinct value; 'concern' is multi-valued (a tuple per product)
+FIELDS = ('category', 'vegan', 'cruelty_free', 'price_band', 'stars', 'skin_type', 'hair_type', 'concern')
+
+# Below this share of matching ids, sample from the enumerated ids instead of by rejection
+DENSE_SHARE = 1 / 64
+
+class BitmapIndex:
+    """Bitsets for every (field, value) over one snapshot of the catalog"""
+
+    def __init__(self, rows):
+        """rows: (id, *FIELDS) tuples"""
+        rows = list(rows)
+        self.max_id = max((row[0] for row in rows), default=0)
+        size = self.max_id // 8 + 1
+        buffers = {}
+        everything = bytearray(size)
+        for row in rows:
+            product_id = row[0]
+            byte, bit = product_id >> 3, 1 << (product_id & 7)
+            everything[byte] |= bit
+            for field, value in zip(FIELDS, row[1:]):
+                if value is None:
+                    continue
+                for value in value if isinstance(value, tuple) else (value,):
+                    buffer = buffers.get((field, value))
+                    if buffer is None:
+                        buffer = buffers[(field, value)] = bytearray(size)
+                    buffer[byte] |= bit
+        self.all = int.from_bytes(everything, 'little')
+        self.bitmaps = {key: int.from_bytes(buffer, 'little') for key, buffer in buffers.items()}
+
+    def bitmap(self, field, value):
+        return self.bitmaps.get((field, value), 0)
+
+    def values(self, field):
+        """Distinct indexed values of a field"""
+        return sorted(value for f, value in self.bitmaps if f == field)
+
+    def any_of(self, field, values):
+        """OR of a field's bitsets for several values"""
+        bits = 0
+        for value in values:
+            bits |= self.bitmap(field, value)
+        return bits
+
+    def match(self, category=None, vegan=None, cruelty_free=None):
+        """Products matching every given filter (falsy filters are ignored, as in search)"""
+        bits = self.all
+        if category and category != 'all':
+            bits &= self.bitmap('category', category)
+        if vegan:
+            bits &= self.bitmap('vegan', 1)
+        if cruelty_free:
+            bits &= self.bitmap('cruelty_free', 1)
+        return bits
+
+# ============== ID EXTRACTION ==============
+
+def iter_ids(bits):
+    """Set bit positions (product ids) in ascending order"""
+    if not bits:
+        return
+    data = bits.to_bytes((bits.bit_length() + 63) // 64 * 8, 'little')
+    words = memoryview(data).cast('Q') if sys.byteorder == 'little' else \
+        [int.from_bytes(data[i:i + 8], 'little') for i in range(0, len(data), 8)]
+    for index, word in enumerate(words):
+        base = index * 64
+        while word:
+            low = word & -word
+            yield base + low.bit_length() - 1
+            word ^= low
+
+def sample_ids(bits, k, rng=random):
+    """Up to k distinct ids drawn uniformly from a bitset, in random order"""
+    count = bits.bit_count()
+    if count <= k:
+        ids = list(iter_ids(bits))
+        rng.shuffle(ids)
+        return ids
+    if count < bits.bit_length() * DENSE_SHARE:
+        return rng.sample(list(iter_ids(bits)), k)
+
+    # Dense: draw random positions and keep the ones that are set
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    last = bits.bit_length() - 1
+    chosen = {}
+    while len(chosen) < k:
+        position = rng.randint(0, last)
+        if data[position >> 3] >> (position & 7) & 1:
+            chosen[position] = None
+    return list(chosen)
+
+# ============== SHARED INDEX ==============
+
+_current = (None, None)  # (version, BitmapIndex), replaced as a whole
+_lock = threading.Lock()
+
+def get_index(version, load):
+    """The index for `version`; `load()` returns fresh rows when it has to be rebuilt"""
+    global _current
+    current_version, index = _current
+    if index is not None and current_version == version:
+        return index
+    with _lock:
+        if _current[1] is None or _current[0] != version:
+            _current = (version, BitmapIndex(load()))
+        return _current[1]
+
+def clear():
+    global _current
+    with _lock:
+        _current = (None, None)
@@ -0,0 +1,204 @@
+"""
+SkinIntell Static Asset Build
+Minifies, fingerprints and precompresses static/css and static/js into static/dist
+
+Run: python build_assets.py
+
+Writes static/dist/<dir>/<name>.<hash>.<ext> plus .gz (and .br when brotli is
+installed) siblings, and static/dist/manifest.json mapping source paths such as
+'css/style.css' to their fingerprinted path. assets.py reads the manifest.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:  # Optional: only .gz siblings are written without it
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIRNAME = 'dist'
+MANIFEST_NAME = 'manifest.json'
+SOURCE_DIRS = ('css', 'js')
+
+# ============== MINIFIERS ==============
+
+def minify_css(source):
+    """Strip comments and collapse whitespace around CSS punctuation"""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    source = re.sub(r':\s+', ':', source)
+    return source.replace(';}', '}').strip()
+
+# Spaces next to these characters never change how JS parses
+_JS_SAFE_PUNCTUATION = set('{}()[];,:=<>?!&|')
+# After these characters (or keywords) a '/' starts a regex literal, not a division
+_JS_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+_JS_REGEX_KEYWORDS = ('return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'void', 'yield')
+
+def minify_js(source):
+    """Strip comments, indentation and blank lines outside strings and template literals.
+
+    Line breaks are kept (collapsed to one) so automatic semicolon insertion
+    behaves exactly as in the source.
+    """
+    out = []
+    template_depths = []  # brace depth inside each open `${ ... }`
+    in_template = False
+    pending = ''          # whitespace seen since the last emitted code character
+    i, n = 0, len(source)
+
+    def last_code_char():
+        return out[-1][-1] if out else ''
+
+    def flush_whitespace(next_char):
+        nonlocal pending
+        if pending and out:
+            if '\n' in pending and last_code_char() not in '{;,':
+                out.append('\n')
+            elif '\n' not in pending and last_code_char() not in _JS_SAFE_PUNCTUATION and next_char not in _JS_SAFE_PUNCTUATION:
+                out.append(' ')
+        pending = ''
+
+    while i < n:
+        c = source[i]
+
+        if in_template:
+            if c == '\\':
+                out.append(source[i:i + 2])
+                i += 2
+            elif c == '`':
+                out.append(c)
+                in_template = False
+                i += 1
+            elif source.startswith('${', i):
+                out.append('${')
+                template_depths.append(0)
+                in_template = False
+                i += 2
+            else:
+                out.append(c)
+                i += 1
+            continue
+
+        if c in ' \t\r\n':
+            pending += c
+            i += 1
+            continue
+
+        if source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            comment = source[i:n if end == -1 else end + 2]
+            pending += '\n' if '\n' in comment else ' '
+            i += len(comment)
+            continue
+
+        flush_whitespace(c)
+
+        if c in '\'"':
+            j = i + 1
+            while j < n and source[j] != c:
+                j += 2 if source[j] == '\\' else 1
+            out.append(source[i:j + 1])
+            i = j + 1
+        elif c == '`':
+            out.append(c)
+            in_template = True
+            i += 1
+        elif c == '/' and _starts_regex(out):
+            j, in_class = i + 1, False
+            while j < n and (in_class or source[j] != '/'):
+                if source[j] == '\\':
+                    j += 1
+                elif source[j] == '[':
+                    in_class = True
+                elif source[j] == ']':
+                    in_class = False
+                j += 1
+            out.append(source[i:j + 1])
+            i = j + 1
+        else:
+            if template_depths and c == '{':
+                template_depths[-1] += 1
+            elif template_depths and c == '}':
+                if template_depths[-1] == 0:
+                    template_depths.pop()
+                    in_template = True
+                else:
+                    template_depths[-1] -= 1
+            out.append(c)
+            i += 1
+
+    return ''.join(out).strip() + '\n'
+
+def _starts_regex(out):
+    # Identifiers are emitted a character at a time: look back far enough to see a whole keyword
+    code = ''.join(out[-12:]).rstrip()
+    if not code:
+        return True
+    if code[-1] in _JS_REGEX_PRECEDERS:
+        return True
+    word = re.search(r'[\w$]+$', code)
+    return bool(word) and word.group(0) in _JS_REGEX_KEYWORDS
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+# ============== BUILD ==============
+
+def fingerprint(content):
+    """Short content hash used in asset filenames"""
+    return hashlib.sha256(content).hexdigest()[:12]
+
+def write_precompressed(path, content):
+    """Write .gz (and .br) siblings next to a built asset"""
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(content, quality=11))
+
+def build_assets(static_dir=STATIC_DIR):
+    """Build every css/js source into static/dist and return the manifest"""
+    dist_dir = os.path.join(static_dir, DIST_DIRNAME)
+    shutil.rmtree(dist_dir, ignore_errors=True)
+
+    manifest = {}
+    for source_dir in SOURCE_DIRS:
+        for filename in sorted(os.listdir(os.path.join(static_dir, source_dir))):
+            base, ext = os.path.splitext(filename)
+            if ext not in MINIFIERS:
+                continue
+            logical = f'{source_dir}/{filename}'
+            with open(os.path.join(static_dir, logical), encoding='utf-8') as f:
+                source = f.read()
+            content = MINIFIERS[ext](source).encode('utf-8')
+
+            built = f'{DIST_DIRNAME}/{source_dir}/{base}.{fingerprint(content)}{ext}'
+            path = os.path.join(static_dir, built)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+            write_precompressed(path, content)
+
+            manifest[logical] = built
+            print(f"   {logical:<24} {len(source.encode('utf-8')):>7} -> {len(content):>7} bytes  {built}")
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+if __name__ == '__main__':
+    print("Building static assets...")
+    manifest = build_assets()
+    print(f"\n[SUCCESS] {len(manifest)} assets written to static/{DIST_DIRNAME}")
@@ -0,0 +1,214 @@
+"""
+SkinIntell Catalog Artifact Builder
+Builds the catalog (Products, Reviews, ProductSimilarity, RecommendationPools) into a read-only, versioned SQLite file
+
+Build and activate:   python build_catalog.py [output_dir]
+Copy an existing db:  python build_catalog.py [output_dir] --from skinintel.db
+Check the active one: python build_catalog.py [output_dir] --verify
+
+The catalog is generated (populate_db.py, similarity.py, archetypes.py) into a scratch file,
+indexed for the app's read paths, ANALYZEd, switched out of WAL and VACUUMed
+into a compact single file. It is then named after its build time and checksum,
+made read-only and activated by atomically replacing <output_dir>/current.json.
+Running workers with CATALOG_ARTIFACT_DIR=<output_dir> open it with
+immutable=1 (no locks, no change checks) and switch to a new build within
+database.ARTIFACT_CHECK_INTERVAL seconds; older builds are pruned, keeping
+KEEP_ARTIFACTS.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import stat
+import sys
+import tempfile
+import time
+
+import database
+
+DEFAULT_OUTPUT_DIR = os.environ.get('CATALOG_ARTIFACT_DIR') or 'catalog'
+KEEP_ARTIFACTS = 3
+ARTIFACT_PREFIX = 'catalog-'
+
+# Read paths that only need to be fast in the artifact, where index upkeep costs nothing
+# (price, rating and category orders already come from init_db)
+ARTIFACT_INDEXES = {
+    'idx_products_vegan_cf': 'Products(vegan, cruelty_free)',
+}
+
+# Every table an artifact keeps; everything else in the scratch file is dropped
+CATALOG_ONLY = set(database.CATALOG_TABLES) | set(database.ATTRIBUTE_TABLES) | {'TableVersions'}
+
+# ============== BUILD ==============
+
+def _generate(path):
+    """Populate a fresh catalog at `path` with generated products, reviews, neighbours and recommendation pools"""
+    import archetypes
+    import populate_db
+    import similarity
+
+    saved = database.CATALOG_DATABASE, database.CATALOG_ARTIFACT_DIR
+    database.CATALOG_DATABASE, database.CATALOG_ARTIFACT_DIR = path, None
+    try:
+        populate_db.populate_database()
+        similarity.build_similarity_index()
+        archetypes.build_recommendation_pools()
+    finally:
+        database.CATALOG_DATABASE, database.CATALOG_ARTIFACT_DIR = saved
+
+def _copy(source, path):
+    """Copy an existing catalog (e.g. skinintel.db) into `path` with the backup API"""
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(path)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+
+def _finalize(path, version):
+    """Drop non-catalog tables, index, analyze and compact; returns (products, reviews)"""
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        )]
+        conn.execute('BEGIN')
+        for name in tables:
+            if name not in CATALOG_ONLY:
+                conn.execute(f'DROP TABLE {name}')
+        # Nothing writes the artifact, so the catalog triggers are dead weight
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall():
+            conn.execute(f'DROP TRIGGER {name}')
+        for name, columns in ARTIFACT_INDEXES.items():
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {columns}')
+        # One fresh version for every catalog table, so each build gets new ETags and cache entries
+        conn.execute('UPDATE TableVersions SET version = ?', (version,))
+        conn.execute('COMMIT')
+
+        conn.execute('ANALYZE')
+        conn.execute('PRAGMA journal_mode = DELETE')
+        conn.execute('PRAGMA auto_vacuum = NONE')
+        conn.execute('VACUUM')
+        problem = conn.execute('PRAGMA integrity_check').fetchone()[0]
+        if problem != 'ok':
+            raise RuntimeError(f"Built catalog failed integrity_check: {problem}")
+        return (conn.execute('SELECT COUNT(*) FROM Products').fetchone()[0],
+                conn.execute('SELECT COUNT(*) FROM Reviews').fetchone()[0])
+    finally:
+        conn.close()
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def build_catalog(output_dir=DEFAULT_OUTPUT_DIR, source=None, keep=KEEP_ARTIFACTS):
+    """Build, activate and prune; returns the new manifest"""
+    os.makedirs(output_dir, exist_ok=True)
+    built_at = time.time()
+    version = time.time_ns() // 1000
+    fd, scratch = tempfile.mkstemp(prefix='.building-', suffix='.db', dir=output_dir)
+    os.close(fd)
+    os.remove(scratch)
+    try:
+        if source:
+            _copy(source, scratch)
+        else:
+            _generate(scratch)
+        products, reviews = _finalize(scratch, version)
+        checksum = file_checksum(scratch)
+
+        name = f"{ARTIFACT_PREFIX}{time.strftime('%Y%m%d%H%M%S', time.gmtime(built_at))}-{checksum[:12]}.db"
+        path = os.path.join(output_dir, name)
+        os.chmod(scratch, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.replace(scratch, path)
+    finally:
+        for leftover in (scratch, scratch + '-journal', scratch + '-wal', scratch + '-shm'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    manifest = {
+        'file': name,
+        'sha256': checksum,
+        'size': os.path.getsize(path),
+        'version': version,
+        'built_at': int(built_at),
+        'schema_version': database.SCHEMA_VERSION,
+        'products': products,
+        'reviews': reviews,
+    }
+    activate(output_dir, manifest)
+    prune(output_dir, keep)
+    return manifest
+
+# ============== ACTIVATION ==============
+
+def activate(output_dir, manifest):
+    """Point current.json at an artifact; readers see either the old or the new pointer, never a partial one"""
+    pointer = os.path.join(output_dir, database.CATALOG_POINTER)
+    tmp = f'{pointer}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, pointer)
+
+def read_manifest(output_dir):
+    with open(os.path.join(output_dir, database.CATALOG_POINTER)) as f:
+        return json.load(f)
+
+def prune(output_dir, keep=KEEP_ARTIFACTS):
+    """Delete all but the newest `keep` artifacts (never the active one); returns the names removed"""
+    active = read_manifest(output_dir)['file']
+    artifacts = sorted(
+        (name for name in os.listdir(output_dir) if name.startswith(ARTIFACT_PREFIX) and name.endswith('.db')),
+        key=lambda name: os.stat(os.path.join(output_dir, name)).st_mtime_ns,
+        reverse=True
+    )
+    removed = [name for name in artifacts[keep:] if name != active]
+    for name in removed:
+        os.remove(os.path.join(output_dir, name))
+    return removed
+
+def verify(output_dir):
+    """Check the active artifact against its manifest; returns a list of problems (empty if sound)"""
+    manifest = read_manifest(output_dir)
+    path = os.path.join(output_dir, manifest['file'])
+    if not os.path.exists(path):
+        return [f"{manifest['file']} is missing"]
+    problems = []
+    if os.path.getsize(path) != manifest['size']:
+        problems.append('size does not match the manifest')
+    if file_checksum(path) != manifest['sha256']:
+        problems.append('checksum does not match the manifest')
+    if manifest.get('schema_version') != database.SCHEMA_VERSION:
+        problems.append(f"built for schema {manifest.get('schema_version')}, app expects {database.SCHEMA_VERSION}")
+    return problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the read-only catalog artifact')
+    parser.add_argument('output_dir', nargs='?', default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument('--from', dest='source', help='copy the catalog from an existing database instead of generating it')
+    parser.add_argument('--keep', type=int, default=KEEP_ARTIFACTS)
+    parser.add_argument('--verify', action='store_true', help='check the active artifact and exit')
+    args = parser.parse_args()
+
+    if args.verify:
+        problems = verify(args.output_dir)
+        for problem in problems:
+            print(f"[ERROR] {problem}")
+        if not problems:
+            print(f"[SUCCESS] {read_manifest(args.output_dir)['file']} matches its manifest")
+        sys.exit(1 if problems else 0)
+
+    start = time.perf_counter()
+    manifest = build_catalog(args.output_dir, args.source, args.keep)
+    print(f"[SUCCESS] Catalog artifact {manifest['file']} activated in {time.perf_counter() - start:.1f}s")
+    print(f"   Products: {manifest['products']}  Reviews: {manifest['reviews']}  "
+          f"Size: {manifest['size'] / 1e6:.1f} MB")
@@ -0,0 +1,210 @@
+"""
+SkinIntell Cache Backends
+Storage for query_cache.py: per-process LRU or a SQLite file shared by every worker
+
+Both backends store values under (namespace, key) with a TTL and a per-namespace
+size limit. clear(namespace) is a single atomic generation bump: entries
+written under an older generation are never returned again and are deleted
+lazily. The SQLite backend keeps its own file (QUERY_CACHE_PATH, next to the
+app by default), separate from skinintel.db, so cache writes never compete with
+application writes, and any failure there is treated as a miss - the cache can
+slow down but never break a request. Values are stored as JSON, never pickled,
+so whoever can write that file can at worst poison cached data; values JSON
+can't represent faithfully are simply not cached.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+QUERY_CACHE_BACKEND = os.environ.get('QUERY_CACHE_BACKEND', 'local')  # 'local' or 'sqlite'
+QUERY_CACHE_PATH = os.environ.get('QUERY_CACHE_PATH',
+                                  os.path.join(os.path.dirname(os.path.abspath(__file__)), 'skinintel-cache.db'))
+TRIM_EVERY = 64  # sets per namespace between size/expiry trims of the shared cache
+
+MISS = object()
+
+TUPLE_TAG = '__tuple__'
+
+def _portable(value):
+    """A JSON-ready copy of a value: rows become dicts and tuples are tagged so they come back as tuples.
+
+    Raises TypeError for anything else JSON would change (non-string keys) or can't hold.
+    """
+    if isinstance(value, sqlite3.Row):
+        value = dict(value)
+    if isinstance(value, dict):
+        if not all(isinstance(key, str) for key in value) or TUPLE_TAG in value:
+            raise TypeError('only dicts with string keys can be cached')
+        return {key: _portable(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return {TUPLE_TAG: [_portable(item) for item in value]}
+    if isinstance(value, list):
+        return [_portable(item) for item in value]
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    raise TypeError(f'{type(value).__name__} values can\'t be cached')
+
+def _restore(obj):
+    return tuple(obj[TUPLE_TAG]) if len(obj) == 1 and TUPLE_TAG in obj else obj
+
+def dumps(value):
+    return json.dumps(_portable(value), separators=(',', ':'))
+
+def loads(text):
+    return json.loads(text, object_hook=_restore)
+
+# ============== IN-PROCESS ==============
+
+class LocalLRUBackend:
+    """Least-recently-used dicts per namespace, private to this process"""
+
+    def __init__(self):
+        self._namespaces = {}  # namespace -> OrderedDict key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, namespace, key):
+        with self._lock:
+            entries = self._namespaces.get(namespace)
+            entry = entries.get(key) if entries else None
+            if entry is None:
+                return MISS
+            if entry[0] <= time.monotonic():
+                del entries[key]
+                return MISS
+            entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, namespace, key, value, ttl, maxsize):
+        """Store a value; returns the number of entries evicted to stay within maxsize"""
+        with self._lock:
+            entries = self._namespaces.setdefault(namespace, OrderedDict())
+            entries[key] = (time.monotonic() + ttl, value)
+            entries.move_to_end(key)
+            evicted = 0
+            while len(entries) > maxsize:
+                entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def clear(self, namespace):
+        with self._lock:
+            self._namespaces.pop(namespace, None)
+
+    def size(self, namespace):
+        with self._lock:
+            return len(self._namespaces.get(namespace, ()))
+
+# ============== SHARED (SQLITE) ==============
+
+class SQLiteCacheBackend:
+    """Cache entries in a local SQLite file that every worker process reads and writes.
+
+    Eviction is oldest-first: entries in a namespace share one TTL, so the
+    earliest expiry is the oldest write. Reads never write, so a hit costs a
+    single primary-key lookup.
+    """
+
+    def __init__(self, path=QUERY_CACHE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._sets = {}
+        self._sets_lock = threading.Lock()
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                generation INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                value BLOB NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache_generations (
+                namespace TEXT PRIMARY KEY,
+                generation INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_entries_expiry ON cache_entries(namespace, expires_at)')
+
+    def _connection(self):
+        # One autocommit connection per thread, reopened after fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA synchronous = OFF')  # losing the tail of a cache on a crash is harmless
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, namespace, key):
+        try:
+            row = self._connection().execute('''
+                SELECT e.value FROM cache_entries e
+                LEFT JOIN cache_generations g ON g.namespace = e.namespace
+                WHERE e.namespace = ? AND e.key = ? AND e.expires_at > ?
+                  AND e.generation = COALESCE(g.generation, 0)
+            ''', (namespace, key, time.time())).fetchone()
+            return loads(row[0]) if row else MISS
+        except (sqlite3.Error, ValueError, TypeError):
+            return MISS
+
+    def set(self, namespace, key, value, ttl, maxsize):
+        """Store a value; returns the number of entries evicted to stay within maxsize"""
+        try:
+            conn = self._connection()
+            conn.execute('''
+                INSERT OR REPLACE INTO cache_entries (namespace, key, generation, expires_at, value)
+                VALUES (?, ?, COALESCE((SELECT generation FROM cache_generations WHERE namespace = ?), 0), ?, ?)
+            ''', (namespace, key, namespace, time.time() + ttl,
+                  dumps(value)))
+            with self._sets_lock:
+                self._sets[namespace] = self._sets.get(namespace, 0) + 1
+                due = self._sets[namespace] % TRIM_EVERY == 0 or maxsize <= TRIM_EVERY
+            return self._trim(conn, namespace, maxsize) if due else 0
+        except (sqlite3.Error, TypeError, ValueError):
+            return 0
+
+    def _trim(self, conn, namespace, maxsize):
+        """Drop expired and superseded entries, then the oldest beyond maxsize"""
+        conn.execute('''
+            DELETE FROM cache_entries WHERE namespace = ? AND (
+                expires_at <= ? OR generation != COALESCE((SELECT generation FROM cache_generations WHERE namespace = ?), 0)
+            )
+        ''', (namespace, time.time(), namespace))
+        return conn.execute('''
+            DELETE FROM cache_entries WHERE namespace = ? AND key IN (
+                SELECT key FROM cache_entries WHERE namespace = ?
+                ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+            )
+        ''', (namespace, namespace, maxsize)).rowcount
+
+    def clear(self, namespace):
+        try:
+            self._connection().execute('''
+                INSERT INTO cache_generations (namespace, generation) VALUES (?, 1)
+                ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1
+            ''', (namespace,))
+        except sqlite3.Error:
+            pass
+
+    def size(self, namespace):
+        try:
+            return self._connection().execute(
+                'SELECT COUNT(*) FROM cache_entries WHERE namespace = ?', (namespace,)
+            ).fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+BACKENDS = {'local': LocalLRUBackend, 'sqlite': SQLiteCacheBackend}
+
+def create_backend(name=QUERY_CACHE_BACKEND):
+    """Instantiate a backend by name ('local' or 'sqlite')"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown cache backend '{name}'; expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
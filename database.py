@@ -3,23 +3,251 @@ SkinIntell Database Module
 Handles SQLite database operations for Users, Products, Reviews, and ChatbotHistory
 """
 
+import json
+import os
+import pathlib
+import queue
+import random
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
+import archetypes
+import attributes
+import bitmap_index
+import facets
+import fuzzy
+import personalization
+import query_cache
+import user_stats
+
 DATABASE_NAME = 'skinintel.db'
 
-def get_db_connection():
-    """Create and return a database connection"""
-    conn = sqlite3.connect(DATABASE_NAME)
+# Optional split layout; off by default, when every table lives in DATABASE_NAME.
+# CATALOG_DATABASE holds Products, Reviews and ProductSimilarity and is read through
+# mode=ro connections. USER_DATABASES (comma-separated paths) hold Users in the first
+# file and each user's history, preferences and statistics in file user_id % N.
+CATALOG_DATABASE = os.environ.get('CATALOG_DATABASE') or None
+USER_DATABASES = [path.strip() for path in os.environ.get('USER_DATABASES', '').split(',') if path.strip()]
+
+# Prebuilt catalog (build_catalog.py). When set, the catalog is the artifact named by
+# <dir>/current.json, opened with immutable=1 and memory-mapped page reads; a newly
+# activated artifact is picked up within ARTIFACT_CHECK_INTERVAL seconds.
+CATALOG_ARTIFACT_DIR = os.environ.get('CATALOG_ARTIFACT_DIR') or None
+CATALOG_POINTER = 'current.json'
+ARTIFACT_CHECK_INTERVAL = 5
+CATALOG_MMAP_SIZE = int(os.environ.get('CATALOG_MMAP_SIZE', 256 * 1024 * 1024))
+
+# Idle read connections kept per database file, and threads used by run_query_batch()
+READ_POOL_SIZE = int(os.environ.get('DB_READ_POOL_SIZE', 8))
+QUERY_BATCH_WORKERS = int(os.environ.get('DB_BATCH_WORKERS', min(6, os.cpu_count() or 1)))
+
+# Rows pulled from the cursor per fetchmany() call when streaming exports
+EXPORT_BATCH_SIZE = 500
+
+# Stored in PRAGMA user_version; bump whenever init_db() gains a table, column or index
+SCHEMA_VERSION = 11
+
+# Tables whose changes are counted in TableVersions (by triggers) for cache validation
+VERSIONED_TABLES = ('Products', 'Reviews')
+# Everything the catalog version covers; tables rebuilt by batch jobs bump their own counter
+CATALOG_TABLES = VERSIONED_TABLES + ('ProductSimilarity', 'RecommendationPools')
+# Lookup and join tables for structured product attributes (attributes.py); only
+# ever written together with their Products rows, so the Products version covers them
+ATTRIBUTE_TABLES = ('Brands', 'ProductTypes', 'ProductConcerns')
+
+def get_db_connection(path=None):
+    """Create and return a database connection (to DATABASE_NAME unless a routed path is given)"""
+    conn = sqlite3.connect(path or DATABASE_NAME)
     conn.row_factory = sqlite3.Row
     return conn
 
-def init_db():
-    """Initialize the database with all required tables"""
-    conn = get_db_connection()
+# ============== DATABASE ROUTING ==============
+
+def catalog_database():
+    """File holding Products, Reviews, ProductSimilarity and their TableVersions"""
+    if CATALOG_ARTIFACT_DIR:
+        return _active_artifact()['path']
+    return CATALOG_DATABASE or DATABASE_NAME
+
+def account_database():
+    """File holding Users"""
+    return USER_DATABASES[0] if USER_DATABASES else DATABASE_NAME
+
+def user_database(user_id):
+    """File holding one user's history, preferences and statistics"""
+    if not USER_DATABASES:
+        return DATABASE_NAME
+    return USER_DATABASES[int(user_id) % len(USER_DATABASES)]
+
+def user_databases():
+    """Every file holding per-user rows"""
+    return list(dict.fromkeys(USER_DATABASES or [DATABASE_NAME]))
+
+def all_databases():
+    """Every distinct database file the app writes (a prebuilt catalog artifact is not one)"""
+    catalog = [] if CATALOG_ARTIFACT_DIR else [catalog_database()]
+    return list(dict.fromkeys([*catalog, account_database(), *user_databases()]))
+
+def catalog_reader():
+    """Borrow a pooled catalog connection; read-only (mode=ro) when the catalog has its own
+    file, and immutable when it is a prebuilt artifact"""
+    if CATALOG_ARTIFACT_DIR:
+        return read_connection(catalog_database(), readonly=True, immutable=True)
+    return read_connection(catalog_database(), readonly=CATALOG_DATABASE is not None)
+
+def _catalog_write_connection():
+    if CATALOG_ARTIFACT_DIR:
+        raise RuntimeError("The catalog is a prebuilt read-only artifact; rebuild it with build_catalog.py")
+    return get_db_connection(catalog_database())
+
+# ============== CATALOG ARTIFACT ==============
+
+_artifact = {'pointer': None, 'manifest': None, 'path': None, 'checked_at': 0.0}
+_artifact_lock = threading.Lock()
+
+def _active_artifact():
+    """Manifest of the active artifact, re-read when current.json has been replaced"""
+    with _artifact_lock:
+        now = time.monotonic()
+        if _artifact['path'] and now - _artifact['checked_at'] < ARTIFACT_CHECK_INTERVAL:
+            return _artifact
+        _artifact['checked_at'] = now
+        
+        pointer = os.path.join(CATALOG_ARTIFACT_DIR, CATALOG_POINTER)
+        stat = os.stat(pointer)
+        if (stat.st_ino, stat.st_mtime_ns) != _artifact['pointer']:
+            with open(pointer) as f:
+                manifest = json.load(f)
+            path = os.path.join(CATALOG_ARTIFACT_DIR, manifest['file'])
+            if os.path.getsize(path) != manifest['size']:
+                raise RuntimeError(f"Catalog artifact {path} does not match {pointer}")
+            previous = _artifact['path']
+            _artifact.update(pointer=(stat.st_ino, stat.st_mtime_ns), manifest=manifest, path=path)
+            if previous and previous != path:
+                close_read_connections(previous)
+        return _artifact
+
+def get_catalog_artifact():
+    """Manifest (version, checksum, counts) of the active catalog artifact, or None"""
+    return dict(_active_artifact()['manifest']) if CATALOG_ARTIFACT_DIR else None
+
+# ============== READ CONNECTION POOL ==============
+
+_read_pools = {}
+_batch_executor = None
+_pool_lock = threading.Lock()
+_pool_pid = os.getpid()
+
+def _reset_after_fork():
+    """Drop pools and threads inherited from a parent process (gunicorn --preload)"""
+    global _read_pools, _batch_executor, _pool_pid
+    if _pool_pid != os.getpid():
+        _read_pools = {}
+        _batch_executor = None
+        _pool_pid = os.getpid()
+
+@contextmanager
+def read_connection(path=None, readonly=False, immutable=False):
+    """Borrow a pooled read-only-use connection for `path` (default DATABASE_NAME).
+
+    The connection goes back to the pool afterwards instead of being closed,
+    so reads skip the connect/close cost. It may be used from any thread,
+    but only by one borrower at a time. With readonly the file is opened
+    with mode=ro, so SQLite refuses any write through it, and read through
+    mmap; immutable additionally skips all locking and change detection, for
+    files that are never modified.
+    """
+    path = path or DATABASE_NAME
+    with _pool_lock:
+        _reset_after_fork()
+        pool = _read_pools.setdefault((path, readonly, immutable), queue.LifoQueue(maxsize=READ_POOL_SIZE))
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        if readonly:
+            uri = pathlib.Path(path).absolute().as_uri() + ('?mode=ro&immutable=1' if immutable else '?mode=ro')
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.execute(f'PRAGMA mmap_size = {CATALOG_MMAP_SIZE}')
+        else:
+            conn = sqlite3.connect(path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+    finally:
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+def close_read_connections(path=None):
+    """Close every idle pooled connection, or only those for `path` (e.g. once a file is replaced)"""
+    with _pool_lock:
+        keys = [key for key in _read_pools if path is None or key[0] == path]
+        pools = [_read_pools.pop(key) for key in keys]
+    for pool in pools:
+        while True:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+def run_query_batch(*calls):
+    """Run independent read functions concurrently and return their results in order.
+
+    Each call is a function, or a (function, args) or (function, args, kwargs) tuple.
+    The functions run on a shared thread pool and each borrows its own pooled
+    connection; SQLite releases the GIL while a query runs, so scans overlap.
+    With a single worker (one CPU) the calls simply run in order on this thread.
+    """
+    global _batch_executor
+    calls = [(call,) if callable(call) else call for call in calls]
+    if QUERY_BATCH_WORKERS <= 1:
+        return [_run_call(call) for call in calls]
+    
+    with _pool_lock:
+        _reset_after_fork()
+        if _batch_executor is None:
+            _batch_executor = ThreadPoolExecutor(max_workers=QUERY_BATCH_WORKERS, thread_name_prefix='skinintel-batch')
+        executor = _batch_executor
+    
+    futures = [executor.submit(_run_call, call) for call in calls]
+    return [future.result() for future in futures]
+
+def _run_call(call):
+    func, args, kwargs = call[0], call[1] if len(call) > 1 else (), call[2] if len(call) > 2 else {}
+    return func(*args, **kwargs)
+
+def get_schema_version(conn):
+    """Get the schema version stamped on the database file"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def init_db(force=False):
+    """Initialize every database file in the layout with all required tables.
+
+    Each file carries the full schema (a table is only used in its home file,
+    see DATABASE ROUTING). Skips all DDL for files already stamped with
+    SCHEMA_VERSION. Returns True if the schema was (re)applied to any file.
+    """
+    applied = [_init_file(path, force) for path in all_databases()]
+    return any(applied)
+
+def _init_file(path, force):
+    conn = get_db_connection(path)
+    if not force and get_schema_version(conn) == SCHEMA_VERSION:
+        conn.close()
+        return False
+    
     cursor = conn.cursor()
     
+    # Let retention.py hand freed pages back with incremental VACUUM. Takes effect
+    # immediately on a new file; an existing file is converted by the VACUUM below.
+    cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    
     # Users table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS Users (
@@ -49,14 +277,49 @@ def init_db():
     ''')
     
     # Migration: Add vegan/cruelty_free columns if they don't exist (for existing DBs)
-    try:
+    product_columns = {row['name'] for row in cursor.execute('PRAGMA table_info(Products)')}
+    if 'vegan' not in product_columns:
         cursor.execute('ALTER TABLE Products ADD COLUMN vegan BOOLEAN DEFAULT 0')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    try:
+    if 'cruelty_free' not in product_columns:
         cursor.execute('ALTER TABLE Products ADD COLUMN cruelty_free BOOLEAN DEFAULT 0')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
+    
+    # Review summary columns kept by the Reviews triggers below (facets, rating sort)
+    backfill_ratings = 'review_count' not in product_columns
+    if backfill_ratings:
+        cursor.execute('ALTER TABLE Products ADD COLUMN review_count INTEGER NOT NULL DEFAULT 0')
+        cursor.execute('ALTER TABLE Products ADD COLUMN avg_rating REAL')
+    
+    # Structured attributes stored at ingest (attributes.py); older rows are parsed once below
+    backfill_attributes = 'brand_id' not in product_columns
+    if backfill_attributes:
+        for column in ('brand_id INTEGER', 'product_type_id INTEGER', 'variant TEXT',
+                       'target_skin_type TEXT', 'target_hair_type TEXT'):
+            cursor.execute(f'ALTER TABLE Products ADD COLUMN {column}')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Brands (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ProductTypes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            category TEXT
+        )
+    ''')
+    
+    # ProductConcerns: one row per concern a product addresses (attributes.CONCERN_KEYWORDS)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ProductConcerns (
+            concern TEXT NOT NULL,
+            product_id INTEGER NOT NULL,
+            PRIMARY KEY (concern, product_id),
+            FOREIGN KEY (product_id) REFERENCES Products(id)
+        ) WITHOUT ROWID
+    ''')
     
     # Reviews table
     cursor.execute('''
@@ -93,15 +356,259 @@ def init_db():
         )
     ''')
     
+    # ProductSimilarity: top-K neighbours per product, rebuilt offline by similarity.py
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ProductSimilarity (
+            product_id INTEGER NOT NULL,
+            rank INTEGER NOT NULL,
+            similar_id INTEGER NOT NULL,
+            score REAL,
+            PRIMARY KEY (product_id, rank)
+        ) WITHOUT ROWID
+    ''')
+    
+    # RecommendationPools: ranked candidate ids per profile archetype, rebuilt offline by archetypes.py
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS RecommendationPools (
+            archetype TEXT PRIMARY KEY,
+            product_ids BLOB NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    
+    # UserPreferences: decayed preference profile per user, updated as history rows are written
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS UserPreferences (
+            user_id INTEGER PRIMARY KEY,
+            profile TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES Users(id)
+        )
+    ''')
+    
+    # Search sort orders (SORT_MODES), plain and within a category
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_category ON Products(category)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_price ON Products(price)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_rating ON Products(avg_rating, review_count)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_category_price ON Products(category, price)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_category_rating ON Products(category, avg_rating, review_count)')
+    
+    # Attribute equality lookups (recommendations) and per-product concern rewrites
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_brand ON Products(brand_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_type ON Products(product_type_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_skin_type ON Products(target_skin_type)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_hair_type ON Products(target_hair_type)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_product_concerns_product ON ProductConcerns(product_id)')
+    if backfill_attributes:
+        attributes.backfill(conn)
+    
+    # Reviews are always looked up by product
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reviews_product ON Reviews(product_id)')
+    
+    # Products.review_count / avg_rating follow every review change
+    summarise = '''
+        UPDATE Products SET
+            review_count = (SELECT COUNT(*) FROM Reviews WHERE product_id = {ref}.product_id),
+            avg_rating = (SELECT ROUND(AVG(rating), 2) FROM Reviews WHERE product_id = {ref}.product_id)
+        WHERE id = {ref}.product_id;
+    '''
+    for event, refs in (('INSERT', ('NEW',)), ('DELETE', ('OLD',)), ('UPDATE', ('OLD', 'NEW'))):
+        body = ''.join(summarise.format(ref=ref) for ref in refs)
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS Reviews_{event.lower()}_summary AFTER {event} ON Reviews BEGIN {body} END')
+    if backfill_ratings:
+        cursor.execute('''
+            UPDATE Products SET
+                review_count = (SELECT COUNT(*) FROM Reviews WHERE product_id = Products.id),
+                avg_rating = (SELECT ROUND(AVG(rating), 2) FROM Reviews WHERE product_id = Products.id)
+        ''')
+    
+    # History is read and capped per user
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_chatbot_history_user ON ChatbotHistory(user_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_search_history_user ON SearchHistory(user_id)')
+    
+    # HistoryRollups: per-user daily counts of history rows removed by retention.py
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS HistoryRollups (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, day, kind)
+        ) WITHOUT ROWID
+    ''')
+    
+    # HistoryTotals: lifetime per-user counts and first/last activity, kept by triggers
+    # so retention never changes them
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS HistoryTotals (
+            user_id INTEGER PRIMARY KEY,
+            chatbot_queries INTEGER NOT NULL DEFAULT 0,
+            searches INTEGER NOT NULL DEFAULT 0,
+            first_activity TIMESTAMP,
+            last_activity TIMESTAMP
+        )
+    ''')
+    totals_columns = {row['name'] for row in cursor.execute('PRAGMA table_info(HistoryTotals)')}
+    for column in ('first_activity', 'last_activity'):
+        if column not in totals_columns:
+            cursor.execute(f'ALTER TABLE HistoryTotals ADD COLUMN {column} TIMESTAMP')
+    for table, column in (('ChatbotHistory', 'chatbot_queries'), ('SearchHistory', 'searches')):
+        cursor.execute(f'DROP TRIGGER IF EXISTS {table}_insert_total')
+        cursor.execute(f'''
+            CREATE TRIGGER {table}_insert_total AFTER INSERT ON {table}
+            WHEN NEW.user_id IS NOT NULL
+            BEGIN
+                INSERT INTO HistoryTotals (user_id, {column}, first_activity, last_activity)
+                VALUES (NEW.user_id, 1, NEW.timestamp, NEW.timestamp)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    {column} = {column} + 1,
+                    first_activity = COALESCE(first_activity, excluded.first_activity),
+                    last_activity = excluded.last_activity;
+            END
+        ''')
+    
+    # Per-user breakdowns maintained by user_stats.py on each history write
+    has_breakdowns = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'UserSearchTermCounts'"
+    ).fetchone()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS UserQueryTypeCounts (
+            user_id INTEGER NOT NULL,
+            query_type TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, query_type)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS UserSearchTermCounts (
+            user_id INTEGER NOT NULL,
+            term TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, term)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_search_term_counts_top ON UserSearchTermCounts(user_id, count DESC)')
+    if not has_breakdowns:
+        # First run on an existing file: count the history already there
+        user_stats.backfill(conn)
+    
+    # WAL lets long reads (streaming exports) run alongside history writes
+    cursor.execute('PRAGMA journal_mode = WAL')
+    
+    # TableVersions: change counters bumped by triggers, used to validate caches (ETags).
+    # Counters start at a random value so a rebuilt database never reuses old versions.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS TableVersions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    for table in CATALOG_TABLES:
+        cursor.execute(
+            'INSERT OR IGNORE INTO TableVersions (table_name, version) VALUES (?, abs(random() % 1000000000))',
+            (table,)
+        )
+    for table in VERSIONED_TABLES:
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_version AFTER {event} ON {table}
+                BEGIN
+                    UPDATE TableVersions SET version = version + 1 WHERE table_name = '{table}';
+                END
+            ''')
+    
+    cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    
     conn.commit()
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        # Existing file created before incremental auto_vacuum: rebuild once to switch modes
+        conn.execute('VACUUM')
     conn.close()
     print("Database initialized successfully!")
+    return True
+
+# ============== TABLE VERSIONS ==============
+
+def get_table_versions(*tables):
+    """Get the change counters for the given tables"""
+    placeholders = ', '.join('?' * len(tables))
+    with catalog_reader() as conn:
+        rows = conn.execute(
+            f'SELECT table_name, version FROM TableVersions WHERE table_name IN ({placeholders})',
+            tables
+        ).fetchall()
+    return {row['table_name']: row['version'] for row in rows}
+
+def get_catalog_version():
+    """Version string that changes whenever any catalog table changes"""
+    versions = get_table_versions(*CATALOG_TABLES)
+    return '.'.join(str(versions.get(table, 0)) for table in CATALOG_TABLES)
+
+def bump_table_version(cursor, table):
+    """Mark a table as changed; for tables rewritten in bulk instead of tracked by triggers"""
+    cursor.execute('UPDATE TableVersions SET version = version + 1 WHERE table_name = ?', (table,))
+
+# Memoized catalog reads (query_cache.py) are validated against these counters
+query_cache.set_version_source(lambda: get_table_versions(*CATALOG_TABLES))
+
+# ============== BITMAP INDEX ==============
+
+def get_bitmap_index():
+    """Bitsets over the catalog's flags, categories, price bands, ratings and attributes (bitmap_index.py).
+
+    Rebuilt on the first call after Products changes, detected the same way as
+    for memoized reads.
+    """
+    version = (catalog_database(), *query_cache.current_versions(('Products',)))
+    return bitmap_index.get_index(version, _bitmap_rows)
+
+def _bitmap_rows():
+    with catalog_reader() as conn:
+        concerns = {}
+        for product_id, concern in conn.execute('SELECT product_id, concern FROM ProductConcerns'):
+            concerns.setdefault(product_id, []).append(concern)
+        return [(*row, tuple(concerns.get(row[0], ()))) for row in conn.execute(f'''
+            SELECT id, category, vegan, cruelty_free, {facets.price_band_sql()}, CAST(avg_rating AS INTEGER),
+                   target_skin_type, target_hair_type
+            FROM Products
+        ''')]
+
+def get_products_by_ids(product_ids):
+    """Products for a list of ids, in the same order (missing ids are skipped)"""
+    if not product_ids:
+        return []
+    placeholders = ', '.join('?' * len(product_ids))
+    with catalog_reader() as conn:
+        rows = conn.execute(f'SELECT * FROM Products WHERE id IN ({placeholders})', list(product_ids)).fetchall()
+    by_id = {row['id']: row for row in rows}
+    return [by_id[product_id] for product_id in product_ids if product_id in by_id]
+
+def sample_products(limit, vegan=None, cruelty_free=None):
+    """Random products matching the vegan/cruelty-free filters, drawn from the bitmap index"""
+    index = get_bitmap_index()
+    return get_products_by_ids(bitmap_index.sample_ids(index.match(vegan=vegan, cruelty_free=cruelty_free), limit))
+
+# ============== FUZZY SEARCH ==============
+
+def get_fuzzy_index():
+    """Trigram index over the words in product names (fuzzy.py), refreshed as the catalog changes"""
+    version = (catalog_database(), *query_cache.current_versions(('Products',)))
+    return fuzzy.get_index(version, _vocabulary_rows)
+
+def _vocabulary_rows():
+    with catalog_reader() as conn:
+        return conn.execute('SELECT name, COUNT(*) FROM Products GROUP BY name').fetchall()
+
+def expand_search_term(search_term):
+    """Typo-corrected search term followed by its synonym alternatives, for search_products()"""
+    if not search_term.strip():
+        return ()
+    return get_fuzzy_index().expand(search_term)
 
 # ============== USER OPERATIONS ==============
 
 def create_user(username, email, password, skin_type=None, hair_type=None, issues=None, goal=None):
     """Create a new user with hashed password"""
-    conn = get_db_connection()
+    conn = get_db_connection(account_database())
     cursor = conn.cursor()
     
     hashed_password = generate_password_hash(password)
@@ -121,17 +628,13 @@ def create_user(username, email, password, skin_type=None, hair_type=None, issue
 
 def get_user_by_email(email):
     """Get user by email address"""
-    conn = get_db_connection()
-    user = conn.execute('SELECT * FROM Users WHERE email = ?', (email,)).fetchone()
-    conn.close()
-    return user
+    with read_connection(account_database()) as conn:
+        return conn.execute('SELECT * FROM Users WHERE email = ?', (email,)).fetchone()
 
 def get_user_by_id(user_id):
     """Get user by ID"""
-    conn = get_db_connection()
-    user = conn.execute('SELECT * FROM Users WHERE id = ?', (user_id,)).fetchone()
-    conn.close()
-    return user
+    with read_connection(account_database()) as conn:
+        return conn.execute('SELECT * FROM Users WHERE id = ?', (user_id,)).fetchone()
 
 def verify_user(email, password):
     """Verify user credentials"""
@@ -142,7 +645,7 @@ def verify_user(email, password):
 
 def update_user_profile(user_id, skin_type=None, hair_type=None, issues=None, goal=None):
     """Update user profile information"""
-    conn = get_db_connection()
+    conn = get_db_connection(account_database())
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -156,80 +659,204 @@ def update_user_profile(user_id, skin_type=None, hair_type=None, issues=None, go
 
 # ============== PRODUCT OPERATIONS ==============
 
-def add_product(name, price, category, description, vegan=0, cruelty_free=0):
-    """Add a new product"""
-    conn = get_db_connection()
+def add_product(name, price, category, description, vegan=0, cruelty_free=0, brand=None, product_type=None,
+                variant=None, benefit=None):
+    """Add a new product with its structured attributes.
+
+    When none are given they are parsed from the name and description, as
+    attributes.backfill() does for older catalogs, so the recommender can match it.
+    """
+    conn = _catalog_write_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
         INSERT INTO Products (name, price, category, description, vegan, cruelty_free)
         VALUES (?, ?, ?, ?, ?, ?)
     ''', (name, price, category, description, vegan, cruelty_free))
+    product_id = cursor.lastrowid  # before attributes.store() inserts into the lookup tables
+    if brand or product_type or variant or benefit:
+        attrs = attributes.describe(brand, product_type, category, variant, benefit)
+    else:
+        attrs = attributes.default_parser().parse(name, description, category)
+    attributes.store(cursor, product_id, attrs)
     
     conn.commit()
-    product_id = cursor.lastrowid
+    query_cache.invalidate()
     conn.close()
     return product_id
 
+@query_cache.memoize('Products', maxsize=4096, ttl=600)
 def get_product_by_id(product_id):
     """Get product by ID"""
-    conn = get_db_connection()
-    product = conn.execute('SELECT * FROM Products WHERE id = ?', (product_id,)).fetchone()
-    conn.close()
-    return product
+    with catalog_reader() as conn:
+        return conn.execute('SELECT * FROM Products WHERE id = ?', (product_id,)).fetchone()
 
-def search_products(search_term, category=None, limit=20, offset=0, vegan=None, cruelty_free=None):
-    """Search products by name or description, with optional vegan/cruelty-free filters"""
-    conn = get_db_connection()
-    
-    query = 'SELECT * FROM Products WHERE (name LIKE ? OR description LIKE ?)'
-    params = [f'%{search_term}%', f'%{search_term}%']
+def _product_filters(search_term, category=None, vegan=None, cruelty_free=None, min_price=None, max_price=None,
+                     price_index=True):
+    """Build the WHERE clause and params shared by product search and export.
+
+    search_term may be a tuple of alternative terms (expand_search_term), any of
+    which may match. price_index=False writes the price range as +price, which
+    stops SQLite from using it to pick an index (see _find_products).
+    """
+    where, params = '1', []
+    terms = [term for term in ((search_term,) if isinstance(search_term, str) else search_term or ()) if term]
+    if terms:
+        where = '(' + ' OR '.join(['name LIKE ? OR description LIKE ?'] * len(terms)) + ')'
+        params = [f'%{term}%' for term in terms for _ in range(2)]
     
     if category and category != 'all':
-        query += ' AND category = ?'
+        where += ' AND category = ?'
         params.append(category)
     
     if vegan:
-        query += ' AND vegan = 1'
+        where += ' AND vegan = 1'
     if cruelty_free:
-        query += ' AND cruelty_free = 1'
+        where += ' AND cruelty_free = 1'
     
-    query += ' LIMIT ? OFFSET ?'
-    params.extend([limit, offset])
+    price = 'price' if price_index else '+price'
+    if min_price is not None:
+        where += f' AND {price} >= ?'
+        params.append(min_price)
+    if max_price is not None:
+        where += f' AND {price} <= ?'
+        params.append(max_price)
     
-    products = conn.execute(query, params).fetchall()
-    conn.close()
-    return products
+    return where, params
+
+# Sort mode -> ORDER BY. Each explicit order is served by an index (price, rating,
+# rowid; category-prefixed for category searches), so a page is read off the index
+# in order and LIMIT stops the scan early instead of sorting every match.
+SORT_MODES = {
+    'relevance': 'id',  # catalog order, re-ranked by the user's profile (see search_products)
+    'price_asc': 'price, id',
+    'price_desc': 'price DESC, id DESC',
+    'rating': 'avg_rating DESC, review_count DESC, id DESC',
+    'newest': 'id DESC',
+}
+# A price range wider than this many products is filtered while walking the sort
+# order's index, instead of read through the price index and sorted in full
+PRICE_RANGE_SORT_LIMIT = 2000
+
+def search_products(search_term, category=None, limit=20, offset=0, vegan=None, cruelty_free=None, user_id=None,
+                    min_price=None, max_price=None, sort='relevance'):
+    """Search products by name or description, with optional vegan/cruelty-free and price filters.
+
+    search_term is a string or a tuple of alternatives from expand_search_term().
+
+    sort is one of SORT_MODES. For relevance, with user_id, pages within the
+    first RERANK_WINDOW rows are re-ranked by the user's preference profile.
+    """
+    if sort not in SORT_MODES:
+        raise ValueError(f"Unknown sort '{sort}'; expected one of {sorted(SORT_MODES)}")
+    filters = (search_term, category, vegan, cruelty_free, min_price, max_price, sort)
+    profile = get_user_profile(user_id) if sort == 'relevance' else personalization.EMPTY_PROFILE
+    window = personalization.RERANK_WINDOW
+    if not profile.signature or offset + limit > window:
+        return _find_products(*filters, limit, offset)
+    
+    candidates = _find_products(*filters, window, 0)
+    return personalization.rerank(candidates, profile)[offset:offset + limit]
+
+@query_cache.memoize('Products', maxsize=2048, ttl=300)
+def _find_products(search_term, category, vegan, cruelty_free, min_price, max_price, sort, limit, offset):
+    """One page of unpersonalized search results (shared through the query cache)"""
+    has_range = min_price is not None or max_price is not None
+    with catalog_reader() as conn:
+        # SQLite can't tell a wide price range from a narrow one, and always prefers
+        # the range; counting it on the price index is cheap next to a full sort
+        price_index = True
+        if has_range and not sort.startswith('price'):
+            in_range = conn.execute(
+                'SELECT COUNT(*) FROM Products WHERE price >= ? AND price <= ?',
+                (min_price if min_price is not None else float('-inf'),
+                 max_price if max_price is not None else float('inf'))
+            ).fetchone()[0]
+            price_index = in_range <= PRICE_RANGE_SORT_LIMIT
+        
+        where, params = _product_filters(search_term, category, vegan, cruelty_free, min_price, max_price, price_index)
+        query = f'SELECT * FROM Products WHERE {where} ORDER BY {SORT_MODES[sort]} LIMIT ? OFFSET ?'
+        params.extend([limit, offset])
+        return conn.execute(query, params).fetchall()
+
+@query_cache.memoize('Products', maxsize=2048, ttl=300)
+def get_search_facets(search_term, category=None, vegan=None, cruelty_free=None, min_price=None, max_price=None):
+    """Category, vegan, cruelty-free, price band and rating counts for every product a search matches"""
+    if not search_term and min_price is None and max_price is None:
+        index = get_bitmap_index()
+        return facets.count_bitmaps(index, index.match(category, vegan, cruelty_free))
+    
+    where, params = _product_filters(search_term, category, vegan, cruelty_free, min_price, max_price)
+    with catalog_reader() as conn:
+        rows = conn.execute(facets.facet_query(where), params).fetchall()
+    return facets.fold(rows)
 
+def iter_products(search_term='', category=None, vegan=None, cruelty_free=None, include_reviews=False,
+                  batch_size=EXPORT_BATCH_SIZE):
+    """Yield every matching product as a dict, reading the cursor in fetchmany() batches.
+
+    Memory use is bounded by batch_size however many rows match. Products
+    carry their trigger-maintained review_count and avg_rating only with
+    include_reviews.
+    """
+    where, params = _product_filters(search_term, category, vegan, cruelty_free)
+    query = f'SELECT p.* FROM Products p WHERE {where} ORDER BY p.id'
+    dropped = () if include_reviews else ('review_count', 'avg_rating')
+    
+    with catalog_reader() as conn:
+        cursor = conn.execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    product = dict(row)
+                    for column in dropped:
+                        del product[column]
+                    yield product
+        finally:
+            cursor.close()
+
+@query_cache.memoize('Products', maxsize=64, ttl=600)
 def get_products_by_category(category, limit=20):
     """Get products by category"""
-    conn = get_db_connection()
-    products = conn.execute(
-        'SELECT * FROM Products WHERE category = ? LIMIT ?',
-        (category, limit)
-    ).fetchall()
-    conn.close()
-    return products
+    with catalog_reader() as conn:
+        return conn.execute(
+            'SELECT * FROM Products WHERE category = ? LIMIT ?',
+            (category, limit)
+        ).fetchall()
 
+@query_cache.memoize('Products', maxsize=1, ttl=600)
 def get_product_count():
     """Get total number of products"""
-    conn = get_db_connection()
-    count = conn.execute('SELECT COUNT(*) FROM Products').fetchone()[0]
-    conn.close()
-    return count
+    with catalog_reader() as conn:
+        return conn.execute('SELECT COUNT(*) FROM Products').fetchone()[0]
 
+@query_cache.memoize('Products', maxsize=1, ttl=600)
 def get_all_categories():
     """Get all unique product categories"""
-    conn = get_db_connection()
-    categories = conn.execute('SELECT DISTINCT category FROM Products').fetchall()
-    conn.close()
+    with catalog_reader() as conn:
+        categories = conn.execute('SELECT DISTINCT category FROM Products').fetchall()
     return [cat['category'] for cat in categories if cat['category']]
 
+@query_cache.memoize('Products', 'ProductSimilarity', maxsize=4096, ttl=600)
+def get_similar_products(product_id, limit=10):
+    """Get the precomputed most similar products, best match first"""
+    with catalog_reader() as conn:
+        return conn.execute('''
+            SELECT p.*, s.score AS similarity
+            FROM ProductSimilarity s JOIN Products p ON p.id = s.similar_id
+            WHERE s.product_id = ?
+            ORDER BY s.rank
+            LIMIT ?
+        ''', (product_id, limit)).fetchall()
+
 # ============== REVIEW OPERATIONS ==============
 
 def add_review(product_id, source, review_text, rating=5):
     """Add a review for a product"""
-    conn = get_db_connection()
+    conn = _catalog_write_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -238,31 +865,36 @@ def add_review(product_id, source, review_text, rating=5):
     ''', (product_id, source, review_text, rating))
     
     conn.commit()
+    query_cache.invalidate()
     review_id = cursor.lastrowid
     conn.close()
     return review_id
 
+@query_cache.memoize('Reviews', maxsize=4096, ttl=600)
 def get_reviews_for_product(product_id, limit=10):
     """Get reviews for a specific product"""
-    conn = get_db_connection()
-    reviews = conn.execute(
-        'SELECT * FROM Reviews WHERE product_id = ? LIMIT ?',
-        (product_id, limit)
-    ).fetchall()
-    conn.close()
-    return reviews
+    with catalog_reader() as conn:
+        return conn.execute(
+            'SELECT * FROM Reviews WHERE product_id = ? LIMIT ?',
+            (product_id, limit)
+        ).fetchall()
 
 # ============== CHATBOT HISTORY OPERATIONS ==============
 
-def save_chatbot_query(user_id, query, response):
-    """Save a chatbot interaction"""
-    conn = get_db_connection()
+def save_chatbot_query(user_id, query, response, query_type=None):
+    """Save a chatbot interaction, count it and fold it into the user's preference profile.
+
+    query_type defaults to the 'Type:' recorded in the query string.
+    """
+    conn = get_db_connection(user_database(user_id))
     cursor = conn.cursor()
     
     cursor.execute('''
         INSERT INTO ChatbotHistory (user_id, query, response)
         VALUES (?, ?, ?)
     ''', (user_id, query, response))
+    user_stats.record_chatbot_query(conn, user_id, query_type or user_stats.parse_query_type(query))
+    personalization.record_signal(conn, user_id, personalization.chatbot_signal(query))
     
     conn.commit()
     history_id = cursor.lastrowid
@@ -271,127 +903,139 @@ def save_chatbot_query(user_id, query, response):
 
 def get_user_chatbot_history(user_id, limit=10):
     """Get chatbot history for a user"""
-    conn = get_db_connection()
-    history = conn.execute(
-        'SELECT * FROM ChatbotHistory WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?',
-        (user_id, limit)
-    ).fetchall()
-    conn.close()
-    return history
+    with read_connection(user_database(user_id)) as conn:
+        return conn.execute(
+            'SELECT * FROM ChatbotHistory WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?',
+            (user_id, limit)
+        ).fetchall()
 
 # ============== SEARCH HISTORY OPERATIONS ==============
 
-def save_search_history(user_id, search_term):
-    """Save a product search"""
-    conn = get_db_connection()
+def save_search_history(user_id, search_term, category=None, vegan=None, cruelty_free=None):
+    """Save a product search, count it and fold it (with its filters) into the user's preference profile"""
+    conn = get_db_connection(user_database(user_id))
     cursor = conn.cursor()
     
     cursor.execute('''
         INSERT INTO SearchHistory (user_id, search_term)
         VALUES (?, ?)
     ''', (user_id, search_term))
+    user_stats.record_search(conn, user_id, search_term)
+    personalization.record_signal(
+        conn, user_id, personalization.search_signal(search_term, category, vegan, cruelty_free)
+    )
     
     conn.commit()
     conn.close()
 
 def get_user_search_history(user_id, limit=10):
     """Get search history for a user"""
-    conn = get_db_connection()
-    history = conn.execute(
-        'SELECT * FROM SearchHistory WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?',
-        (user_id, limit)
-    ).fetchall()
-    conn.close()
-    return history
+    with read_connection(user_database(user_id)) as conn:
+        return conn.execute(
+            'SELECT * FROM SearchHistory WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?',
+            (user_id, limit)
+        ).fetchall()
+
+# ============== USER PREFERENCES ==============
+
+def _load_user_preferences(user_id):
+    with read_connection(user_database(user_id)) as conn:
+        row = conn.execute('SELECT profile FROM UserPreferences WHERE user_id = ?', (user_id,)).fetchone()
+    return row['profile'] if row else None
+
+def get_user_profile(user_id):
+    """Get the compact (cached) preference profile used for personalized ranking"""
+    return personalization.get_profile(user_id, _load_user_preferences)
+
+# ============== USER STATISTICS ==============
+
+def get_user_stats(user_id):
+    """Get a user's activity counters (see user_stats.py); a few primary-key reads"""
+    with read_connection(user_database(user_id)) as conn:
+        return user_stats.get_user_stats(conn, user_id)
 
 # ============== AI RECOMMENDATION ENGINE ==============
 
-def get_recommended_products(skin_type=None, hair_type=None, issues=None, goal=None, limit=5, vegan=None, cruelty_free=None):
+# Seconds a user's chatbot recommendations are reused for an unchanged profile (recommend_products)
+RECOMMENDATION_TTL = 60
+
+def get_recommended_products(skin_type=None, hair_type=None, issues=None, goal=None, limit=5, vegan=None, cruelty_free=None,
+                             user_id=None):
     """
-    Rule-based recommendation engine with category enforcement
+    Attribute-matching recommendation engine
+    Matches the profile's skin type, hair type and the concerns named in its issues and goal
+    against each product's stored attributes (attributes.py), by equality on the bitmap index
     Supports optional vegan/cruelty-free filtering
+    With user_id, picks the best personal matches from a larger random candidate pool
     """
-    conn = get_db_connection()
+    return _match_products(*_profile_key(skin_type, hair_type, issues, goal), limit, bool(vegan), bool(cruelty_free),
+                           user_id)
+
+def _profile_key(skin_type, hair_type, issues, goal):
+    """(skin type, hair type, concerns) normalized to the stored attribute values"""
+    return (attributes.normalise_skin_type(skin_type), attributes.normalise_hair_type(hair_type),
+            attributes.concerns_in(f"{issues or ''} {goal or ''}"))
+
+def _match_products(skin, hair, concerns, limit, vegan, cruelty_free, user_id):
+    index = get_bitmap_index()
+    allowed = index.match(vegan=vegan, cruelty_free=cruelty_free)
     
-    conditions = []
-    params = []
+    # Products made for the skin or hair type (or for every type), or addressing a concern
+    wanted = 0
+    if skin:
+        wanted |= index.any_of('skin_type', (skin, 'all'))
+    if hair:
+        wanted |= index.any_of('hair_type', (hair, 'all'))
+    wanted |= index.any_of('concern', concerns)
     
-    # Build vegan/cruelty-free filter clause
-    vcf_filters = []
-    if vegan:
-        vcf_filters.append('vegan = 1')
-    if cruelty_free:
-        vcf_filters.append('cruelty_free = 1')
-    vcf_clause = (' AND ' + ' AND '.join(vcf_filters)) if vcf_filters else ''
-    
-    # 1. Skin Type matches -> Strictly Skincare products
-    if skin_type:
-        term = skin_type.lower().strip()
-        conditions.append("""
-            (category IN ('Skincare', 'Face', 'Body', 'Moisturizers', 'Cleansers', 'Treatments') 
-             AND (LOWER(name) LIKE ? OR LOWER(description) LIKE ?))
-        """)
-        params.extend([f'%{term}%', f'%{term}%'])
-
-    # 2. Hair Type matches -> Strictly Haircare products
-    if hair_type:
-        term = hair_type.lower().strip()
-        conditions.append("""
-            (category IN ('Haircare', 'Shampoo', 'Conditioner', 'Styling') 
-             AND (LOWER(name) LIKE ? OR LOWER(description) LIKE ?))
-        """)
-        params.extend([f'%{term}%', f'%{term}%'])
-        
-    # 3. Handle Issues and Goals (General terms)
-    general_terms = []
-    if issues: general_terms.extend(issues.lower().split(','))
-    if goal: general_terms.extend(goal.lower().split())
-    general_terms = [t.strip() for t in general_terms if t.strip()]
-
-    for term in general_terms:
-        # Heuristic: Detect category intent in the text
-        if 'hair' in term or 'scalp' in term or 'frizz' in term or 'curl' in term:
-             # Force Haircare
-             conditions.append("""
-                (category IN ('Haircare', 'Shampoo', 'Conditioner', 'Styling') 
-                 AND (LOWER(name) LIKE ? OR LOWER(description) LIKE ?))
-             """)
-             params.extend([f'%{term}%', f'%{term}%'])
-             
-        elif 'skin' in term or 'face' in term or 'acne' in term or 'wrinkle' in term or 'pimple' in term:
-             # Force Skincare
-             conditions.append("""
-                (category IN ('Skincare', 'Face', 'Body', 'Moisturizers', 'Cleansers', 'Treatments') 
-                 AND (LOWER(name) LIKE ? OR LOWER(description) LIKE ?))
-             """)
-             params.extend([f'%{term}%', f'%{term}%'])
-             
-        else:
-             # Neutral term - search everywhere
-             conditions.append("(LOWER(name) LIKE ? OR LOWER(description) LIKE ? OR LOWER(category) LIKE ?)")
-             params.extend([f'%{term}%', f'%{term}%', f'%{term}%'])
-
-    if not conditions:
+    # Personalized: draw extra random candidates and keep the user's best matches
+    profile = get_user_profile(user_id)
+    factor = personalization.CANDIDATE_FACTOR if profile.signature else 1
+    
+    if not (skin or hair or concerns):
         # Default: Random mix
-        query = 'SELECT * FROM Products WHERE 1=1' + vcf_clause + ' ORDER BY RANDOM() LIMIT ?'
-        products = conn.execute(query, (limit,)).fetchall()
-    else:
-        # Combine all conditions with OR, then apply vegan/CF filter
-        query = "SELECT * FROM Products WHERE (" + " OR ".join(conditions) + ")" + vcf_clause + " ORDER BY RANDOM() LIMIT ?"
-        params.append(limit)  
-        
-        products = conn.execute(query, params).fetchall()
-        
-        # Fallback if specific search gave no results
-        if len(products) < limit:
-            remaining = limit - len(products)
-            fallback_query = 'SELECT * FROM Products WHERE 1=1' + vcf_clause + ' ORDER BY RANDOM() LIMIT ?'
-            fallback = conn.execute(fallback_query, (remaining,)).fetchall()
-            products = list(products) + list(fallback)
+        return personalization.rerank(sample_products(limit * factor, vegan, cruelty_free), profile)[:limit]
+    
+    # Precomputed archetypes draw from their ranked pool; other profiles sample every match
+    key = archetypes.archetype_key(skin, hair, concerns, vegan, cruelty_free)
+    pool = get_recommendation_pool(key) if key else None
+    candidate_ids = random.sample(pool, min(len(pool), limit * factor)) if pool else []
+    candidates = get_products_by_ids(candidate_ids)
+    if not candidates or len(candidates) < len(candidate_ids):
+        # No pool, or one built for a previous catalog whose ids no longer resolve
+        candidates = get_products_by_ids(bitmap_index.sample_ids(wanted & allowed, limit * factor))
+    products = personalization.rerank(candidates, profile)[:limit]
+    
+    # Fallback if too few products match
+    if len(products) < limit:
+        remaining = limit - len(products)
+        fallback = get_products_by_ids(bitmap_index.sample_ids(allowed & ~wanted, remaining * factor))
+        products = products + personalization.rerank(fallback, profile)[:remaining]
     
-    conn.close()
     return products[:limit]
 
+@query_cache.memoize('RecommendationPools', maxsize=4096, ttl=3600)
+def get_recommendation_pool(archetype):
+    """Ranked product ids stored for an archetype by archetypes.py, or None"""
+    with catalog_reader() as conn:
+        row = conn.execute('SELECT product_ids FROM RecommendationPools WHERE archetype = ?', (archetype,)).fetchone()
+    return archetypes.unpack(row[0]) if row else None
+
+def recommend_products(skin_type=None, hair_type=None, issues=None, goal=None, limit=5, vegan=None, cruelty_free=None,
+                       user_id=None, refresh=False):
+    """get_recommended_products() through a short-lived per-user cache (the chatbot's "products" answer).
+
+    Requests with the same user, normalized profile and filters within
+    RECOMMENDATION_TTL get the same picks, and identical concurrent requests
+    share one computation. refresh=True draws new picks and caches those instead.
+    """
+    key = (user_id, *_profile_key(skin_type, hair_type, issues, goal), limit, bool(vegan), bool(cruelty_free))
+    return (_cached_recommendations.cache.refresh if refresh else _cached_recommendations)(*key)
+
+@query_cache.memoize('Products', maxsize=4096, ttl=RECOMMENDATION_TTL)
+def _cached_recommendations(user_id, skin, hair, concerns, limit, vegan, cruelty_free):
+    return _match_products(skin, hair, concerns, limit, vegan, cruelty_free, user_id)
+
 def generate_skincare_routine(skin_type, issues=None, goal=None):
     """Generate a basic skincare routine based on user profile"""
     
@@ -469,24 +1113,15 @@ def generate_haircare_routine(hair_type, issues=None, goal=None):
 
 def get_vegan_cf_products(limit=6):
     """Get random vegan and cruelty-free products for dashboard picks"""
-    conn = get_db_connection()
-    products = conn.execute(
-        'SELECT * FROM Products WHERE vegan = 1 AND cruelty_free = 1 ORDER BY RANDOM() LIMIT ?',
-        (limit,)
-    ).fetchall()
-    conn.close()
-    return products
+    return sample_products(limit, vegan=True, cruelty_free=True)
 
 def get_vegan_cf_stats():
     """Get counts of vegan and cruelty-free products"""
-    conn = get_db_connection()
-    vegan_count = conn.execute('SELECT COUNT(*) FROM Products WHERE vegan = 1').fetchone()[0]
-    cf_count = conn.execute('SELECT COUNT(*) FROM Products WHERE cruelty_free = 1').fetchone()[0]
-    both_count = conn.execute('SELECT COUNT(*) FROM Products WHERE vegan = 1 AND cruelty_free = 1').fetchone()[0]
-    conn.close()
-    return {'vegan': vegan_count, 'cruelty_free': cf_count, 'both': both_count}
+    index = get_bitmap_index()
+    vegan, cruelty_free = index.bitmap('vegan', 1), index.bitmap('cruelty_free', 1)
+    return {'vegan': vegan.bit_count(), 'cruelty_free': cruelty_free.bit_count(), 'both': (vegan & cruelty_free).bit_count()}
 
 
 if __name__ == '__main__':
-    init_db()
+    init_db(force=True)
     print(f"Database '{DATABASE_NAME}' created with all tables.")
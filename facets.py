@@ -0,0 +1,93 @@
+"""
+SkinIntell Search Facets
+Counts per category, vegan, cruelty-free, price band and rating for a search's full result set
+
+All facets come from one GROUP BY over the matching products: each group is
+one combination of (category, vegan, cruelty_free, price band, whole stars),
+so a search returns a few dozen small rows however many products match, and
+folding them gives every facet's counts. Ratings read Products.avg_rating,
+which the Reviews triggers keep current, so no join is needed. Searches with
+no text or price range are counted from the bitmap index instead (count_bitmaps).
+"""
+
+# (label, lower bound inclusive, upper bound exclusive); prices run from 99 to 5999
+PRICE_BANDS = (
+    ('Under ₹500', None, 500),
+    ('₹500 - ₹1,000', 500, 1000),
+    ('₹1,000 - ₹2,000', 1000, 2000),
+    ('₹2,000 - ₹3,500', 2000, 3500),
+    ('₹3,500 & above', 3500, None),
+)
+
+# Rating facets are cumulative: "4 & up" counts every product averaging at least 4 stars
+RATING_THRESHOLDS = (4, 3, 2, 1)
+
+def price_band_sql(column='price'):
+    """SQL expression giving a price's index into PRICE_BANDS"""
+    cases = ' '.join(f'WHEN {column} < {upper} THEN {i}' for i, (_, _, upper) in enumerate(PRICE_BANDS) if upper)
+    return f'CASE WHEN {column} IS NULL THEN NULL {cases} ELSE {len(PRICE_BANDS) - 1} END'
+
+def facet_query(where):
+    """SQL grouping the products matching `where` by every facet dimension"""
+    return f'''
+        SELECT category, vegan, cruelty_free, {price_band_sql()} AS price_band,
+               CAST(avg_rating AS INTEGER) AS stars, COUNT(*) AS n
+        FROM Products WHERE {where}
+        GROUP BY category, vegan, cruelty_free, price_band, stars
+    '''
+
+def fold(rows):
+    """Collapse grouped rows into per-facet counts"""
+    categories = {}
+    price = [0] * len(PRICE_BANDS)
+    stars = {}
+    total = vegan = cruelty_free = 0
+    for category, is_vegan, is_cruelty_free, band, rating, n in rows:
+        total += n
+        if category:
+            categories[category] = categories.get(category, 0) + n
+        if is_vegan:
+            vegan += n
+        if is_cruelty_free:
+            cruelty_free += n
+        if band is not None:
+            price[band] += n
+        if rating is not None:
+            stars[rating] = stars.get(rating, 0) + n
+
+    return {
+        'total': total,
+        'category': dict(sorted(categories.items(), key=lambda item: (-item[1], item[0]))),
+        'vegan': vegan,
+        'cruelty_free': cruelty_free,
+        'price': [
+            {'label': label, 'min': lower, 'max': upper, 'count': count}
+            for (label, lower, upper), count in zip(PRICE_BANDS, price)
+        ],
+        'rating': [
+            {'min': threshold, 'count': sum(n for rating, n in stars.items() if rating >= threshold)}
+            for threshold in RATING_THRESHOLDS
+        ]
+    }
+
+def count_bitmaps(index, bits):
+    """Same counts as fold(), from a bitmap_index.BitmapIndex and the bitset of matching products"""
+    def count(field, value):
+        return (bits & index.bitmap(field, value)).bit_count()
+
+    categories = {category: count('category', category) for category in index.values('category')}
+    stars = {rating: count('stars', rating) for rating in index.values('stars')}
+    return {
+        'total': bits.bit_count(),
+        'category': dict(sorted(((c, n) for c, n in categories.items() if n), key=lambda item: (-item[1], item[0]))),
+        'vegan': count('vegan', 1),
+        'cruelty_free': count('cruelty_free', 1),
+        'price': [
+            {'label': label, 'min': lower, 'max': upper, 'count': count('price_band', band)}
+            for band, (label, lower, upper) in enumerate(PRICE_BANDS)
+        ],
+        'rating': [
+            {'min': threshold, 'count': sum(n for rating, n in stars.items() if rating >= threshold)}
+            for threshold in RATING_THRESHOLDS
+        ]
+    }
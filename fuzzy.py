@@ -0,0 +1,215 @@
+"""
+SkinIntell Fuzzy Search
+Typo correction and synonym expansion for search terms, from a trigram index over the catalog vocabulary
+
+The vocabulary is every word used in a product name, with the number of products
+using it. Each word is indexed under its trigrams ('#' marks both ends), so the
+candidate corrections for an unknown word are the vocabulary words sharing the
+most trigrams with it. The closest candidate within MAX_EDITS (Damerau-Levenshtein)
+wins, ties going to the more common word. The corrected term is then expanded
+through SYNONYMS into alternative phrases, any of which may match.
+
+Expansions are cached per term on the index, so a repeated search costs one dict
+lookup. Correcting a new term stops after BUDGET_MS, and whatever was corrected
+by then is used.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+# Interchangeable phrasings; a search for any member also matches the others
+SYNONYMS = (
+    ('sunscreen', 'spf', 'sunblock', 'sun cream'),
+    ('moisturizer', 'moisturiser', 'moisturising cream'),
+    ('cleanser', 'face wash', 'facial wash'),
+    ('vitamin c', 'vit c', 'ascorbic acid'),
+    ('anti-aging', 'anti-ageing', 'antiaging'),
+    ('color-safe', 'colour-safe', 'color safe'),
+    ('anti-dandruff', 'dandruff'),
+    ('face oil', 'facial oil'),
+    ('face mask', 'facial mask', 'sheet mask'),
+    ('hair mask', 'deep conditioner'),
+    ('exfoliator', 'exfoliant', 'scrub'),
+    ('lip balm', 'chapstick', 'lip salve'),
+    ('retinol', 'retinoid'),
+)
+
+# Most edits allowed when correcting a word of a given length (shorter words are left alone)
+MAX_EDITS = ((4, 0), (6, 1))
+LONG_WORD_EDITS = 2
+
+# Candidates (by shared trigrams) checked by edit distance per unknown word
+CANDIDATES = 12
+
+# Time allowed for correcting one uncached term
+BUDGET_MS = 10
+
+# Alternatives a term can expand to, counting the corrected term itself
+MAX_ALTERNATIVES = 6
+
+# Corrected terms kept per index
+CACHE_SIZE = 4096
+
+# Shortest time between vocabulary rebuilds after the catalog changes
+REFRESH_INTERVAL = 300
+
+_WORD_RE = re.compile(r"[a-z][a-z0-9'/-]*[a-z0-9]|[a-z]")
+_SYNONYM_RES = [
+    (group, [(phrase, re.compile(r'(?<![\w-])' + re.escape(phrase) + r'(?![\w-])')) for phrase in group])
+    for group in SYNONYMS
+]
+
+def words(text):
+    """Lower-case vocabulary words in a piece of text"""
+    return _WORD_RE.findall(text.lower())
+
+def trigrams(word):
+    padded = f'#{word}#'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def max_edits(word):
+    for length, edits in MAX_EDITS:
+        if len(word) < length:
+            return edits
+    return LONG_WORD_EDITS
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance between a and b, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+class FuzzyIndex:
+    """Vocabulary, trigram postings and the per-term expansion cache for one catalog snapshot"""
+
+    def __init__(self, rows):
+        """rows: (text, count) pairs, e.g. product names and how many products carry each"""
+        self.frequency = Counter()
+        for text, count in rows:
+            for word in words(text or ''):
+                self.frequency[word] += count
+        for group in SYNONYMS:
+            for phrase in group:
+                for word in words(phrase):
+                    self.frequency.setdefault(word, 1)
+        self.postings = {}
+        for word in self.frequency:
+            for gram in trigrams(word):
+                self.postings.setdefault(gram, []).append(word)
+        self.cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def correct_word(self, word):
+        """The closest vocabulary word, or word itself if it is known or nothing is close"""
+        limit = max_edits(word)
+        if word in self.frequency or not limit or not _WORD_RE.fullmatch(word):
+            return word
+        shared = Counter()
+        for gram in trigrams(word):
+            shared.update(self.postings.get(gram, ()))
+        best, best_key = word, None
+        for candidate, _ in shared.most_common(CANDIDATES):
+            distance = edit_distance(word, candidate, limit)
+            key = (distance, -self.frequency[candidate])
+            if distance <= limit and (best_key is None or key < best_key):
+                best, best_key = candidate, key
+        return best
+
+    def correct(self, term, budget_ms=BUDGET_MS):
+        """term with unknown words replaced by their corrections; returns (corrected, complete)"""
+        deadline = time.perf_counter() + budget_ms / 1000
+        tokens = term.split()
+        for i, token in enumerate(tokens):
+            if time.perf_counter() > deadline:
+                return ' '.join(tokens), False
+            word = token.lower()
+            corrected = self.correct_word(word)
+            if corrected != word:
+                tokens[i] = corrected
+        return ' '.join(tokens), True
+
+    def expand(self, term):
+        """(corrected term, *synonym alternatives), cached per term"""
+        with self._lock:
+            if term in self.cache:
+                self.cache.move_to_end(term)
+                return self.cache[term]
+
+        corrected, complete = self.correct(term)
+        alternatives = [corrected]
+        lowered = corrected.lower()
+        for group, patterns in _SYNONYM_RES:
+            for phrase, pattern in patterns:
+                if pattern.search(lowered):
+                    alternatives.extend(pattern.sub(other, lowered) for other in group if other != phrase)
+                    break
+        expansion = tuple(dict.fromkeys(alternatives))[:MAX_ALTERNATIVES]
+
+        if complete:
+            # A term cut short by the budget is retried next time
+            with self._lock:
+                self.cache[term] = expansion
+                if len(self.cache) > CACHE_SIZE:
+                    self.cache.popitem(last=False)
+        return expansion
+
+# ============== SHARED INDEX ==============
+
+_current = (None, None, 0.0)  # (version, FuzzyIndex, built at), replaced as a whole
+_lock = threading.Lock()
+_rebuilding = None  # pid of the process whose thread is rebuilding; threads don't survive a fork
+
+def _is_rebuilding():
+    return _rebuilding == os.getpid()
+
+def get_index(version, load):
+    """The index for `version`; `load()` returns (text, count) rows when it has to be rebuilt.
+
+    version is (catalog path, *table versions). A different catalog is built
+    straight away. A changed catalog is rebuilt in a background thread at most
+    every REFRESH_INTERVAL seconds, and the old index serves until it is done.
+    """
+    global _current, _rebuilding
+    current_version, index, built_at = _current
+    if index is not None and (current_version == version or current_version[0] == version[0] and
+                              (_is_rebuilding() or time.monotonic() - built_at < REFRESH_INTERVAL)):
+        return index
+    if index is None or current_version[0] != version[0]:
+        with _lock:
+            if _current[1] is None or _current[0][0] != version[0]:
+                _current = (version, FuzzyIndex(load()), time.monotonic())
+            return _current[1]
+
+    with _lock:
+        if _is_rebuilding():
+            return index
+        _rebuilding = os.getpid()
+
+    def rebuild():
+        global _current, _rebuilding
+        try:
+            _current = (version, FuzzyIndex(load()), time.monotonic())
+        finally:
+            _rebuilding = None
+
+    threading.Thread(target=rebuild, name='fuzzy-index', daemon=True).start()
+    return index
+
+def clear():
+    global _current
+    with _lock:
+        _current = (None, None, 0.0)
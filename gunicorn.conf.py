@@ -0,0 +1,46 @@
+"""
+Gunicorn configuration for SkinIntell
+Picked up automatically by `gunicorn app:app` from the project root
+"""
+
+# Import app.py once in the master; workers are forked from it with the
+# schema already checked and every template compiled.
+preload_app = True
+
+def on_starting(server):
+    """Run the once-per-deploy schema check and template warm-up, and start history retention, in the master"""
+    from startup import boot, get_startup_timings
+
+    boot(server.app.wsgi())
+    startup = get_startup_timings()
+    server.log.info("Booted in %.2f ms: %s", startup['total_ms'], startup['phases_ms'])
+
+    from retention import RETENTION_INTERVAL, start_retention_process
+
+    server.retention_pid = start_retention_process()
+    if server.retention_pid:
+        server.log.info("History retention runs every %d s (pid %d)", RETENTION_INTERVAL, server.retention_pid)
+
+def on_exit(server):
+    """Stop the history retention job with the master"""
+    from retention import stop_retention_process
+
+    if getattr(server, 'retention_pid', None):
+        stop_retention_process(server.retention_pid)
+
+def post_worker_init(worker):
+    """Warm the Jinja template cache in each worker before it accepts requests.
+
+    With preload_app the templates are inherited from the master and this is a
+    no-op lookup; without it each worker compiles (or reads bytecode) here.
+    """
+    from startup import timed, warm_templates, get_startup_timings
+
+    with timed('worker_warm_templates'):
+        template_timings = warm_templates(worker.wsgi)
+
+    startup = get_startup_timings()
+    worker.log.info(
+        "Worker %s warmed %d templates in %.2f ms",
+        worker.pid, len(template_timings), startup['phases_ms']['worker_warm_templates']
+    )
@@ -0,0 +1,77 @@
+"""
+SkinIntell HTTP Caching
+Weak ETags from catalog versions, conditional GET and JSON response compression
+"""
+
+import gzip
+import hashlib
+import os
+
+from flask import request, make_response
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip is used when brotli isn't installed
+    brotli = None
+
+# Product details change only with the catalog; searches revalidate every time (a 304 is cheap)
+PRODUCT_CACHE_CONTROL = 'private, max-age=300, must-revalidate'
+SEARCH_CACHE_CONTROL = 'private, no-cache'
+
+# Responses smaller than this aren't worth the CPU to compress
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+COMPRESS_MIMETYPES = {'application/json', 'text/html'}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def make_etag(*parts):
+    """Build an opaque ETag value from the parts that determine a response"""
+    return hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=12).hexdigest()
+
+def not_modified(etag, cache_control):
+    """Return a 304 response if the client already has `etag`, otherwise None"""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = make_response('', 304)
+    _set_validators(response, etag, cache_control)
+    return response
+
+def with_etag(response, etag, cache_control):
+    """Attach a weak ETag and Cache-Control to a successful response"""
+    if response.status_code == 200:
+        _set_validators(response, etag, cache_control)
+    return response
+
+def _set_validators(response, etag, cache_control):
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Cookie')
+
+def compress_response(response):
+    """after_request hook: brotli/gzip-encode large JSON and HTML bodies"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESS_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    encoding = request.accept_encodings.best_match(offered)
+    if encoding == 'br':
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    elif encoding == 'gzip':
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    else:
+        return response
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def init_app(app):
+    """Register the compression hook on the app"""
+    app.after_request(compress_response)
@@ -0,0 +1,185 @@
+"""
+SkinIntell Personalization
+Per-user preference profiles built from search and chatbot history
+
+Each saved search or chatbot query is folded into the user's profile in the
+same transaction that logs it: term weights, preferred categories and
+vegan/cruelty-free affinity, all decayed exponentially so recent interests
+dominate. Ranking only sees a compact view of the profile: the top terms in
+order, the categories and vegan/cruelty-free preferences that make up a large
+enough share of recent activity. It is cached per process, so re-ranking a page
+of candidates costs microseconds and no extra query, and because it only moves
+when the order of interests changes, repeating a search keeps the same ranking
+(and ETag).
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+HALF_LIFE_DAYS = 14
+MAX_TERMS = 32          # terms kept in the stored profile
+RANK_TERMS = 8          # terms used for ranking
+MIN_WEIGHT = 0.05       # decayed weights below this are dropped
+PREFERENCE_SHARE = 0.3  # a category or flag counts as preferred above this share of (decayed) activity
+
+# Relative weight of each signal in a product's personal score
+TERM_WEIGHT = 1.0
+CATEGORY_WEIGHT = 0.6
+FLAG_WEIGHT = 0.4
+
+# Search pages inside this many leading rows are re-ranked together; later pages keep the plain order
+RERANK_WINDOW = 48
+# Recommendations draw this many times more random candidates than they return
+CANDIDATE_FACTOR = 4
+
+CACHE_SIZE = 10000
+CACHE_TTL = 30  # seconds; profile updates made by other workers show up within this
+
+# Categories implied by a chatbot query type
+QUERY_TYPE_CATEGORIES = {'skincare_routine': 'Face Care', 'haircare_routine': 'Hair Care'}
+
+STOPWORDS = {'and', 'for', 'the', 'with', 'my', 'all', 'none', 'products', 'product'}
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9'-]+")
+_CHATBOT_FIELD_RE = re.compile(r'(Skin|Hair|Issues|Goal|Type|Preferences): (.*?)(?=, (?:Skin|Hair|Issues|Goal|Type|Preferences):|$)')
+
+# One interaction worth of preference evidence
+Signal = namedtuple('Signal', 'terms category vegan cruelty_free')
+
+# What ranking sees: rank-based term weights, preferred categories and flags, plus a short signature for cache validators
+Profile = namedtuple('Profile', 'terms categories vegan cruelty_free signature')
+EMPTY_PROFILE = Profile({}, {}, 0.0, 0.0, '')
+
+# ============== SIGNALS ==============
+
+def tokenize(text):
+    """Lower-case terms worth remembering"""
+    return [t for t in _TOKEN_RE.findall((text or '').lower()) if t not in STOPWORDS]
+
+def search_signal(search_term, category=None, vegan=None, cruelty_free=None):
+    """Preference evidence from one product search"""
+    return Signal(
+        tuple(tokenize(search_term)),
+        category if category and category != 'all' else None,
+        bool(vegan),
+        bool(cruelty_free)
+    )
+
+def chatbot_signal(query):
+    """Preference evidence from a chatbot query string as built by build_chatbot_response()"""
+    fields = dict(_CHATBOT_FIELD_RE.findall(query or ''))
+    terms = tokenize(' '.join(fields.get(name, '') for name in ('Skin', 'Hair', 'Issues', 'Goal')))
+    preferences = fields.get('Preferences', '')
+    return Signal(
+        tuple(terms),
+        QUERY_TYPE_CATEGORIES.get(fields.get('Type', '').strip()),
+        'Vegan' in preferences,
+        'Cruelty-Free' in preferences
+    )
+
+# ============== PROFILE STATE ==============
+
+def new_state(now):
+    return {'terms': {}, 'categories': {}, 'vegan': 0.0, 'cruelty_free': 0.0, 'events': 0.0, 'updated_at': now}
+
+def apply_signal(state, signal, now=None):
+    """Decay `state` to `now` and add one interaction's evidence (mutates and returns state)"""
+    now = time.time() if now is None else now
+    factor = 0.5 ** (max(now - state['updated_at'], 0) / (HALF_LIFE_DAYS * 86400))
+
+    terms = {t: w * factor for t, w in state['terms'].items() if w * factor >= MIN_WEIGHT}
+    categories = {c: w * factor for c, w in state['categories'].items() if w * factor >= MIN_WEIGHT}
+    for term in set(signal.terms):
+        terms[term] = terms.get(term, 0.0) + 1.0
+    if signal.category:
+        categories[signal.category] = categories.get(signal.category, 0.0) + 1.0
+    if len(terms) > MAX_TERMS:
+        terms = dict(sorted(terms.items(), key=lambda item: -item[1])[:MAX_TERMS])
+
+    state.update(
+        terms=terms,
+        categories=categories,
+        vegan=state['vegan'] * factor + signal.vegan,
+        cruelty_free=state['cruelty_free'] * factor + signal.cruelty_free,
+        events=state['events'] * factor + 1.0,
+        updated_at=now
+    )
+    return state
+
+def compact(state):
+    """Reduce a stored profile to what ranking needs"""
+    if not state or not state['events']:
+        return EMPTY_PROFILE
+
+    top_terms = sorted(state['terms'].items(), key=lambda item: (-item[1], item[0]))[:RANK_TERMS]
+    def preferred(weight):
+        return 1.0 if weight / state['events'] >= PREFERENCE_SHARE else 0.0
+
+    profile = (
+        {term: 1.0 - rank / RANK_TERMS for rank, (term, _) in enumerate(top_terms)},
+        {c: 1.0 for c, w in sorted(state['categories'].items()) if preferred(w)},
+        preferred(state['vegan']),
+        preferred(state['cruelty_free'])
+    )
+    signature = hashlib.blake2b(repr(profile).encode('utf-8'), digest_size=6).hexdigest()
+    return Profile(*profile, signature)
+
+def record_signal(conn, user_id, signal, now=None):
+    """Fold a signal into the user's stored profile; run inside the caller's write transaction"""
+    row = conn.execute('SELECT profile FROM UserPreferences WHERE user_id = ?', (user_id,)).fetchone()
+    now = time.time() if now is None else now
+    state = apply_signal(json.loads(row[0]) if row else new_state(now), signal, now)
+    conn.execute('''
+        INSERT INTO UserPreferences (user_id, profile, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET profile = excluded.profile, updated_at = excluded.updated_at
+    ''', (user_id, json.dumps(state, separators=(',', ':')), now))
+    _cache_put(user_id, compact(state))
+
+# ============== PROFILE CACHE ==============
+
+_cache = OrderedDict()  # user_id -> (expires_at, Profile), least recently used first
+_cache_lock = threading.Lock()
+
+def _cache_put(user_id, profile):
+    with _cache_lock:
+        _cache[user_id] = (time.monotonic() + CACHE_TTL, profile)
+        _cache.move_to_end(user_id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def get_profile(user_id, load):
+    """Compact profile for a user; `load(user_id)` returns the stored JSON (or None) on a cache miss"""
+    if user_id is None:
+        return EMPTY_PROFILE
+    with _cache_lock:
+        entry = _cache.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            _cache.move_to_end(user_id)
+            return entry[1]
+    stored = load(user_id)
+    profile = compact(json.loads(stored)) if stored else EMPTY_PROFILE
+    _cache_put(user_id, profile)
+    return profile
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+# ============== RANKING ==============
+
+def score(product, profile):
+    """Personal affinity of one product row"""
+    text = f"{product['name']} {product['description'] or ''}".lower()
+    total = TERM_WEIGHT * sum(w for term, w in profile.terms.items() if term in text)
+    total += CATEGORY_WEIGHT * profile.categories.get(product['category'], 0.0)
+    total += FLAG_WEIGHT * (profile.vegan * bool(product['vegan']) + profile.cruelty_free * bool(product['cruelty_free']))
+    return total
+
+def rerank(products, profile):
+    """Order products by personal affinity; ties (and empty profiles) keep the incoming order"""
+    if not profile.signature:
+        return list(products)
+    return sorted(products, key=lambda product: -score(product, profile))
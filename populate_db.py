@@ -6,7 +6,8 @@ Generates and populates the database with 10,000+ skincare/haircare products and
 
 import sqlite3
 import random
-from database import init_db, DATABASE_NAME
+import attributes
+from database import init_db, catalog_database, bump_table_version
 
 # ============== PRODUCT DATA TEMPLATES ==============
 
@@ -247,11 +248,17 @@ def populate_database():
     # Initialize database
     init_db()
     
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = sqlite3.connect(catalog_database())
     cursor = conn.cursor()
     
-    # Clear existing data
+    # Clear existing data (similarity.py and archetypes.py rebuild the neighbour index and
+    # recommendation pools afterwards); new products get new ids, so old pools would be stale
+    cursor.execute('DELETE FROM ProductSimilarity')
+    cursor.execute('DELETE FROM RecommendationPools')
+    bump_table_version(cursor, 'ProductSimilarity')
+    bump_table_version(cursor, 'RecommendationPools')
     cursor.execute('DELETE FROM Reviews')
+    cursor.execute('DELETE FROM ProductConcerns')
     cursor.execute('DELETE FROM Products')
     conn.commit()
     
@@ -287,6 +294,10 @@ def populate_database():
                         product_id = cursor.lastrowid
                         total_products += 1
                         
+                        # Keep what the name and description were generated from
+                        attributes.store(cursor, product_id,
+                                         attributes.describe(brand, product_type, category, variant, benefit))
+                        
                         # Generate 2-5 reviews per product
                         num_reviews = random.randint(2, 5)
                         for _ in range(num_reviews):
@@ -339,6 +350,10 @@ def populate_database():
                         product_id = cursor.lastrowid
                         total_products += 1
                         
+                        # Keep what the name and description were generated from
+                        attributes.store(cursor, product_id,
+                                         attributes.describe(brand, product_type, category, variant, benefit))
+                        
                         # Generate 2-5 reviews per product
                         num_reviews = random.randint(2, 5)
                         for _ in range(num_reviews):
@@ -371,7 +386,8 @@ def populate_database():
     print(f"\n[SUCCESS] Database populated successfully!")
     print(f"   Total Products: {total_products}")
     print(f"   Total Reviews: {total_reviews}")
-    print(f"   Database: {DATABASE_NAME}")
+    print(f"   Database: {catalog_database()}")
+    print("   Run similarity.py and archetypes.py to rebuild the similar-products index and recommendation pools")
 
 if __name__ == '__main__':
     populate_database()
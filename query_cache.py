@@ -0,0 +1,192 @@
+"""
+SkinIntell Query Cache
+Memoization for read functions that depend only on their arguments and a few tables
+
+    @memoize('Products', maxsize=4096, ttl=600)
+    def get_product_by_id(product_id): ...
+
+Each cached result remembers the TableVersions counters of its tables and is
+discarded once any of them moves. Versions are re-read at most every
+VERSION_CHECK_INTERVAL seconds (one small query shared by every cached
+function), and immediately after invalidate() - which database.py calls from
+its own catalog writes - so writes made by another worker are seen within that
+interval and writes made by this one at once. Concurrent misses for the same
+arguments run the query once (single-flight); the others wait for its result.
+func.cache.refresh(*args) recomputes and stores a result even when one is
+cached (for results with randomness the caller wants re-rolled).
+
+Entries live in a cache_backends.py backend: per-process LRU by default, or
+with QUERY_CACHE_BACKEND=sqlite a file shared by every worker, so a result
+computed by one worker is reused by all.
+"""
+
+import functools
+import threading
+import time
+
+import cache_backends
+from cache_backends import MISS
+
+VERSION_CHECK_INTERVAL = 1.0  # seconds
+
+# Every memoized function by name, for stats and clearing
+REGISTRY = {}
+
+_backend = cache_backends.create_backend()
+
+def set_backend(backend):
+    """Replace the storage backend (existing entries stay behind in the old one)"""
+    global _backend
+    _backend = backend
+
+def get_backend():
+    return _backend
+
+# ============== TABLE VERSIONS ==============
+
+_version_source = None  # callable returning {table: version} for every tracked table
+_versions = {}
+_versions_checked_at = 0.0
+_versions_lock = threading.Lock()
+
+def set_version_source(source):
+    """Register the function that reads the current table versions"""
+    global _version_source
+    _version_source = source
+    invalidate()
+
+def current_versions(tables):
+    """Versions of `tables`, re-read at most every VERSION_CHECK_INTERVAL seconds"""
+    global _versions, _versions_checked_at
+    now = time.monotonic()
+    with _versions_lock:
+        if now - _versions_checked_at > VERSION_CHECK_INTERVAL and _version_source is not None:
+            _versions = _version_source()
+            _versions_checked_at = now
+        return tuple(_versions.get(table, 0) for table in tables)
+
+def invalidate():
+    """Force the next lookup to re-read table versions (call after writing to a tracked table)"""
+    global _versions_checked_at
+    with _versions_lock:
+        _versions_checked_at = 0.0
+
+# ============== CACHE ==============
+
+class _Flight:
+    """One in-progress computation that concurrent callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class QueryCache:
+    """Size- and TTL-bounded cache around one function, validated by table versions"""
+
+    def __init__(self, func, tables, maxsize, ttl):
+        self.func = func
+        self.name = func.__name__
+        self.tables = tables
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.coalesced = self.evictions = self.invalidations = 0
+
+    def __call__(self, *args, **kwargs):
+        return self._get(args, kwargs, refresh=False)
+
+    def refresh(self, *args, **kwargs):
+        """Recompute and store the result even if a valid one is cached; joins a computation already running"""
+        return self._get(args, kwargs, refresh=True)
+
+    def _get(self, args, kwargs, refresh):
+        key = repr((args, sorted(kwargs.items())) if kwargs else args)
+        versions = current_versions(self.tables)
+
+        # Stored as (versions, value); an entry from older table versions is a miss
+        entry = MISS if refresh else _backend.get(self.name, key)
+        with self.lock:
+            if entry is not MISS:
+                if tuple(entry[0]) == versions:
+                    self.hits += 1
+                    return _copy(entry[1])
+                self.invalidations += 1
+            flight = self.in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.in_flight[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return _copy(flight.value)
+
+        try:
+            flight.value = self.func(*args, **kwargs)
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            evicted = _backend.set(self.name, key, (versions, flight.value), self.ttl, self.maxsize)
+            with self.lock:
+                self.evictions += evicted
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            flight.done.set()
+        return _copy(flight.value)
+
+    def clear(self):
+        _backend.clear(self.name)
+
+    def stats(self):
+        size = _backend.size(self.name)
+        with self.lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'tables': list(self.tables),
+                'size': size,
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+def _copy(value):
+    # Lists are handed out as copies so callers can't change the cached result
+    return list(value) if isinstance(value, list) else value
+
+def memoize(*tables, maxsize=1024, ttl=300):
+    """Decorator: cache a read function's results until `tables` change or ttl seconds pass"""
+    def decorator(func):
+        cache = QueryCache(func, tables, maxsize, ttl)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return cache(*args, **kwargs)
+
+        wrapper.cache = cache
+        REGISTRY[func.__name__] = cache
+        return wrapper
+    return decorator
+
+def get_stats():
+    """Hit/miss/eviction statistics (for this process) for every memoized function"""
+    return {
+        'backend': type(_backend).__name__,
+        'functions': {name: cache.stats() for name, cache in sorted(REGISTRY.items())}
+    }
+
+def clear_all():
+    for cache in REGISTRY.values():
+        cache.clear()
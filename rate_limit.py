@@ -0,0 +1,280 @@
+"""
+SkinIntell Rate Limiting
+Request admission for the expensive API endpoints: token buckets per user and
+per client IP, and a concurrency cap per endpoint class
+
+    @app.route('/api/search-products')
+    @login_required
+    @rate_limited('search')
+    def api_search_products(): ...
+
+Each endpoint class in LIMITS has a bucket for every user id and every client
+IP. A request over either bucket is answered 429 with Retry-After. One within
+both still needs one of the class's concurrency slots; when they are all taken
+it is shed with 503 at once. Either way the request is turned away before it
+touches the database.
+
+Buckets and slots live in a local SQLite file (RATE_LIMIT_PATH), separate from
+skinintel.db and shared by every worker process. A client therefore gets the
+same allowance whichever worker serves it, and a slot cap is global rather than
+per process. Each check is a single atomic statement. A slot is a lease that
+expires after LEASE_SECONDS, so a worker that dies mid-request can't hold it
+forever. Any failure of the store admits the request: the limiter can stop
+limiting, but it never breaks a request.
+
+Behind a reverse proxy every request comes from the proxy's address, which
+would make the per-IP buckets one global bucket. init_app() therefore reads the
+client address from X-Forwarded-For, trusting the TRUSTED_PROXY_HOPS proxies in
+front of the app (1 on Render). Leave it 0 when clients connect directly:
+otherwise they could pick their own address and dodge the per-IP limits.
+
+Set RATE_LIMIT_ENABLED=0 to turn it off. Apps in testing mode skip it unless
+their config sets RATE_LIMIT_ENABLED.
+"""
+
+import functools
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from flask import current_app, jsonify, make_response, request, session
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
+RATE_LIMIT_PATH = os.environ.get('RATE_LIMIT_PATH', os.path.join(tempfile.gettempdir(), 'skinintel-ratelimit.db'))
+
+# rate: tokens per second, burst: bucket size; per IP allows several users behind one address
+Limit = namedtuple('Limit', 'rate burst ip_rate ip_burst concurrency')
+
+LIMITS = {
+    'search': Limit(rate=5, burst=20, ip_rate=20, ip_burst=60, concurrency=16),
+    'chatbot': Limit(rate=1, burst=10, ip_rate=4, ip_burst=30, concurrency=8),
+}
+
+LEASE_SECONDS = 60     # a concurrency slot not released by then is considered abandoned
+TRIM_EVERY = 1024      # admissions between sweeps of idle buckets and expired leases
+IDLE_SECONDS = 600     # a bucket untouched this long has refilled and can be dropped
+
+# ============== SHARED STORE ==============
+
+class AdmissionStore:
+    """Token buckets and concurrency leases in a SQLite file shared by every worker"""
+
+    def __init__(self, path=RATE_LIMIT_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._admissions = 0
+        self._admissions_lock = threading.Lock()
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS leases (
+                id TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_leases_endpoint ON leases(endpoint, expires_at)')
+
+    def _connection(self):
+        # One autocommit connection per thread, reopened after fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA synchronous = OFF')  # losing recent bucket state on a crash is harmless
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, key, rate, burst):
+        """Take a token from a bucket (created full); returns 0 if taken, else seconds until one is available"""
+        params = {'key': key, 'rate': rate, 'burst': burst, 'now': time.time()}
+        conn = self._connection()
+        # The refill is computed from the stored row, so concurrent takes from any worker never overdraw
+        taken = conn.execute('''
+            INSERT INTO buckets (key, tokens, updated) VALUES (:key, :burst - 1, :now)
+            ON CONFLICT(key) DO UPDATE SET
+                tokens = MIN(:burst, tokens + (:now - updated) * :rate) - 1, updated = :now
+            WHERE MIN(:burst, tokens + (:now - updated) * :rate) >= 1
+            RETURNING tokens
+        ''', params).fetchone()
+        self._count_admission(conn)
+        if taken:
+            return 0
+        row = conn.execute('SELECT MIN(:burst, tokens + (:now - updated) * :rate) FROM buckets WHERE key = :key',
+                           params).fetchone()
+        return (1 - row[0]) / rate if row else 0
+
+    def acquire(self, endpoint, limit):
+        """Lease one of `limit` slots for an endpoint class; returns the lease id, or None if all are taken"""
+        lease_id = uuid.uuid4().hex
+        now = time.time()
+        acquired = self._connection().execute('''
+            INSERT INTO leases (id, endpoint, expires_at)
+            SELECT ?, ?, ? WHERE (SELECT COUNT(*) FROM leases WHERE endpoint = ? AND expires_at > ?) < ?
+        ''', (lease_id, endpoint, now + LEASE_SECONDS, endpoint, now, limit)).rowcount
+        return lease_id if acquired else None
+
+    def release(self, lease_id):
+        self._connection().execute('DELETE FROM leases WHERE id = ?', (lease_id,))
+
+    def in_flight(self, endpoint):
+        return self._connection().execute(
+            'SELECT COUNT(*) FROM leases WHERE endpoint = ? AND expires_at > ?', (endpoint, time.time())
+        ).fetchone()[0]
+
+    def _count_admission(self, conn):
+        with self._admissions_lock:
+            self._admissions += 1
+            due = self._admissions % TRIM_EVERY == 0
+        if due:
+            now = time.time()
+            conn.execute('DELETE FROM buckets WHERE updated < ?', (now - IDLE_SECONDS,))
+            conn.execute('DELETE FROM leases WHERE expires_at <= ?', (now,))
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute('DELETE FROM buckets')
+        conn.execute('DELETE FROM leases')
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """The shared store, opened on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AdmissionStore()
+        return _store
+
+def set_store(store):
+    """Replace the store (tests point it at a temporary file)"""
+    global _store
+    with _store_lock:
+        _store = store
+
+# ============== ADMISSION ==============
+
+# Decisions made by this process, per endpoint class
+OUTCOMES = ('admitted', 'limited_user', 'limited_ip', 'shed', 'store_errors')
+_counters = {}
+_counters_lock = threading.Lock()
+
+def _count(endpoint, outcome):
+    with _counters_lock:
+        counters = _counters.setdefault(endpoint, dict.fromkeys(OUTCOMES, 0))
+        counters[outcome] += 1
+
+def admit(endpoint, user_id, ip):
+    """Decide whether a request may run.
+
+    Returns (status, retry_after, lease): status 200 with a lease to pass to
+    finish() once the response is done, or 429/503 with the seconds the client
+    should wait before retrying.
+    """
+    limit = LIMITS[endpoint]
+    try:
+        store = get_store()
+        buckets = [('limited_ip', f'{endpoint}:ip:{ip}', limit.ip_rate, limit.ip_burst)]
+        if user_id is not None:
+            buckets.insert(0, ('limited_user', f'{endpoint}:user:{user_id}', limit.rate, limit.burst))
+        for outcome, key, rate, burst in buckets:
+            wait = store.take(key, rate, burst)
+            if wait:
+                _count(endpoint, outcome)
+                return 429, max(1, math.ceil(wait)), None
+        lease = store.acquire(endpoint, limit.concurrency)
+    except sqlite3.Error:
+        _count(endpoint, 'store_errors')
+        return 200, 0, None
+    if lease is None:
+        _count(endpoint, 'shed')
+        return 503, 1, None
+    _count(endpoint, 'admitted')
+    return 200, 0, lease
+
+def finish(lease):
+    """Give back the concurrency slot taken by admit()"""
+    if lease is None:
+        return
+    try:
+        get_store().release(lease)
+    except sqlite3.Error:
+        pass  # the lease expires on its own
+
+def rejection(status, retry_after):
+    """JSON body for a turned-away request"""
+    if status == 429:
+        return {'error': 'Too many requests, please slow down', 'retry_after': retry_after}
+    return {'error': 'Server busy, please retry shortly', 'retry_after': retry_after}
+
+def init_app(app, proxy_hops=TRUSTED_PROXY_HOPS):
+    """Take request.remote_addr from X-Forwarded-For when the app runs behind `proxy_hops` trusted proxies"""
+    if proxy_hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops)
+
+def enabled(app=None):
+    """Whether a Flask app (by default the current one) enforces limits"""
+    app = app or current_app
+    return app.config.get('RATE_LIMIT_ENABLED', RATE_LIMIT_ENABLED and not app.testing)
+
+def rate_limited(endpoint):
+    """Flask view decorator admitting requests through the `endpoint` class limits (use after login_required)"""
+    def decorator(view):
+        @functools.wraps(view)
+        def decorated_view(*args, **kwargs):
+            if not enabled():
+                return view(*args, **kwargs)
+            status, retry_after, lease = admit(endpoint, session.get('user_id'), request.remote_addr)
+            if status != 200:
+                response = jsonify(rejection(status, retry_after))
+                response.status_code = status
+                response.headers['Retry-After'] = str(retry_after)
+                return response
+            try:
+                response = make_response(view(*args, **kwargs))
+            except BaseException:
+                finish(lease)
+                raise
+            if response.is_streamed:
+                # Hold the slot until the last chunk has been sent
+                response.call_on_close(lambda: finish(lease))
+            else:
+                finish(lease)
+            return response
+        return decorated_view
+    return decorator
+
+def get_stats():
+    """Admission counters of this process, with the configured limits and slots in use across workers"""
+    with _counters_lock:
+        counters = {endpoint: dict(values) for endpoint, values in _counters.items()}
+    stats = {}
+    for endpoint, limit in LIMITS.items():
+        try:
+            in_flight = get_store().in_flight(endpoint)
+        except sqlite3.Error:
+            in_flight = None
+        stats[endpoint] = {
+            'limits': limit._asdict(),
+            'in_flight': in_flight,
+            **counters.get(endpoint, dict.fromkeys(OUTCOMES, 0)),
+        }
+    return {'enabled': enabled(), 'endpoints': stats}
+
+def reset_counters():
+    with _counters_lock:
+        _counters.clear()
@@ -0,0 +1,176 @@
+"""
+SkinIntell History Retention
+Row caps, age limits, daily rollups and incremental VACUUM for ChatbotHistory/SearchHistory
+
+Run once: python retention.py
+Under gunicorn a small background process started by the master runs it every
+RETENTION_INTERVAL seconds.
+
+Rows beyond a user's newest HISTORY_MAX_ROWS_PER_USER, or older than
+HISTORY_MAX_AGE_DAYS, are folded into HistoryRollups as per-user daily counts
+and then deleted. Work is done in short batches so history writes never wait
+long on the write lock. Lifetime totals live in HistoryTotals (kept by
+triggers) and are not affected. Freed pages go back to the filesystem through
+incremental VACUUM. Per-user search term counters (user_stats.py) are trimmed
+to each user's SEARCH_TERMS_MAX_PER_USER most frequent terms.
+"""
+
+import os
+import signal
+import time
+
+import database
+import user_stats
+
+HISTORY_MAX_ROWS_PER_USER = int(os.environ.get('HISTORY_MAX_ROWS_PER_USER', 500))
+HISTORY_MAX_AGE_DAYS = int(os.environ.get('HISTORY_MAX_AGE_DAYS', 365))
+SEARCH_TERMS_MAX_PER_USER = int(os.environ.get('SEARCH_TERMS_MAX_PER_USER', 200))  # distinct counted terms kept
+RETENTION_INTERVAL = int(os.environ.get('RETENTION_INTERVAL', 3600))  # seconds; 0 disables the background job
+RETENTION_BATCH_SIZE = 1000   # rows folded and deleted per transaction
+VACUUM_MAX_PAGES = 2000       # pages returned to the filesystem per run
+
+# Rollup kind -> history table
+HISTORY_TABLES = {'chatbot': 'ChatbotHistory', 'search': 'SearchHistory'}
+
+# ============== COMPACTION ==============
+
+def _fold_and_delete(conn, table, kind, where, params):
+    """Add matching rows to the daily rollups, delete them and commit; returns rows deleted"""
+    conn.execute(f'''
+        INSERT INTO HistoryRollups (user_id, day, kind, count)
+        SELECT COALESCE(user_id, 0), date(timestamp), ?, COUNT(*) FROM {table}
+        WHERE {where}
+        GROUP BY COALESCE(user_id, 0), date(timestamp)
+        ON CONFLICT(user_id, day, kind) DO UPDATE SET count = count + excluded.count
+    ''', [kind, *params])
+    deleted = conn.execute(f'DELETE FROM {table} WHERE {where}', params).rowcount
+    conn.commit()
+    return deleted
+
+def expire_old_rows(conn, table, kind, max_age_days=HISTORY_MAX_AGE_DAYS, batch_size=RETENTION_BATCH_SIZE):
+    """Roll up and delete rows older than max_age_days, oldest first.
+
+    Rows are appended in time order, so the expired rows are a prefix of the
+    id range; each batch only touches that prefix.
+    """
+    deleted = 0
+    while True:
+        oldest = conn.execute(f'SELECT MIN(id) FROM {table}').fetchone()[0]
+        if oldest is None:
+            break
+        first_kept = conn.execute(
+            f"SELECT id FROM {table} WHERE timestamp >= datetime('now', ?) ORDER BY id LIMIT 1",
+            (f'-{max_age_days} days',)
+        ).fetchone()
+        upper = oldest + batch_size
+        if first_kept:
+            upper = min(upper, first_kept[0])
+        if upper <= oldest:
+            break
+        deleted += _fold_and_delete(conn, table, kind, 'id < ?', [upper])
+    return deleted
+
+def enforce_row_caps(conn, table, kind, max_rows=HISTORY_MAX_ROWS_PER_USER, batch_size=RETENTION_BATCH_SIZE):
+    """Roll up and delete each user's oldest rows beyond their newest max_rows"""
+    over_cap = conn.execute(f'''
+        SELECT user_id, COUNT(*) - ? FROM {table}
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id HAVING COUNT(*) > ?
+    ''', (max_rows, max_rows)).fetchall()
+
+    deleted = 0
+    for user_id, excess in over_cap:
+        while excess > 0:
+            boundary = conn.execute(
+                f'SELECT id FROM {table} WHERE user_id = ? ORDER BY id LIMIT 1 OFFSET ?',
+                (user_id, min(excess, batch_size) - 1)
+            ).fetchone()[0]
+            removed = _fold_and_delete(conn, table, kind, 'user_id = ? AND id <= ?', [user_id, boundary])
+            deleted += removed
+            excess -= removed
+    return deleted
+
+def incremental_vacuum(conn, max_pages=VACUUM_MAX_PAGES):
+    """Return up to max_pages free pages to the filesystem; returns pages released"""
+    free_pages = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    pages = min(free_pages, max_pages)
+    if pages:
+        conn.execute(f'PRAGMA incremental_vacuum({pages})').fetchall()
+    return pages
+
+def run_retention(max_rows=HISTORY_MAX_ROWS_PER_USER, max_age_days=HISTORY_MAX_AGE_DAYS,
+                  max_terms=SEARCH_TERMS_MAX_PER_USER):
+    """One full retention pass over every user database file; returns rows removed and pages freed"""
+    database.init_db()
+    summary = {table: {'expired': 0, 'capped': 0} for table in HISTORY_TABLES.values()}
+    summary['pruned_search_terms'] = 0
+    summary['vacuumed_pages'] = 0
+    for path in database.user_databases():
+        conn = database.get_db_connection(path)
+        try:
+            for kind, table in HISTORY_TABLES.items():
+                summary[table]['expired'] += expire_old_rows(conn, table, kind, max_age_days)
+                summary[table]['capped'] += enforce_row_caps(conn, table, kind, max_rows)
+            summary['pruned_search_terms'] += user_stats.prune_search_terms(conn, max_terms)
+            summary['vacuumed_pages'] += incremental_vacuum(conn)
+        finally:
+            conn.close()
+    return summary
+
+# ============== BACKGROUND JOB ==============
+
+PARENT_CHECK_INTERVAL = 5    # seconds between checks that the master is still running
+
+def _retention_loop(interval, parent_pid):
+    """Run retention every interval seconds until the process that started it is gone"""
+    next_run = time.monotonic() + interval
+    while os.getppid() == parent_pid:
+        remaining = next_run - time.monotonic()
+        if remaining > 0:
+            time.sleep(min(remaining, PARENT_CHECK_INTERVAL))
+            continue
+        next_run += interval
+        try:
+            summary = run_retention()
+            print(f"[retention] {summary}", flush=True)
+        except Exception as e:
+            print(f"[retention] failed: {e}", flush=True)
+
+def start_retention_process(interval=RETENTION_INTERVAL):
+    """Start the periodic retention job in a forked child process; returns its pid (None if disabled).
+
+    A process rather than a thread, so the gunicorn master that starts it never
+    forks workers while a background thread holds a lock. It is a plain fork
+    rather than a multiprocessing.Process: workers forked later would inherit
+    multiprocessing's child list and terminate the job when they exit.
+    """
+    if interval <= 0:
+        return None
+    parent_pid = os.getpid()
+    pid = os.fork()
+    if pid == 0:
+        # Don't run the master's signal handlers or atexit hooks in the job
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, signal.SIG_DFL)
+        try:
+            _retention_loop(interval, parent_pid)
+        finally:
+            os._exit(0)
+    return pid
+
+def stop_retention_process(pid):
+    """Terminate and reap a job started by start_retention_process"""
+    try:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+    except (ProcessLookupError, ChildProcessError):
+        pass  # Already gone (gunicorn's arbiter may have reaped it)
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    summary = run_retention()
+    for table in HISTORY_TABLES.values():
+        print(f"   {table:<16} expired {summary[table]['expired']:>7}  capped {summary[table]['capped']:>7}")
+    print(f"   {'search terms':<16} pruned  {summary['pruned_search_terms']:>7}")
+    print(f"\n[SUCCESS] Retention pass done in {time.perf_counter() - start:.2f}s, "
+          f"{summary['vacuumed_pages']} pages vacuumed")
@@ -0,0 +1,249 @@
+"""
+SkinIntell Server-Side Sessions
+Flask sessions kept in a local SQLite key-value file; the cookie carries only a signed session id
+
+    sessions.init_app(app)
+
+Session data is stored as one compact binary value (a format byte followed by
+marshal output) under a random session id, in a file (SESSION_STORE_PATH)
+separate from skinintel.db and shared by every worker process. The cookie is
+the id signed with the app's secret key, so a forged or garbled cookie is
+rejected without a lookup. Its size never changes with what the session holds.
+
+A request that doesn't change the session costs one primary-key read and no
+write. Sessions expire PERMANENT_SESSION_LIFETIME after their last write; the
+expiry is pushed forward at most every TOUCH_INTERVAL seconds, and expired rows
+are swept every SWEEP_EVERY writes. Values must be builtin types (str, int,
+float, bool, None, bytes, and lists, tuples and dicts of them), which covers
+everything the app and flash() store.
+
+Logins last only as long as the store file: by default it sits next to the
+app, so on a host whose disk is reset on every deploy or restart (Render's
+default) users are logged out then. Point SESSION_STORE_PATH at a persistent
+disk to keep them, or set SESSION_BACKEND=cookie for Flask's signed-cookie
+sessions, which need no storage.
+"""
+
+import marshal
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from http.cookies import SimpleCookie
+
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'server')  # 'server' or 'cookie'
+SESSION_STORE_PATH = os.environ.get('SESSION_STORE_PATH',
+                                    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'skinintel-sessions.db'))
+TOUCH_INTERVAL = 3600  # seconds between expiry refreshes of a session that isn't modified
+SWEEP_EVERY = 256      # writes between deletions of expired sessions
+
+FORMAT = 1  # first byte of every stored value
+
+def encode(data):
+    return bytes((FORMAT,)) + marshal.dumps(data)
+
+def decode(blob):
+    """Session data from a stored value; empty if it was written in another format"""
+    if not blob or blob[0] != FORMAT:
+        return {}
+    try:
+        data = marshal.loads(blob[1:])
+    except (EOFError, ValueError, TypeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+# ============== STORE ==============
+
+class SessionStore:
+    """Session values by id, with an expiry, in a SQLite file shared by every worker"""
+
+    def __init__(self, path=SESSION_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                expires_at REAL NOT NULL,
+                data BLOB NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expiry ON sessions(expires_at)')
+
+    def _connection(self):
+        # One autocommit connection per thread, reopened after fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA synchronous = NORMAL')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, sid):
+        """(data blob, expires_at) of a live session, or None"""
+        return self._connection().execute(
+            'SELECT data, expires_at FROM sessions WHERE id = ? AND expires_at > ?', (sid, time.time())
+        ).fetchone()
+
+    def set(self, sid, blob, expires_at):
+        conn = self._connection()
+        conn.execute('INSERT OR REPLACE INTO sessions (id, expires_at, data) VALUES (?, ?, ?)',
+                     (sid, expires_at, blob))
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % SWEEP_EVERY == 0
+        if due:
+            self.sweep()
+
+    def touch(self, sid, expires_at):
+        self._connection().execute('UPDATE sessions SET expires_at = ? WHERE id = ?', (expires_at, sid))
+
+    def delete(self, sid):
+        self._connection().execute('DELETE FROM sessions WHERE id = ?', (sid,))
+
+    def sweep(self):
+        """Delete expired sessions; returns how many"""
+        return self._connection().execute('DELETE FROM sessions WHERE expires_at <= ?', (time.time(),)).rowcount
+
+    def count(self):
+        return self._connection().execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+# ============== FLASK INTEGRATION ==============
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session dict that remembers its id and when it was read or changed"""
+
+    def __init__(self, initial=None, sid=None, expires_at=0.0):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.new = sid is None
+        self.sid = sid or secrets.token_urlsafe(24)
+        self.expires_at = expires_at
+        self.discarded = None  # stored id dropped by clear()
+        self.modified = False
+        self.accessed = False
+
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+
+    def clear(self):
+        """Empty the session and give it a new id (login, logout), so the old one can't be reused"""
+        super().clear()
+        if not self.new:
+            self.discarded, self.sid, self.new = self.sid, secrets.token_urlsafe(24), True
+
+class ServerSessionInterface(SessionInterface):
+    """Flask session interface over a SessionStore"""
+
+    salt = 'skinintel-session-id'
+
+    def __init__(self, store=None):
+        self._store = store
+        self._store_lock = threading.Lock()
+
+    @property
+    def store(self):
+        # Opened on first use, so importing the app doesn't create the file
+        with self._store_lock:
+            if self._store is None:
+                self._store = SessionStore()
+            return self._store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt)
+
+    def load(self, app, cookie_value):
+        """The session a cookie value refers to (a new, empty one if it is missing, forged or expired)"""
+        if not cookie_value:
+            return ServerSession()
+        try:
+            sid = self._signer(app).unsign(cookie_value).decode('ascii')
+        except (BadSignature, UnicodeDecodeError):
+            return ServerSession()
+        row = self.store.get(sid)
+        if row is None:
+            return ServerSession()
+        return ServerSession(decode(row[0]), sid, row[1])
+
+    def open_session(self, app, request):
+        if not app.secret_key:
+            return None
+        return self.load(app, request.cookies.get(self.get_cookie_name(app)))
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.discarded:
+            self.store.delete(session.discarded)
+            session.discarded = None
+        if not session:
+            # Emptied (logout): forget it on both sides
+            if session.modified:
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+            return
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        expires_at = time.time() + app.permanent_session_lifetime.total_seconds()
+        if session.modified:
+            self.store.set(session.sid, encode(dict(session)), expires_at)
+        elif expires_at - session.expires_at > TOUCH_INTERVAL:
+            self.store.touch(session.sid, expires_at)
+
+        if session.new or self.should_set_cookie(app, session):
+            response.set_cookie(
+                name,
+                self._signer(app).sign(session.sid).decode('ascii'),
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+
+def init_app(app):
+    """Use server-side sessions unless SESSION_BACKEND is 'cookie'"""
+    if SESSION_BACKEND == 'server':
+        app.session_interface = ServerSessionInterface()
+    elif SESSION_BACKEND != 'cookie':
+        raise ValueError(f"Unknown session backend '{SESSION_BACKEND}'; expected 'server' or 'cookie'")
+
+def read_session(app, cookie_header):
+    """Session data for a raw Cookie header, whichever interface the app uses (for asgi.py)"""
+    morsel = SimpleCookie(cookie_header).get(app.config['SESSION_COOKIE_NAME'])
+    interface = app.session_interface
+    if isinstance(interface, ServerSessionInterface):
+        return dict(interface.load(app, morsel.value if morsel else None))
+    serializer = interface.get_signing_serializer(app)
+    if serializer is None or morsel is None:
+        return {}
+    max_age = int(app.permanent_session_lifetime.total_seconds())
+    try:
+        return serializer.loads(morsel.value, max_age=max_age)
+    except BadSignature:
+        return {}
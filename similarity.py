@@ -0,0 +1,154 @@
+"""
+SkinIntell Product Similarity Index
+Offline batch job that stores the top-K most similar products for every product
+
+Run after populate_db.py: python similarity.py
+
+Each product becomes one row vector: TF-IDF weights of its name/description
+tokens, plus one-hot category and price bucket, plus the vegan and
+cruelty-free flags. Rows are L2-normalised, so a matrix product gives cosine
+similarity. Row blocks are scored on a process pool (one process per core) and
+the results are written to the ProductSimilarity table, which
+get_similar_products() reads with a single primary-key range scan.
+"""
+
+import os
+import re
+import sqlite3
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+try:
+    import numpy as np
+except ImportError:  # Only this offline job needs numpy; the app reads the stored table
+    np = None
+
+import database
+
+SIMILAR_TOP_K = 10
+MAX_VOCABULARY = 512
+BLOCK_ROWS = 256  # rows scored per task; each task holds a BLOCK_ROWS x N float32 matrix
+
+# Relative weight of each feature group in the combined vector
+TEXT_WEIGHT = 1.0
+CATEGORY_WEIGHT = 0.5
+PRICE_WEIGHT = 0.35
+FLAG_WEIGHT = 0.25
+
+PRICE_BUCKETS = [300, 600, 1000, 2000, 3500]  # upper bounds; anything above falls in the last bucket
+
+STOPWORDS = {
+    'a', 'an', 'and', 'by', 'for', 'from', 'in', 'is', 'it', 'of', 'on', 'or', 'our', 'that',
+    'the', 'this', 'to', 'with', 'yet', 'even', 'most', 'your', 'pro'
+}
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+
+# Feature matrix seen by pool workers (inherited without pickling under fork)
+_features = None
+
+def _init_worker(features):
+    global _features
+    _features = features
+
+def tokenize(text):
+    """Lower-case word tokens without stopwords"""
+    return [t for t in _TOKEN_RE.findall((text or '').lower()) if t not in STOPWORDS and len(t) > 1]
+
+def build_feature_matrix(products):
+    """Build the L2-normalised float32 feature matrix (one row per product)"""
+    docs = [set(tokenize(f"{p['name']} {p['description']}")) for p in products]
+    doc_freq = Counter(token for doc in docs for token in doc)
+    vocabulary = {token: i for i, (token, _) in enumerate(doc_freq.most_common(MAX_VOCABULARY))}
+    categories = {c: i for i, c in enumerate(sorted({p['category'] or '' for p in products}))}
+
+    n = len(products)
+    text = np.zeros((n, len(vocabulary)), dtype=np.float32)
+    for row, doc in enumerate(docs):
+        cols = [vocabulary[t] for t in doc if t in vocabulary]
+        text[row, cols] = 1.0
+    idf = np.log((1 + n) / (1 + np.array([doc_freq[t] for t in vocabulary], dtype=np.float32))) + 1
+    text *= idf
+    text /= np.maximum(np.linalg.norm(text, axis=1, keepdims=True), 1e-9)
+
+    category = np.zeros((n, len(categories)), dtype=np.float32)
+    category[np.arange(n), [categories[p['category'] or ''] for p in products]] = 1.0
+
+    prices = np.array([p['price'] or 0 for p in products], dtype=np.float32)
+    price = np.zeros((n, len(PRICE_BUCKETS) + 1), dtype=np.float32)
+    price[np.arange(n), np.searchsorted(PRICE_BUCKETS, prices)] = 1.0
+
+    flags = np.array([[p['vegan'] or 0, p['cruelty_free'] or 0] for p in products], dtype=np.float32)
+
+    features = np.hstack([
+        text * TEXT_WEIGHT,
+        category * CATEGORY_WEIGHT,
+        price * PRICE_WEIGHT,
+        flags * FLAG_WEIGHT
+    ])
+    features /= np.maximum(np.linalg.norm(features, axis=1, keepdims=True), 1e-9)
+    return features
+
+def _top_k_block(bounds):
+    """Pool task: top-K neighbour indices and scores for rows [start, stop)"""
+    start, stop = bounds
+    k = min(SIMILAR_TOP_K, _features.shape[0] - 1)
+    scores = _features[start:stop] @ _features.T
+    scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf  # never your own neighbour
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return start, np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+def compute_neighbours(features, processes=None):
+    """Yield (row, neighbour_rows, scores) blocks, scored in parallel"""
+    _init_worker(features)
+    blocks = [(start, min(start + BLOCK_ROWS, len(features))) for start in range(0, len(features), BLOCK_ROWS)]
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        yield from map(_top_k_block, blocks)
+        return
+    with Pool(processes, initializer=_init_worker, initargs=(features,)) as pool:
+        yield from pool.imap_unordered(_top_k_block, blocks)
+
+def build_similarity_index(processes=None):
+    """Recompute ProductSimilarity for the whole catalog; returns the number of products indexed"""
+    if np is None:
+        raise RuntimeError("The similarity job needs numpy: pip install -r requirements.txt")
+
+    database.init_db()
+    conn = sqlite3.connect(database.catalog_database())
+    conn.row_factory = sqlite3.Row
+    products = conn.execute(
+        'SELECT id, name, description, category, price, vegan, cruelty_free FROM Products ORDER BY id'
+    ).fetchall()
+    if len(products) < 2:
+        conn.close()
+        return 0
+
+    ids = np.array([p['id'] for p in products], dtype=np.int64)
+    features = build_feature_matrix(products)
+
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM ProductSimilarity')
+    for start, neighbours, scores in compute_neighbours(features, processes):
+        rows = []
+        for offset in range(neighbours.shape[0]):
+            product_id = int(ids[start + offset])
+            for rank, (neighbour, score) in enumerate(zip(neighbours[offset], scores[offset]), 1):
+                rows.append((product_id, rank, int(ids[neighbour]), round(float(score), 4)))
+        cursor.executemany(
+            'INSERT INTO ProductSimilarity (product_id, rank, similar_id, score) VALUES (?, ?, ?, ?)',
+            rows
+        )
+    database.bump_table_version(cursor, 'ProductSimilarity')
+    conn.commit()
+    conn.close()
+    return len(products)
+
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    count = build_similarity_index()
+    print(f"[SUCCESS] Similarity index built for {count} products "
+          f"(top {SIMILAR_TOP_K}) in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,103 @@
+"""
+SkinIntell Startup Module
+Schema check, template precompilation, worker warm-up and startup timings
+
+Kept free of Flask/database imports at module level so app.py can import it
+first and time its own imports.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+# Compiled template bytecode lives next to the app so it survives worker restarts
+JINJA_CACHE_DIR = os.environ.get(
+    'JINJA_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.jinja_cache')
+)
+
+# Phase name -> duration in milliseconds, in the order the phases ran
+STARTUP_TIMINGS = {}
+
+@contextmanager
+def timed(phase):
+    """Record how long a startup phase takes"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMINGS[phase] = round((time.perf_counter() - start) * 1000, 2)
+
+def configure_template_cache(app):
+    """Point the app's Jinja environment at the filesystem bytecode cache.
+
+    Must run before the first access to app.jinja_env, which Flask creates lazily.
+    """
+    from jinja2 import FileSystemBytecodeCache
+
+    os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+    app.jinja_options = dict(app.jinja_options, bytecode_cache=FileSystemBytecodeCache(JINJA_CACHE_DIR))
+
+def warm_templates(app):
+    """Load every template so it is compiled (or read from bytecode) before the first request.
+
+    Returns a dict of template name -> load time in milliseconds.
+    """
+    timings = {}
+    env = app.jinja_env
+    for name in sorted(env.list_templates(extensions=['html'])):
+        start = time.perf_counter()
+        env.get_template(name)
+        timings[name] = round((time.perf_counter() - start) * 1000, 2)
+    return timings
+
+def boot(app):
+    """Once-per-deploy startup work, run in the gunicorn master with --preload.
+
+    Applies the schema only when the stored version differs, then compiles every
+    template and builds the catalog bitmap and fuzzy search indexes so forked
+    workers inherit them.
+    """
+    from database import init_db, get_bitmap_index, get_fuzzy_index
+
+    with timed('init_db'):
+        init_db()
+    with timed('warm_templates'):
+        warm_templates(app)
+    with timed('bitmap_index'):
+        get_bitmap_index()
+    with timed('fuzzy_index'):
+        get_fuzzy_index()
+
+def get_startup_timings():
+    """Get the recorded startup phases and their total"""
+    return {
+        'phases_ms': dict(STARTUP_TIMINGS),
+        'total_ms': round(sum(STARTUP_TIMINGS.values()), 2)
+    }
+
+def report_timings(timings, title):
+    """Print a timing table in the same style as the other scripts"""
+    print(title)
+    for name, ms in timings.items():
+        print(f"   {name:<24} {ms:>8.2f} ms")
+    print(f"   {'total':<24} {sum(timings.values()):>8.2f} ms")
+
+def precompile_templates():
+    """Build step: compile every template into the bytecode cache and report timings"""
+    from app import app
+    from database import init_db
+
+    with timed('init_db'):
+        init_db()
+    with timed('precompile_templates'):
+        template_timings = warm_templates(app)
+
+    report_timings(template_timings, f"Templates compiled into '{JINJA_CACHE_DIR}':")
+    report_timings(get_startup_timings()['phases_ms'], "Cold-start timings:")
+
+
+if __name__ == '__main__':
+    # Go through the module name so timings recorded while importing app.py land in the same dict
+    import startup
+    startup.precompile_templates()
@@ -0,0 +1,186 @@
+/**
+ * SkinIntell - AI Assistant
+ * Chatbot form handling and response rendering
+ */
+
+document.addEventListener('DOMContentLoaded', function () {
+    const form = document.getElementById('chatbotForm');
+    const chatMessages = document.getElementById('chatMessages');
+    const queryTypeInput = document.getElementById('queryType');
+    const queryTypeBtns = document.querySelectorAll('.query-type-btn');
+    const submitBtn = document.getElementById('submitBtn');
+    let lastPayload = null;
+
+    // Query type selection
+    queryTypeBtns.forEach(btn => {
+        btn.addEventListener('click', function () {
+            queryTypeBtns.forEach(b => b.classList.remove('active'));
+            this.classList.add('active');
+            queryTypeInput.value = this.dataset.type;
+        });
+    });
+
+    // Form submission
+    form.addEventListener('submit', async function (e) {
+        e.preventDefault();
+
+        const skinType = document.getElementById('skinType').value;
+        const hairType = document.getElementById('hairType').value;
+        const issues = document.getElementById('issues').value;
+        const goal = document.getElementById('goal').value;
+        const queryType = queryTypeInput.value;
+
+        // Add user message
+        const userQuery = `Looking for ${queryType.replace('_', ' ')} recommendations. Skin: ${skinType || 'Not specified'}, Hair: ${hairType || 'Not specified'}, Concerns: ${issues || 'None'}, Goals: ${goal || 'None'}`;
+        addMessage(userQuery, 'user');
+
+        lastPayload = {
+            skin_type: skinType,
+            hair_type: hairType,
+            issues: issues,
+            goal: goal,
+            query_type: queryType,
+            vegan: document.getElementById('veganPref').checked,
+            cruelty_free: document.getElementById('crueltyFreePref').checked
+        };
+        await sendQuery(lastPayload);
+    });
+
+    // Product answers are repeated for the same profile for a while; this asks for new picks
+    chatMessages.addEventListener('click', async function (e) {
+        if (!e.target.closest('.reroll-btn') || !lastPayload || submitBtn.disabled) return;
+        addMessage('Show me different products', 'user');
+        await sendQuery({ ...lastPayload, refresh: true });
+    });
+
+    // The reply streams in as Server-Sent Events: message first, then the routine or products
+    async function sendQuery(payload) {
+        // Show loading
+        submitBtn.disabled = true;
+        submitBtn.innerHTML = '<span class="spinner-border spinner-border-sm me-2"></span>Thinking...';
+
+        const content = addMessage('<span class="spinner-border spinner-border-sm"></span>', 'bot', true);
+        let received = false;
+
+        try {
+            const response = await fetch('/api/chatbot/stream', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify(payload)
+            });
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const events = buffer.split('\n\n');
+                buffer = events.pop();
+                events.forEach(block => {
+                    const event = parseEvent(block);
+                    if (event) {
+                        renderPart(content, event.name, event.data);
+                        received = true;
+                    }
+                });
+            }
+        } catch (error) {
+            console.error('Error:', error);
+            if (!received) content.innerHTML = '<p>Sorry, something went wrong. Please try again.</p>';
+        } finally {
+            const spinner = content.querySelector('.chat-pending');
+            if (spinner) spinner.remove();
+            if (!received) content.querySelectorAll('.spinner-border').forEach(el => el.remove());
+            submitBtn.disabled = false;
+            submitBtn.innerHTML = '<i class="bi bi-send me-2"></i>Get Recommendations';
+        }
+    }
+
+    function parseEvent(block) {
+        let name = 'message';
+        const data = [];
+        block.split('\n').forEach(line => {
+            if (line.startsWith('event:')) name = line.slice(6).trim();
+            else if (line.startsWith('data:')) data.push(line.slice(5).trim());
+        });
+        return data.length ? { name: name, data: JSON.parse(data.join('\n')) } : null;
+    }
+
+    function renderPart(content, name, data) {
+        if (name === 'message') {
+            content.innerHTML = `<p>${data}</p><div class="chat-pending"><span class="spinner-border spinner-border-sm"></span></div>`;
+        } else if (name === 'products') {
+            content.querySelector('.chat-pending').insertAdjacentHTML('beforebegin', renderProducts(data));
+        } else if (name === 'routine') {
+            content.querySelector('.chat-pending').insertAdjacentHTML('beforebegin', renderRoutine(data));
+        }
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+    }
+
+    function renderProducts(products) {
+        if (!products.length) return '';
+        let html = '<div class="products-grid">';
+        products.forEach(product => {
+            let badges = '';
+            if (product.vegan) badges += '<span class="badge-vegan">🌿 Vegan</span> ';
+            if (product.cruelty_free) badges += '<span class="badge-cruelty-free">🐰 Cruelty-Free</span>';
+            html += `
+            <div class="product-card-mini">
+                <h6 class="product-name">${product.name}</h6>
+                <span class="product-category">${product.category || 'Beauty'}</span>
+                <span class="product-price">₹${product.price ? product.price.toFixed(2) : 'N/A'}</span>
+                ${badges ? '<div class="product-badges mt-1">' + badges + '</div>' : ''}
+                <p class="product-desc">${product.description ? product.description.substring(0, 100) + '...' : 'No description available'}</p>
+            </div>
+        `;
+        });
+        html += '</div>';
+        html += '<button type="button" class="btn btn-sm btn-outline-primary mt-2 reroll-btn">' +
+            '<i class="bi bi-arrow-repeat me-1"></i>Show different products</button>';
+        return html;
+    }
+
+    function renderRoutine(routine) {
+        const sections = [
+            ['morning', '☀️ Morning Routine'],
+            ['evening', '🌙 Evening Routine'],
+            ['wash_day', '🚿 Wash Day Routine'],
+            ['maintenance', '✨ Maintenance']
+        ];
+        let html = '';
+        sections.forEach(([key, title]) => {
+            if (!routine[key]) return;
+            html += `<h6 class="mt-3">${title}</h6><ol class="routine-list">`;
+            routine[key].forEach(step => {
+                html += `<li><strong>${step.name}</strong>: ${step.description}</li>`;
+            });
+            html += '</ol>';
+        });
+        return html;
+    }
+
+    function addMessage(content, type, isHtml = false) {
+        const messageDiv = document.createElement('div');
+        messageDiv.className = `message message-${type}`;
+
+        const avatarIcon = type === 'bot' ? 'robot' : 'person';
+
+        messageDiv.innerHTML = `
+        <div class="message-avatar">
+            <i class="bi bi-${avatarIcon}"></i>
+        </div>
+        <div class="message-content">
+            ${isHtml ? content : `<p>${content}</p>`}
+        </div>
+    `;
+
+        chatMessages.appendChild(messageDiv);
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+        return messageDiv.querySelector('.message-content');
+    }
+});
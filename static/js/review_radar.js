@@ -0,0 +1,299 @@
+/**
+ * SkinIntell - Review Radar
+ * Product search, filters, pagination and product detail modal
+ */
+
+document.addEventListener('DOMContentLoaded', function () {
+    const searchForm = document.getElementById('searchForm');
+    const searchInput = document.getElementById('searchInput');
+    const categoryFilter = document.getElementById('categoryFilter');
+    const productsGrid = document.getElementById('productsGrid');
+    const loadingSpinner = document.getElementById('loadingSpinner');
+    const emptyState = document.getElementById('emptyState');
+    const noResults = document.getElementById('noResults');
+    const resultsHeader = document.getElementById('resultsHeader');
+    const resultsCount = document.getElementById('resultsCount');
+    const resultsFacets = document.getElementById('resultsFacets');
+    const loadMoreBtn = document.getElementById('loadMoreBtn');
+    const loadMoreContainer = document.getElementById('loadMoreContainer');
+    const productModal = new bootstrap.Modal(document.getElementById('productModal'));
+    const productModalBody = document.getElementById('productModalBody');
+    const productModalLabel = document.getElementById('productModalLabel');
+
+    let currentPage = 1;
+    let currentQuery = '';
+    let currentCategory = 'all';
+
+    // Search form submission
+    searchForm.addEventListener('submit', function (e) {
+        e.preventDefault();
+        currentPage = 1;
+        currentQuery = searchInput.value.trim();
+        currentCategory = categoryFilter.value;
+        searchProducts(true);
+    });
+
+    // Load more button
+    loadMoreBtn.addEventListener('click', function () {
+        currentPage++;
+        searchProducts(false);
+    });
+
+    async function searchProducts(clearResults = true) {
+        if (clearResults) {
+            productsGrid.innerHTML = '';
+        }
+
+        showLoading();
+
+        const veganFilter = document.getElementById('veganFilter').checked ? '1' : '0';
+        const cfFilter = document.getElementById('crueltyFreeFilter').checked ? '1' : '0';
+        const params = new URLSearchParams({
+            q: currentQuery,
+            category: currentCategory,
+            page: currentPage,
+            vegan: veganFilter,
+            cruelty_free: cfFilter,
+            sort: document.getElementById('sortOrder').value
+        });
+        ['minPrice', 'maxPrice'].forEach(id => {
+            const value = document.getElementById(id).value;
+            if (value !== '') params.set(id === 'minPrice' ? 'min_price' : 'max_price', value);
+        });
+
+        try {
+            const response = await fetch(`/api/search-products?${params}`);
+            const data = await response.json();
+
+            hideLoading();
+
+            if (data.products && data.products.length > 0) {
+                emptyState.style.display = 'none';
+                noResults.style.display = 'none';
+                resultsHeader.style.display = 'flex';
+                if (clearResults && data.facets) {
+                    renderFacets(data.facets, data.corrected);
+                }
+
+                data.products.forEach(product => {
+                    productsGrid.innerHTML += createProductCard(product);
+                });
+
+                // Show/hide load more button
+                if (data.products.length >= 12) {
+                    loadMoreContainer.style.display = 'block';
+                } else {
+                    loadMoreContainer.style.display = 'none';
+                }
+
+                // Attach click handlers to new cards
+                attachCardClickHandlers();
+            } else {
+                if (clearResults) {
+                    emptyState.style.display = 'none';
+                    noResults.style.display = 'flex';
+                    resultsHeader.style.display = 'none';
+                }
+                loadMoreContainer.style.display = 'none';
+            }
+        } catch (error) {
+            console.error('Error:', error);
+            hideLoading();
+            noResults.style.display = 'flex';
+        }
+    }
+
+    // Counts for the whole result set, not just the loaded page
+    function renderFacets(facets, corrected) {
+        resultsCount.textContent = `${facets.total.toLocaleString()} products found` +
+            (corrected ? ` for "${corrected}"` : '');
+
+        // Category counts only make sense against every category, so update them for "All" searches
+        if (currentCategory === 'all') {
+            Array.from(categoryFilter.options).forEach(option => {
+                if (option.value === 'all') return;
+                option.dataset.label = option.dataset.label || option.textContent;
+                option.textContent = `${option.dataset.label} (${facets.category[option.value] || 0})`;
+            });
+        }
+
+        const chips = [
+            `\ud83c\udf3f Vegan ${facets.vegan}`,
+            `\ud83d\udc30 Cruelty-Free ${facets.cruelty_free}`,
+            ...facets.rating.filter(r => r.count).slice(0, 1).map(r => `\u2605 ${r.min}+ ${r.count}`),
+            ...facets.price.filter(band => band.count).map(band => `${band.label} ${band.count}`)
+        ];
+        resultsFacets.innerHTML = chips.map(chip => `<span class="results-facet">${chip}</span>`).join('');
+    }
+
+    function createProductCard(product) {
+        const price = product.price ? `\u20b9${product.price.toFixed(2)}` : 'Price N/A';
+        const description = product.description ? product.description.substring(0, 120) + '...' : 'No description available';
+
+        let badges = '';
+        if (product.vegan) badges += '<span class="badge-vegan">\ud83c\udf3f Vegan</span> ';
+        if (product.cruelty_free) badges += '<span class="badge-cruelty-free">\ud83d\udc30 Cruelty-Free</span>';
+
+        return `
+        <div class="product-card-large" data-product-id="${product.id}">
+            <div class="product-card-header">
+                <span class="product-category-badge">${product.category || 'Beauty'}</span>
+                <span class="product-price-badge">${price}</span>
+            </div>
+            <div class="product-card-body">
+                <h5 class="product-title">${product.name}</h5>
+                ${badges ? '<div class="product-badges mb-2">' + badges + '</div>' : ''}
+                <p class="product-description">${description}</p>
+            </div>
+            <div class="product-card-footer">
+                <button class="btn btn-outline-primary btn-sm view-product-btn" data-product-id="${product.id}">
+                    <i class="bi bi-eye me-1"></i>View Details & Reviews
+                </button>
+            </div>
+        </div>
+    `;
+    }
+
+    function attachCardClickHandlers() {
+        document.querySelectorAll('.view-product-btn').forEach(btn => {
+            btn.addEventListener('click', async function () {
+                const productId = this.dataset.productId;
+                await loadProductDetails(productId);
+            });
+        });
+    }
+
+    async function loadProductDetails(productId) {
+        productModalBody.innerHTML = `
+        <div class="text-center py-5">
+            <div class="spinner-border text-primary" role="status">
+                <span class="visually-hidden">Loading...</span>
+            </div>
+        </div>
+    `;
+        productModal.show();
+
+        try {
+            const response = await fetch(`/api/product/${productId}`);
+            const data = await response.json();
+
+            if (data.error) {
+                productModalBody.innerHTML = `<p class="text-danger">${data.error}</p>`;
+                return;
+            }
+
+            const product = data.product;
+            const reviews = data.reviews;
+
+            productModalLabel.textContent = product.name;
+
+            let reviewsHtml = '';
+            if (reviews && reviews.length > 0) {
+                reviews.forEach(review => {
+                    const stars = '★'.repeat(review.rating || 5) + '☆'.repeat(5 - (review.rating || 5));
+                    reviewsHtml += `
+                    <div class="review-item">
+                        <div class="review-header">
+                            <span class="review-stars">${stars}</span>
+                            <span class="review-source">${review.source || 'Customer'}</span>
+                        </div>
+                        <p class="review-text">${review.review_text}</p>
+                    </div>
+                `;
+                });
+            } else {
+                reviewsHtml = '<p class="text-muted">No reviews available for this product yet.</p>';
+            }
+
+            productModalBody.innerHTML = `
+            <div class="product-detail">
+                <div class="product-detail-header">
+                    <div class="product-detail-info">
+                        <span class="product-category-badge-lg">${product.category || 'Beauty'}</span>
+                        <h3 class="product-detail-name">${product.name}</h3>
+                        <span class="product-detail-price">${product.price ? '\u20b9' + product.price.toFixed(2) : 'Price N/A'}</span>
+                        <div class="product-detail-badges mt-2">
+                            ${product.vegan ? '<span class="badge-vegan">\ud83c\udf3f Vegan</span> ' : ''}
+                            ${product.cruelty_free ? '<span class="badge-cruelty-free">\ud83d\udc30 Cruelty-Free</span>' : ''}
+                        </div>
+                    </div>
+                </div>
+                <div class="product-detail-description">
+                    <h6>Description</h6>
+                    <p>${product.description || 'No description available'}</p>
+                </div>
+                <div class="product-detail-reviews">
+                    <h6><i class="bi bi-chat-quote me-2"></i>Customer Reviews</h6>
+                    <div class="reviews-list">
+                        ${reviewsHtml}
+                    </div>
+                </div>
+                <div class="product-detail-similar" id="similarProducts"></div>
+            </div>
+        `;
+            loadSimilarProducts(product.id);
+        } catch (error) {
+            console.error('Error:', error);
+            productModalBody.innerHTML = '<p class="text-danger">Failed to load product details.</p>';
+        }
+    }
+
+    async function loadSimilarProducts(productId) {
+        const container = document.getElementById('similarProducts');
+        try {
+            const response = await fetch(`/api/product/${productId}/similar`);
+            const data = await response.json();
+            if (!data.products || data.products.length === 0) {
+                return;
+            }
+
+            let itemsHtml = '';
+            data.products.forEach(product => {
+                itemsHtml += `
+                <button type="button" class="similar-product" data-product-id="${product.id}">
+                    <span class="similar-product-name">${product.name}</span>
+                    <span class="similar-product-meta">
+                        ${product.price ? '\u20b9' + product.price.toFixed(2) : ''}
+                        ${product.vegan ? ' \ud83c\udf3f' : ''}${product.cruelty_free ? ' \ud83d\udc30' : ''}
+                    </span>
+                </button>
+            `;
+            });
+
+            container.innerHTML = `
+            <h6><i class="bi bi-stars me-2"></i>More Like This</h6>
+            <div class="similar-products-list">${itemsHtml}</div>
+        `;
+            container.querySelectorAll('.similar-product').forEach(btn => {
+                btn.addEventListener('click', function () {
+                    loadProductDetails(this.dataset.productId);
+                });
+            });
+        } catch (error) {
+            console.error('Error:', error);
+        }
+    }
+
+    function showLoading() {
+        loadingSpinner.style.display = 'block';
+        emptyState.style.display = 'none';
+        noResults.style.display = 'none';
+    }
+
+    function hideLoading() {
+        loadingSpinner.style.display = 'none';
+    }
+
+    // Check URL params and pre-set filters
+    const urlParams = new URLSearchParams(window.location.search);
+    if (urlParams.get('vegan') === '1') {
+        document.getElementById('veganFilter').checked = true;
+    }
+    if (urlParams.get('cruelty_free') === '1') {
+        document.getElementById('crueltyFreeFilter').checked = true;
+    }
+
+    // Initial search with empty query to show featured products
+    currentQuery = '';
+    searchProducts(true);
+});
@@ -0,0 +1,85 @@
+"""
+Tests for the precomputed recommendation pools
+Run: python test_archetypes.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import archetypes
+import bitmap_index
+import database
+import query_cache
+
+
+class TestRecommendationPools(unittest.TestCase):
+    """Verify pool ranking, storage and use by the recommender"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        database.close_read_connections()
+        database.CATALOG_DATABASE = os.path.join(self.directory.name, 'catalog.db')
+        query_cache.clear_all()
+        query_cache.invalidate()
+        bitmap_index.clear()
+        database.init_db()
+        self.both = database.add_product('Oily Acne', 500, 'Face Care', 'Pool test', brand='COSRX',
+                                         product_type='Treatment', variant='Acne', benefit='for Oily Skin')
+        self.rated = database.add_product('Oily Rated', 500, 'Face Care', 'Pool test', brand='COSRX',
+                                          product_type='Toner', variant='Balancing', benefit='for Oily Skin')
+        self.unrated = database.add_product('Oily Unrated', 500, 'Face Care', 'Pool test', brand='COSRX',
+                                            product_type='Toner', variant='Balancing', benefit='for Oily Skin')
+        database.add_review(self.rated, 'Test', 'Review', 5)
+        database.add_product('Dry Plain', 500, 'Face Care', 'Pool test', brand='Olay',
+                             product_type='Moisturizer', variant='Rich', benefit='for Dry Skin')
+
+    def tearDown(self):
+        database.close_read_connections()
+        database.CATALOG_DATABASE = None
+        query_cache.clear_all()
+        query_cache.invalidate()
+        bitmap_index.clear()
+        self.directory.cleanup()
+
+    def test_archetype_keys(self):
+        self.assertEqual(archetypes.archetype_key('oily', None, ('redness', 'acne'), True, None), 'oily||acne,redness|1|0')
+        self.assertIsNone(archetypes.archetype_key('oily', None, ('acne', 'frizz', 'redness'), False, False))
+        self.assertIsNone(archetypes.archetype_key(None, None, (), True, True))
+
+    def test_pool_ranks_best_matches_first(self):
+        index = database.get_bitmap_index()
+        pool = archetypes.rank_pool(index, 'oily', None, ('acne',), False, False, random.Random(1))
+        self.assertEqual(pool, [self.both, self.rated, self.unrated])
+
+    def test_recommender_samples_stored_pool(self):
+        self.assertEqual(archetypes.build_recommendation_pools(processes=1), len(list(archetypes.all_archetypes())))
+        query_cache.invalidate()
+        pool = database.get_recommendation_pool('oily||acne|0|0')
+        self.assertEqual(pool, [self.both, self.rated, self.unrated])
+        products = database.get_recommended_products('oily', issues='acne', limit=3)
+        self.assertEqual({p['id'] for p in products}, set(pool))
+        # Topped up from the rest of the catalog when the pool is short
+        self.assertEqual(len(database.get_recommended_products('oily', issues='acne', limit=4)), 4)
+
+    def test_stale_pool_falls_back_to_live_matches(self):
+        archetypes.build_recommendation_pools(processes=1)
+        # The catalog is rebuilt with new ids while the stored pools stay behind
+        conn = database.get_db_connection(database.catalog_database())
+        conn.execute('DELETE FROM Products WHERE id IN (?, ?, ?)', (self.both, self.rated, self.unrated))
+        conn.commit()
+        conn.close()
+        fresh = {database.add_product(f'Oily New {i}', 500, 'Face Care', 'Pool test', brand='COSRX',
+                                      product_type='Toner', variant='Balancing', benefit='for Oily Skin')
+                 for i in range(2)}
+        products = database.get_recommended_products('oily', issues='acne', limit=2)
+        self.assertEqual({p['id'] for p in products}, fresh)
+
+
+if __name__ == '__main__':
+    unittest.main()
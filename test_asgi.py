@@ -0,0 +1,123 @@
+"""
+Tests for the async (ASGI) variant of the SkinIntell API
+Run: python test_asgi.py
+"""
+
+import os
+import sys
+import json
+import asyncio
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+import asgi
+from asgi import application
+from database import create_user, get_user_by_email
+
+
+def call(method, path, query='', body=b'', cookie=None):
+    """Drive the ASGI app with one request and return (status, json_body)"""
+    headers = [(b'content-type', b'application/json')]
+    if cookie:
+        headers.append((b'cookie', cookie.encode()))
+    scope = {'type': 'http', 'method': method, 'path': path,
+             'query_string': query.encode(), 'headers': headers}
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    status = sent[0]['status']
+    return status, json.loads(sent[1]['body'])
+
+
+class TestAsgiApi(unittest.TestCase):
+    """Verify the async API routes mirror the Flask ones"""
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            create_user('asgirunner', 'asgirunner@test.com', 'testpass123', 'oily', 'curly', 'acne', 'clear skin')
+        except Exception:
+            pass  # User might already exist
+        user = get_user_by_email('asgirunner@test.com')
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user['id']
+        name = app.config['SESSION_COOKIE_NAME']
+        cls.cookie = f"{name}={client.get_cookie(name).value}"
+
+    def test_requires_login(self):
+        status, data = call('GET', '/api/search-products')
+        self.assertEqual(status, 401)
+        self.assertIn('error', data)
+
+    def test_unknown_path_and_method(self):
+        self.assertEqual(call('GET', '/api/nope', cookie=self.cookie)[0], 404)
+        self.assertEqual(call('POST', '/api/user-stats', cookie=self.cookie)[0], 405)
+
+    def test_search_vegan_filter(self):
+        status, data = call('GET', '/api/search-products', query='q=&vegan=1', cookie=self.cookie)
+        self.assertEqual(status, 200)
+        self.assertGreater(data['count'], 0)
+        for p in data['products']:
+            self.assertEqual(p['vegan'], 1)
+
+    def test_product_not_found(self):
+        status, data = call('GET', '/api/product/999999999', cookie=self.cookie)
+        self.assertEqual(status, 404)
+
+    def test_dashboard_gathers_all_reads(self):
+        status, data = call('GET', '/api/dashboard', cookie=self.cookie)
+        self.assertEqual(status, 200)
+        self.assertEqual(data['user']['username'], 'asgirunner')
+        self.assertNotIn('password', data['user'])
+        self.assertGreater(data['product_count'], 0)
+        self.assertIn('both', data['vegan_cf_stats'])
+
+    def test_chatbot_records_history(self):
+        body = json.dumps({'skin_type': 'dry', 'query_type': 'skincare_routine'}).encode()
+        status, data = call('POST', '/api/chatbot', body=body, cookie=self.cookie)
+        self.assertEqual(status, 200)
+        self.assertIn('morning', data['routine'])
+        status, data = call('GET', '/api/dashboard', cookie=self.cookie)
+        self.assertEqual(data['chatbot_history'][0]['response'], 'Generated skincare routine')
+
+    def test_malformed_json_is_bad_request(self):
+        status, data = call('POST', '/api/chatbot', body=b'{"skin_type": ', cookie=self.cookie)
+        self.assertEqual(status, 400)
+        self.assertEqual(data['error'], 'Invalid JSON body')
+
+
+
+class TestAsgiLifespan(unittest.TestCase):
+    """Verify uvicorn's lifespan startup runs the same boot as gunicorn"""
+
+    def test_startup_boots_app(self):
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        # Keep the shared executor alive for the other tests
+        with mock.patch('asgi.boot') as boot, mock.patch.object(asgi._db_executor, 'shutdown'):
+            asyncio.run(application({'type': 'lifespan'}, receive, send))
+        boot.assert_called_once_with(app)
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,105 @@
+"""
+Tests for the static asset build and fingerprinted serving
+Run: python test_assets.py
+"""
+
+import gzip
+import os
+import sys
+import tempfile
+import unittest
+
+from flask import Flask, url_for
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import assets
+from build_assets import build_assets, minify_css, minify_js
+
+
+class TestMinifiers(unittest.TestCase):
+    """Verify minified output keeps the meaning of tricky sources"""
+
+    def test_css(self):
+        source = '/* header */\n.a  >  .b ,\n.c {\n    color: red ;\n    margin: 0 auto;\n}\n.d :hover { top: 0 }\n'
+        # The space in '.d :hover' is a descendant combinator and must stay
+        self.assertEqual(minify_css(source), '.a>.b,.c{color:red;margin:0 auto}.d :hover{top:0}')
+
+    def test_js_strings_and_comments(self):
+        source = "var u = 'http://x.y/*z*/'; // trailing\nvar q = \"it\\\"s // here\"; /* block */ f(u, q);\n"
+        self.assertEqual(minify_js(source), "var u='http://x.y/*z*/';var q=\"it\\\"s // here\";f(u,q);\n")
+
+    def test_js_regex_literals(self):
+        # After return/typeof and punctuation a '/' starts a regex whose contents must survive untouched
+        self.assertEqual(minify_js('function f(s) {\n    return /a, b/.test(s);\n}\n'),
+                         'function f(s){return /a, b/.test(s);}\n')
+        self.assertEqual(minify_js('x = typeof /\\/\\/ [/] "/;\n'), 'x=typeof /\\/\\/ [/] "/;\n')
+        self.assertEqual(minify_js("var m = s.replace(/ /g, '_');\n"), "var m=s.replace(/ /g,'_');\n")
+
+    def test_js_division(self):
+        self.assertEqual(minify_js('var x = a1 / b / c;\nvar y = [4][0] / 2;\n'), 'var x=a1 / b / c;var y=[4][0]/ 2;\n')
+
+    def test_js_template_literals(self):
+        source = "var t = `a  // not a comment ${ {k: '}'}.k }  /* kept */ ${1 + 1}`;\n"
+        self.assertEqual(minify_js(source), "var t=`a  // not a comment ${{k:'}'}.k}  /* kept */ ${1 + 1}`;\n")
+
+    def test_js_keeps_line_breaks_for_asi(self):
+        self.assertEqual(minify_js('var a = 1\nvar b = a\n++b\n'), 'var a=1\nvar b=a\n++b\n')
+        self.assertEqual(minify_js('function g() {\n    return\n    1\n}\n'), 'function g(){return\n1\n}\n')
+        self.assertEqual(minify_js('console.log(a - -b, a + +b)\n'), 'console.log(a - -b,a + +b)\n')
+
+
+class TestAssetServing(unittest.TestCase):
+    """Verify manifest resolution, precompressed siblings and the unbuilt fallback"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.static = self.directory.name
+        for name, content in (('css/site.css', 'body {\n    color: red;\n}\n'), ('js/site.js', 'var a = 1;\n')):
+            os.makedirs(os.path.join(self.static, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(self.static, name), 'w') as f:
+                f.write(content * 200)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_app(self):
+        app = Flask(__name__, static_folder=self.static, static_url_path='/static')
+        assets.init_app(app)
+        return app
+
+    def test_manifest_resolves_fingerprinted_files(self):
+        manifest = build_assets(self.static)
+        app = self.make_app()
+        with app.test_request_context():
+            url = url_for('static', filename='css/site.css')
+        self.assertEqual(url, '/static/' + manifest['css/site.css'])
+        self.assertRegex(url, r'^/static/dist/css/site\.[0-9a-f]{12}\.css$')
+
+        client = app.test_client()
+        response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.mimetype, 'text/css')
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertTrue(gzip.decompress(response.data).startswith(b'body{color:red}'))
+        response.close()
+
+        response = client.get(url, headers={'Accept-Encoding': 'identity'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertTrue(response.data.startswith(b'body{color:red}'))
+        response.close()
+
+    def test_without_manifest_serves_sources(self):
+        app = self.make_app()
+        with app.test_request_context():
+            self.assertEqual(url_for('static', filename='js/site.js'), '/static/js/site.js')
+        response = app.test_client().get('/static/js/site.js')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data.startswith(b'var a = 1;'))
+        self.assertNotIn('immutable', response.headers.get('Cache-Control', ''))
+        response.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+Tests for structured product attributes and attribute-matching recommendations
+Run: python test_attributes.py
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import attributes
+import bitmap_index
+import database
+import populate_db
+import query_cache
+
+
+class TestParsing(unittest.TestCase):
+    """Verify benefit, concern and generated-text parsing"""
+
+    def test_benefits(self):
+        self.assertEqual(attributes.parse_benefit('for Oily Skin'), ('oily', None))
+        self.assertEqual(attributes.parse_benefit('for Very Dry Skin'), ('dry', None))
+        self.assertEqual(attributes.parse_benefit('for All Hair Types'), (None, 'all'))
+        self.assertEqual(attributes.parse_benefit('for Acne-Prone Skin'), (None, None))
+        self.assertEqual(attributes.describe('Cantu', 'Shampoo', 'Hair Care', 'Anti-Dandruff', 'for Curly Hair')['concerns'],
+                         ('dandruff',))
+
+    def test_free_text_concerns(self):
+        self.assertEqual(attributes.concerns_in('Acne, redness'), ('acne', 'redness'))
+        self.assertEqual(attributes.concerns_in('less frizz and hair fall'), ('frizz', 'thinning'))
+        self.assertEqual(attributes.concerns_in('hydrated glowing skin'), ('dullness', 'hydration'))
+        self.assertEqual(attributes.normalise_hair_type('Coily'), 'curly')
+
+    def test_parser_recovers_generated_products(self):
+        parser = attributes.default_parser()
+        for name in (
+            'Amika Serum Heat Protectant',
+            'Amika Heat Protectant - Serum',
+            'Serum Heat Protectant by Amika',
+            'Amika Pro Heat Protectant Serum',
+        ):
+            description = populate_db.generate_product_description('Heat Protectant', 'Serum', 'for Thick Hair')
+            parsed = parser.parse(name, description, 'Hair Care')
+            self.assertEqual((parsed['brand'], parsed['product_type'], parsed['variant'], parsed['target_hair_type']),
+                             ('Amika', 'Heat Protectant', 'Serum', 'thick'))
+
+
+class TestAttributeStorage(unittest.TestCase):
+    """Verify ingest, backfill and equality matching against a scratch catalog"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        database.close_read_connections()
+        database.CATALOG_DATABASE = os.path.join(self.directory.name, 'catalog.db')
+        query_cache.clear_all()
+        query_cache.invalidate()
+        bitmap_index.clear()
+        database.init_db()
+
+    def tearDown(self):
+        database.close_read_connections()
+        database.CATALOG_DATABASE = None
+        query_cache.clear_all()
+        query_cache.invalidate()
+        bitmap_index.clear()
+        self.directory.cleanup()
+
+    def test_backfill_matches_ingest(self):
+        args = ('CeraVe', 'Cleanser', 'Face Care', 'Foaming', 'for Oily Skin')
+        stored = database.add_product('CeraVe Foaming Cleanser for Oily Skin', 499, 'Face Care',
+                                      populate_db.generate_product_description('Cleanser', 'Foaming', 'for Oily Skin'),
+                                      brand=args[0], product_type=args[1], variant=args[3], benefit=args[4])
+        with database.get_db_connection(database.CATALOG_DATABASE) as conn:
+            # A row written before attributes existed
+            parsed = conn.execute(
+                'INSERT INTO Products (name, price, category, description) VALUES (?, ?, ?, ?)',
+                ('Gel Moisturizer by Olay', 899, 'Face Care',
+                 populate_db.generate_product_description('Moisturizer', 'Gel', 'for Redness'))
+            ).lastrowid
+            self.assertEqual(attributes.backfill(conn), 1)
+            self.assertEqual(attributes.backfill(conn), 0)
+            rows = {row['id']: row for row in conn.execute('''
+                SELECT p.id, b.name AS brand, t.name AS type, t.category, variant, target_skin_type
+                FROM Products p JOIN Brands b ON b.id = brand_id JOIN ProductTypes t ON t.id = product_type_id
+            ''')}
+            concerns = conn.execute('SELECT concern FROM ProductConcerns WHERE product_id = ?', (parsed,)).fetchall()
+        self.assertEqual(tuple(rows[stored])[1:], ('CeraVe', 'Cleanser', 'Face Care', 'Foaming', 'oily'))
+        self.assertEqual(tuple(rows[parsed])[1:], ('Olay', 'Moisturizer', 'Face Care', 'Gel', None))
+        self.assertEqual([row[0] for row in concerns], ['redness'])
+
+    def test_add_product_returns_product_id(self):
+        first = database.add_product('First', 100, 'Face Care', 'Id test')
+        second = database.add_product('Second', 100, 'Face Care', 'Id test', brand='NewBrandZZ',
+                                      product_type='Serum', variant='Niacinamide')
+        self.assertEqual(second, first + 1)
+        self.assertEqual(database.get_product_by_id(second)['name'], 'Second')
+
+    def test_add_product_parses_missing_attributes(self):
+        product_id = database.add_product('Balancing Toner by COSRX', 300, 'Face Care',
+                                          populate_db.generate_product_description('Toner', 'Acne', 'for Oily Skin'))
+        product = database.get_product_by_id(product_id)
+        self.assertEqual(product['target_skin_type'], 'oily')
+        products = database.get_recommended_products(skin_type='oily', issues='acne', limit=1)
+        self.assertEqual([p['id'] for p in products], [product_id])
+
+    def test_recommendations_match_attributes(self):
+        matching = {
+            database.add_product('Oily Match', 300, 'Face Care', 'Match', brand='COSRX', product_type='Toner',
+                                 variant='Balancing', benefit='for Oily Skin'),
+            database.add_product('Any Skin Match', 300, 'Face Care', 'Match', brand='COSRX', product_type='Serum',
+                                 variant='Niacinamide', benefit='for All Skin Types'),
+            database.add_product('Acne Match', 300, 'Face Care', 'Match', vegan=1, brand='COSRX', product_type='Treatment',
+                                 variant='Acne', benefit='for Dull Skin'),
+        }
+        # Mentions oily skin in its text, but is made for dry skin
+        database.add_product('Not for oily skin', 300, 'Face Care', 'Not for oily skin', brand='Olay',
+                             product_type='Moisturizer', variant='Rich', benefit='for Dry Skin')
+
+        products = database.get_recommended_products(skin_type='Oily', issues='acne', limit=3)
+        self.assertEqual({p['id'] for p in products}, matching)
+        products = database.get_recommended_products(skin_type='oily', issues='acne', limit=1, vegan=True)
+        self.assertEqual([p['name'] for p in products], ['Acne Match'])
+        # Too few matches are topped up with other products
+        self.assertEqual(len(database.get_recommended_products(skin_type='oily', issues='acne', limit=4)), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Tests for the in-memory catalog bitmap index
+Run: python test_bitmap_index.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bitmap_index
+import database
+import query_cache
+from bitmap_index import BitmapIndex, iter_ids, sample_ids
+
+
+class TestBitmaps(unittest.TestCase):
+    """Verify bitset construction, id extraction and sampling"""
+
+    def setUp(self):
+        # (id, category, vegan, cruelty_free, price_band, stars)
+        self.index = BitmapIndex([
+            (1, 'Face Care', 1, 1, 0, 4),
+            (2, 'Face Care', 0, 1, 1, None),
+            (70, 'Hair Care', 1, 0, 2, 3),
+            (200, 'Hair Care', 1, 1, 4, 5),
+        ])
+
+    def test_match_combines_filters(self):
+        self.assertEqual(list(iter_ids(self.index.match())), [1, 2, 70, 200])
+        self.assertEqual(list(iter_ids(self.index.match(vegan=True, cruelty_free=True))), [1, 200])
+        self.assertEqual(list(iter_ids(self.index.match('Hair Care', vegan=True))), [70, 200])
+        self.assertEqual(self.index.match('Lip Care'), 0)
+        self.assertEqual(list(iter_ids(self.index.any_of('stars', (4, 5)))), [1, 200])
+
+    def test_sampling_is_distinct_and_within_set(self):
+        bits = self.index.match(vegan=True)
+        rng = random.Random(7)
+        for k in (1, 2, 3, 10):
+            ids = sample_ids(bits, k, rng)
+            self.assertEqual(len(ids), min(k, 3))
+            self.assertEqual(len(set(ids)), len(ids))
+            self.assertTrue(set(ids) <= {1, 70, 200})
+
+    def test_dense_sampling(self):
+        bits = (1 << 10000) - 2  # ids 1..9999
+        ids = sample_ids(bits, 50, random.Random(3))
+        self.assertEqual(len(set(ids)), 50)
+        self.assertTrue(all(1 <= i < 10000 for i in ids))
+
+
+class TestCatalogBitmapIndex(unittest.TestCase):
+    """Verify the shared index follows catalog changes and matches SQL"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        database.close_read_connections()
+        database.CATALOG_DATABASE = os.path.join(self.directory.name, 'catalog.db')
+        query_cache.clear_all()
+        query_cache.invalidate()
+        bitmap_index.clear()
+        database.init_db()
+        for i in range(20):
+            product_id = database.add_product(f'Bitmap {i}', 150 * (i + 1), ('Face Care', 'Hair Care')[i % 2],
+                                              'Bitmap test', vegan=i % 3 == 0, cruelty_free=i % 4 == 0)
+            database.add_review(product_id, 'Test', 'Review', 1 + i % 5)
+
+    def tearDown(self):
+        database.close_read_connections()
+        database.CATALOG_DATABASE = None
+        query_cache.clear_all()
+        query_cache.invalidate()
+        bitmap_index.clear()
+        self.directory.cleanup()
+
+    def test_rebuilt_after_catalog_change(self):
+        before = database.get_vegan_cf_stats()
+        self.assertEqual(before, {'vegan': 7, 'cruelty_free': 5, 'both': 2})
+        database.add_product('Bitmap new', 100, 'Face Care', 'Added later', vegan=1, cruelty_free=1)
+        self.assertEqual(database.get_vegan_cf_stats()['both'], 3)
+
+    def test_samples_respect_flags(self):
+        products = database.get_vegan_cf_products(limit=6)
+        self.assertEqual(len(products), 2)
+        self.assertTrue(all(p['vegan'] and p['cruelty_free'] for p in products))
+
+    def test_bitmap_facets_match_sql_facets(self):
+        for filters in ((None, None, None), ('Face Care', None, None), (None, True, True)):
+            from_bitmaps = database.get_search_facets.cache.func('', *filters)
+            where, params = database._product_filters('Bitmap', *filters)
+            with database.catalog_reader() as conn:
+                from_sql = database.facets.fold(conn.execute(database.facets.facet_query(where), params).fetchall())
+            self.assertEqual(from_bitmaps, from_sql)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Tests for the local and shared (SQLite) cache backends
+Run: python test_cache_backends.py
+"""
+
+import os
+import pickle
+import sys
+import sqlite3
+import tempfile
+import unittest
+import multiprocessing
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import query_cache
+from cache_backends import MISS, LocalLRUBackend, SQLiteCacheBackend
+from database import get_product_by_id
+
+DATABASE_NAME = 'skinintel.db'
+
+
+class Exploit:
+    """Pickle payload that records whether it was ever unpickled"""
+    ran = False
+
+    def __reduce__(self):
+        return (Exploit._run, ())
+
+    @staticmethod
+    def _run():
+        Exploit.ran = True
+
+
+def _store_in_child(path):
+    SQLiteCacheBackend(path).set('shared', 'answer', {'value': 42}, ttl=60, maxsize=10)
+
+
+class BackendContract:
+    """Behaviour both backends must share"""
+
+    def test_set_get_and_miss(self):
+        self.backend.set('ns', 'a', [1, 2], ttl=60, maxsize=10)
+        self.assertEqual(self.backend.get('ns', 'a'), [1, 2])
+        self.assertIs(self.backend.get('ns', 'b'), MISS)
+        self.assertIs(self.backend.get('other', 'a'), MISS)
+
+    def test_ttl(self):
+        self.backend.set('ns', 'a', 1, ttl=-1, maxsize=10)
+        self.assertIs(self.backend.get('ns', 'a'), MISS)
+
+    def test_clear_is_per_namespace(self):
+        self.backend.set('ns', 'a', 1, ttl=60, maxsize=10)
+        self.backend.set('other', 'a', 2, ttl=60, maxsize=10)
+        self.backend.clear('ns')
+        self.assertIs(self.backend.get('ns', 'a'), MISS)
+        self.assertEqual(self.backend.get('other', 'a'), 2)
+        self.backend.set('ns', 'a', 3, ttl=60, maxsize=10)
+        self.assertEqual(self.backend.get('ns', 'a'), 3)
+
+    def test_maxsize(self):
+        evicted = sum(self.backend.set('ns', str(i), i, ttl=60, maxsize=3) for i in range(5))
+        self.assertEqual(evicted, 2)
+        self.assertEqual(self.backend.size('ns'), 3)
+        self.assertEqual(self.backend.get('ns', '4'), 4)
+
+
+class TestLocalLRUBackend(BackendContract, unittest.TestCase):
+
+    def setUp(self):
+        self.backend = LocalLRUBackend()
+
+
+class TestSQLiteCacheBackend(BackendContract, unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.backend = SQLiteCacheBackend(self.path)
+
+    def tearDown(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def test_shared_across_processes(self):
+        child = multiprocessing.get_context('fork').Process(target=_store_in_child, args=(self.path,))
+        child.start()
+        child.join()
+        self.assertEqual(self.backend.get('shared', 'answer'), {'value': 42})
+
+    def test_rows_stored_as_dicts(self):
+        conn = sqlite3.connect(DATABASE_NAME)
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute('SELECT id, name FROM Products LIMIT 2').fetchall()
+        conn.close()
+        self.backend.set('ns', 'rows', rows, ttl=60, maxsize=10)
+        cached = self.backend.get('ns', 'rows')
+        self.assertEqual([r['id'] for r in cached], [r['id'] for r in rows])
+
+    def test_values_round_trip_as_json(self):
+        value = {'rows': [{'id': 1, 'price': 9.5}], 'pair': (1, ('a', None)), 'count': 3}
+        self.backend.set('ns', 'v', value, ttl=60, maxsize=10)
+        self.assertEqual(self.backend.get('ns', 'v'), value)
+        self.assertIsInstance(self.backend.get('ns', 'v')['pair'], tuple)
+        # Non-string keys would come back as strings: such values are not cached
+        self.backend.set('ns', 'keys', {5: 'five'}, ttl=60, maxsize=10)
+        self.assertIs(self.backend.get('ns', 'keys'), MISS)
+
+    def test_pickled_values_are_never_loaded(self):
+        self.backend.set('ns', 'a', 1, ttl=60, maxsize=10)
+        conn = sqlite3.connect(self.path)
+        conn.execute("UPDATE cache_entries SET value = ? WHERE key = 'a'", (pickle.dumps(Exploit()),))
+        conn.commit()
+        conn.close()
+        self.assertIs(self.backend.get('ns', 'a'), MISS)
+        self.assertFalse(Exploit.ran)
+
+    def test_query_cache_on_shared_backend(self):
+        previous = query_cache.get_backend()
+        query_cache.set_backend(self.backend)
+        try:
+            product_id = sqlite3.connect(DATABASE_NAME).execute('SELECT MIN(id) FROM Products').fetchone()[0]
+            first = get_product_by_id(product_id)
+            hits = get_product_by_id.cache.hits
+            self.assertEqual(get_product_by_id(product_id)['name'], first['name'])
+            self.assertEqual(get_product_by_id.cache.hits, hits + 1)
+        finally:
+            query_cache.set_backend(previous)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
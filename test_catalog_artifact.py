@@ -0,0 +1,101 @@
+"""
+Tests for the prebuilt read-only catalog artifact
+Run: python test_catalog_artifact.py
+"""
+
+import os
+import sys
+import sqlite3
+import stat
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import build_catalog
+import database
+import query_cache
+
+
+class TestCatalogArtifact(unittest.TestCase):
+    """Verify artifacts are built, served immutably and swapped atomically"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.directory.name, 'source.db')
+        self.output = os.path.join(self.directory.name, 'catalog')
+        database.close_read_connections()
+        database.CATALOG_DATABASE = self.source
+        database.init_db()
+        self.product_id = database.add_product('Artifact Serum', 899, 'Face Care', 'Built offline', vegan=1)
+        database.add_review(self.product_id, 'Test', 'Lovely', 5)
+        database.CATALOG_DATABASE = None
+        query_cache.clear_all()
+
+    def tearDown(self):
+        database.close_read_connections()
+        database.CATALOG_DATABASE = database.CATALOG_ARTIFACT_DIR = None
+        database._artifact.update(pointer=None, manifest=None, path=None, checked_at=0.0)
+        query_cache.clear_all()
+        query_cache.invalidate()
+        self.directory.cleanup()
+
+    def use_artifacts(self):
+        database.CATALOG_ARTIFACT_DIR = self.output
+        database._artifact['checked_at'] = 0.0
+        query_cache.invalidate()
+
+    def test_build_writes_compact_catalog_only_file(self):
+        manifest = build_catalog.build_catalog(self.output, source=self.source)
+        path = os.path.join(self.output, manifest['file'])
+        self.assertEqual((manifest['products'], manifest['reviews']), (1, 1))
+        self.assertEqual(build_catalog.verify(self.output), [])
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o444)
+
+        conn = sqlite3.connect(path)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        journal = conn.execute('PRAGMA journal_mode').fetchone()[0]
+        conn.close()
+        self.assertNotIn('Users', tables)
+        self.assertIn('sqlite_stat1', tables)
+        self.assertEqual(journal, 'delete')
+
+    def test_reads_come_from_active_artifact(self):
+        build_catalog.build_catalog(self.output, source=self.source)
+        self.use_artifacts()
+        self.assertEqual(database.get_product_by_id(self.product_id)['name'], 'Artifact Serum')
+        with database.catalog_reader() as conn:
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO Products (name) VALUES ('nope')")
+        with self.assertRaises(RuntimeError):
+            database.add_product('Live Write', 1, 'Face Care', '')
+
+    def test_new_build_is_picked_up(self):
+        build_catalog.build_catalog(self.output, source=self.source)
+        self.use_artifacts()
+        self.assertEqual(database.get_product_count(), 1)
+
+        database.CATALOG_ARTIFACT_DIR, database.CATALOG_DATABASE = None, self.source
+        database.add_product('Second Serum', 999, 'Face Care', 'Next build')
+        database.CATALOG_DATABASE = None
+        manifest = build_catalog.build_catalog(self.output, source=self.source)
+        self.use_artifacts()
+        self.assertEqual(database.get_catalog_artifact()['file'], manifest['file'])
+        self.assertEqual(database.get_product_count(), 2)
+
+    def test_verify_and_prune(self):
+        for _ in range(3):
+            manifest = build_catalog.build_catalog(self.output, source=self.source, keep=1)
+        artifacts = [name for name in os.listdir(self.output) if name.endswith('.db')]
+        self.assertEqual(artifacts, [manifest['file']])
+
+        path = os.path.join(self.output, manifest['file'])
+        os.chmod(path, 0o644)
+        with open(path, 'ab') as f:
+            f.write(b'\0')
+        self.assertIn('size does not match the manifest', build_catalog.verify(self.output))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Tests for the chatbot's per-profile recommendation cache
+Run: python test_chatbot_cache.py
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bitmap_index
+import database
+import query_cache
+from app import app
+
+
+class TestChatbotCache(unittest.TestCase):
+    """Verify repeated product requests reuse one roll unless refreshed"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        database.close_read_connections()
+        database.CATALOG_DATABASE = os.path.join(self.directory.name, 'catalog.db')
+        query_cache.clear_all()
+        query_cache.invalidate()
+        bitmap_index.clear()
+        database.init_db()
+        for i in range(40):
+            database.add_product(f'Chatbot {i}', 500, 'Face Care', 'Chatbot test', brand='COSRX', product_type='Serum',
+                                 variant='Niacinamide', benefit='for Oily Skin')
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+
+    def tearDown(self):
+        database.close_read_connections()
+        database.CATALOG_DATABASE = None
+        query_cache.clear_all()
+        query_cache.invalidate()
+        bitmap_index.clear()
+        self.directory.cleanup()
+
+    def ask(self, **payload):
+        payload = {'skin_type': 'oily', 'issues': 'acne', 'query_type': 'products', **payload}
+        return [p['id'] for p in self.client.post('/api/chatbot', json=payload).get_json()['products']]
+
+    def test_repeat_reuses_picks_and_records_history(self):
+        before = database.get_user_stats(1)['total_chatbot_queries']
+        hits = database._cached_recommendations.cache.stats()['hits']
+        first = self.ask()
+        self.assertEqual(len(first), 6)
+        # Same profile once normalized
+        self.assertEqual(self.ask(skin_type=' Oily', issues='Acne'), first)
+        self.assertEqual(database.get_user_stats(1)['total_chatbot_queries'], before + 2)
+        self.assertEqual(database._cached_recommendations.cache.stats()['hits'], hits + 1)
+        self.assertNotEqual(self.ask(vegan=True), first)
+
+    def test_refresh_rerolls(self):
+        first = self.ask()
+        rolls = [self.ask(refresh=True) for _ in range(3)]
+        self.assertTrue(any(roll != first for roll in rolls))
+        self.assertEqual(self.ask(), rolls[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
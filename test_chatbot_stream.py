@@ -0,0 +1,97 @@
+"""
+Tests for the streamed (Server-Sent Events) chatbot reply
+Run: python test_chatbot_stream.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bitmap_index
+import database
+import query_cache
+from app import app
+
+
+def parse_events(body):
+    """[(name, value)] from an event-stream body"""
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+class TestChatbotStream(unittest.TestCase):
+    """Verify event order, payloads and the history write after the stream"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        database.close_read_connections()
+        database.CATALOG_DATABASE = os.path.join(self.directory.name, 'catalog.db')
+        query_cache.clear_all()
+        query_cache.invalidate()
+        bitmap_index.clear()
+        database.init_db()
+        for i in range(10):
+            database.add_product(f'Stream {i}', 500, 'Face Care', 'Stream test', brand='COSRX', product_type='Serum',
+                                 variant='Niacinamide', benefit='for Oily Skin')
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+
+    def tearDown(self):
+        database.close_read_connections()
+        database.CATALOG_DATABASE = None
+        query_cache.clear_all()
+        query_cache.invalidate()
+        bitmap_index.clear()
+        self.directory.cleanup()
+
+    def test_products_stream(self):
+        payload = {'skin_type': 'oily', 'issues': 'acne', 'query_type': 'products', 'vegan': False}
+        response = self.client.post('/api/chatbot/stream', json=payload)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        events = parse_events(response.get_data(as_text=True))
+        self.assertEqual([name for name, _ in events], ['message', 'products', 'done'])
+        self.assertEqual(len(events[1][1]), 6)
+        # Same products as the JSON route for the same profile; only the JSON message knows the count
+        reply = self.client.post('/api/chatbot', json=payload).get_json()
+        self.assertEqual(reply['products'], events[1][1])
+        self.assertEqual(events[0][1], 'Based on your profile, here are your recommended products!')
+        self.assertEqual(reply['message'], 'Based on your profile, here are 6 recommended products for you!')
+
+    def test_routine_stream(self):
+        response = self.client.post('/api/chatbot/stream', json={'skin_type': 'dry', 'query_type': 'skincare_routine'})
+        events = parse_events(response.get_data(as_text=True))
+        self.assertEqual([name for name, _ in events], ['message', 'routine', 'done'])
+        self.assertIn('morning', events[1][1])
+
+    def test_history_written_after_last_event(self):
+        before = database.get_user_stats(1)['total_chatbot_queries']
+        response = self.client.post('/api/chatbot/stream', json={'skin_type': 'oily', 'query_type': 'products'},
+                                    buffered=False)
+        chunks = iter(response.response)
+        next(chunks)
+        self.assertEqual(database.get_user_stats(1)['total_chatbot_queries'], before)
+        list(chunks)
+        response.close()
+        self.assertEqual(database.get_user_stats(1)['total_chatbot_queries'], before + 1)
+
+    def test_history_written_when_client_disconnects(self):
+        before = database.get_user_stats(1)['total_chatbot_queries']
+        response = self.client.post('/api/chatbot/stream', json={'skin_type': 'oily', 'query_type': 'products'},
+                                    buffered=False)
+        next(iter(response.response))
+        response.close()
+        self.assertEqual(database.get_user_stats(1)['total_chatbot_queries'], before + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Tests for the split catalog / sharded user database layout
+Run: python test_db_routing.py
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import database
+import personalization
+import query_cache
+
+
+class TestDatabaseRouting(unittest.TestCase):
+    """Verify each table is read and written in its home file"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.catalog = os.path.join(self.directory.name, 'catalog.db')
+        self.shards = [os.path.join(self.directory.name, f'users-{i}.db') for i in range(2)]
+        database.close_read_connections()
+        database.CATALOG_DATABASE, database.USER_DATABASES = self.catalog, self.shards
+        query_cache.clear_all()
+        query_cache.invalidate()
+        personalization.clear_cache()
+        database.init_db()
+
+    def tearDown(self):
+        database.close_read_connections()
+        database.CATALOG_DATABASE, database.USER_DATABASES = None, []
+        query_cache.clear_all()
+        query_cache.invalidate()
+        personalization.clear_cache()
+        self.directory.cleanup()
+
+    def count(self, path, table):
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_catalog_lives_in_catalog_file(self):
+        product_id = database.add_product('Routing Serum', 499, 'Face Care', 'Test serum', vegan=1)
+        database.add_review(product_id, 'Test', 'Routed review', 5)
+        self.assertEqual(self.count(self.catalog, 'Products'), 1)
+        self.assertEqual(self.count(self.shards[0], 'Products'), 0)
+        self.assertEqual(database.get_product_by_id(product_id)['name'], 'Routing Serum')
+        self.assertEqual(len(database.get_reviews_for_product(product_id)), 1)
+
+    def test_catalog_reads_are_read_only(self):
+        with database.catalog_reader() as conn:
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO Products (name) VALUES ('nope')")
+
+    def test_history_sharded_by_user(self):
+        first = database.create_user('shardone', 'shardone@test.com', 'testpass123')
+        second = database.create_user('shardtwo', 'shardtwo@test.com', 'testpass123')
+        self.assertEqual(self.count(self.shards[0], 'Users'), 2)
+        self.assertEqual(self.count(self.shards[1], 'Users'), 0)
+
+        database.save_search_history(first, 'serum')
+        database.save_search_history(second, 'toner')
+        database.save_search_history(second, 'toner')
+        self.assertEqual(self.count(database.user_database(first), 'SearchHistory'), 1)
+        self.assertEqual(self.count(database.user_database(second), 'SearchHistory'), 2)
+        self.assertNotEqual(database.user_database(first), database.user_database(second))
+        self.assertEqual(database.get_user_stats(second)['total_searches'], 2)
+        self.assertEqual([h['search_term'] for h in database.get_user_search_history(first)], ['serum'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
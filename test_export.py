@@ -0,0 +1,68 @@
+"""
+Tests for the streaming NDJSON product export
+Run: python test_export.py
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import unittest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from database import iter_products
+
+DATABASE_NAME = 'skinintel.db'
+
+
+class TestProductExport(unittest.TestCase):
+    """Verify the export streams every matching product exactly once"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+
+    def test_iter_products_small_batches(self):
+        conn = sqlite3.connect(DATABASE_NAME)
+        expected = conn.execute("SELECT COUNT(*) FROM Products WHERE vegan = 1 AND category = 'Hair Care'").fetchone()[0]
+        conn.close()
+        ids = [p['id'] for p in iter_products('', 'Hair Care', vegan=True, batch_size=7)]
+        self.assertEqual(len(ids), expected)
+        self.assertEqual(ids, sorted(set(ids)))
+
+    def test_export_ndjson_with_review_aggregates(self):
+        response = self.client.get('/api/export-products?q=serum&cruelty_free=1&include_reviews=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.data.decode('utf-8').splitlines()
+        self.assertGreater(len(lines), 12, "Export should not be paged")
+        for line in lines:
+            product = json.loads(line)
+            self.assertEqual(product['cruelty_free'], 1)
+            self.assertIn('review_count', product)
+            self.assertIn('avg_rating', product)
+
+    def test_review_columns_match_reviews(self):
+        conn = sqlite3.connect(DATABASE_NAME)
+        expected = dict(conn.execute('''
+            SELECT product_id, COUNT(*) FROM Reviews
+            WHERE product_id IN (SELECT id FROM Products WHERE category = 'Hair Care')
+            GROUP BY product_id
+        ''').fetchall())
+        conn.close()
+        products = list(iter_products('', 'Hair Care', include_reviews=True))
+        self.assertEqual({p['id']: p['review_count'] for p in products if p['review_count']}, expected)
+        self.assertNotIn('review_count', next(iter_products('', 'Hair Care')))
+
+    def test_export_requires_login(self):
+        response = app.test_client().get('/api/export-products')
+        self.assertEqual(response.status_code, 302)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
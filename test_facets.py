@@ -0,0 +1,79 @@
+"""
+Tests for faceted search counts
+Run: python test_facets.py
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import database
+import facets
+import query_cache
+from app import app
+
+
+class TestSearchFacets(unittest.TestCase):
+    """Verify facet counts against a small known catalog"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        database.close_read_connections()
+        database.CATALOG_DATABASE = os.path.join(self.directory.name, 'catalog.db')
+        query_cache.clear_all()
+        query_cache.invalidate()
+        database.init_db()
+        self.serum = database.add_product('Facet Serum', 450, 'Face Care', 'Hydrating serum', vegan=1, cruelty_free=1)
+        self.cream = database.add_product('Facet Cream', 1500, 'Face Care', 'Rich cream', cruelty_free=1)
+        self.shampoo = database.add_product('Facet Shampoo', 4200, 'Hair Care', 'Gentle shampoo', vegan=1)
+        for rating in (5, 4):
+            database.add_review(self.serum, 'Test', 'Good', rating)
+        database.add_review(self.cream, 'Test', 'Okay', 3)
+
+    def tearDown(self):
+        database.close_read_connections()
+        database.CATALOG_DATABASE = None
+        query_cache.clear_all()
+        query_cache.invalidate()
+        self.directory.cleanup()
+
+    def test_review_triggers_keep_rating_summary(self):
+        serum = database.get_product_by_id(self.serum)
+        self.assertEqual((serum['review_count'], serum['avg_rating']), (2, 4.5))
+        self.assertEqual(database.get_product_by_id(self.shampoo)['review_count'], 0)
+
+    def test_counts_cover_every_facet(self):
+        counts = database.get_search_facets('Facet')
+        self.assertEqual(counts['total'], 3)
+        self.assertEqual(counts['category'], {'Face Care': 2, 'Hair Care': 1})
+        self.assertEqual((counts['vegan'], counts['cruelty_free']), (2, 2))
+        self.assertEqual([band['count'] for band in counts['price']], [1, 0, 1, 0, 1])
+        self.assertEqual({r['min']: r['count'] for r in counts['rating']}, {4: 1, 3: 2, 2: 2, 1: 2})
+
+    def test_counts_follow_filters(self):
+        counts = database.get_search_facets('Facet', 'Face Care', vegan=True)
+        self.assertEqual(counts['total'], 1)
+        self.assertEqual(counts['category'], {'Face Care': 1})
+
+    def test_fold_handles_unpriced_and_unrated(self):
+        counts = facets.fold([('Face Care', 0, 0, None, None, 4)])
+        self.assertEqual(counts['total'], 4)
+        self.assertEqual(sum(band['count'] for band in counts['price']), 0)
+        self.assertEqual(counts['rating'][-1]['count'], 0)
+
+    def test_api_returns_facets(self):
+        app.config['TESTING'] = True
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = 1
+        data = client.get('/api/search-products?q=Facet&vegan=1').get_json()
+        self.assertEqual(data['facets']['total'], 2)
+        self.assertEqual(data['facets']['vegan'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Tests for typo-tolerant search
+Run: python test_fuzzy.py
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import database
+import fuzzy
+import query_cache
+from app import app
+from fuzzy import FuzzyIndex, edit_distance
+
+
+class TestFuzzyIndex(unittest.TestCase):
+    """Verify correction, synonym expansion and the per-term cache"""
+
+    def setUp(self):
+        self.index = FuzzyIndex([
+            ('The Ordinary Serum - Niacinamide', 3),
+            ('CeraVe Hydrating Shampoo', 2),
+            ('COSRX Sunscreen SPF 50', 1),
+            ('Ouai Anti-Dandruff Shampoo', 1),
+        ])
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance('shampo', 'shampoo', 2), 1)
+        self.assertEqual(edit_distance('sreum', 'serum', 2), 1)  # transposition
+        self.assertEqual(edit_distance('serum', 'shampoo', 2), 3)
+
+    def test_corrects_unknown_words_only(self):
+        self.assertEqual(self.index.expand('niacinimide'), ('niacinamide',))
+        self.assertEqual(self.index.expand('Niacinimide Serum'), ('niacinamide Serum',))
+        self.assertEqual(self.index.expand('shampo'), ('shampoo',))
+        self.assertEqual(self.index.expand('xyz'), ('xyz',))
+        self.assertEqual(self.index.expand('qwertyuiop'), ('qwertyuiop',))
+
+    def test_synonyms(self):
+        self.assertEqual(self.index.expand('spf'), ('spf', 'sunscreen', 'sunblock', 'sun cream'))
+        self.assertEqual(self.index.expand('dandruf shampoo'), ('dandruff shampoo', 'anti-dandruff shampoo'))
+        # "anti-dandruff" is not a separate "dandruff"
+        self.assertEqual(self.index.expand('anti-dandruff'), ('anti-dandruff', 'dandruff'))
+
+    def test_cache_skips_terms_over_budget(self):
+        self.index.expand('shampo')
+        self.assertIn('shampo', self.index.cache)
+        corrected, complete = self.index.correct('shampo', budget_ms=-1)
+        self.assertEqual((corrected, complete), ('shampo', False))
+
+
+class TestFuzzySearch(unittest.TestCase):
+    """Verify the search API corrects terms against the catalog vocabulary"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        database.close_read_connections()
+        database.CATALOG_DATABASE = os.path.join(self.directory.name, 'catalog.db')
+        query_cache.clear_all()
+        query_cache.invalidate()
+        fuzzy.clear()
+        database.init_db()
+        database.add_product('Fuzzy Niacinamide Serum', 900, 'Face Care', 'Fuzzy test')
+        database.add_product('Fuzzy Mineral Sunscreen', 700, 'Face Care', 'Fuzzy test')
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+
+    def tearDown(self):
+        database.close_read_connections()
+        database.CATALOG_DATABASE = None
+        query_cache.clear_all()
+        query_cache.invalidate()
+        fuzzy.clear()
+        self.directory.cleanup()
+
+    def search(self, query):
+        return self.client.get(f'/api/search-products?{query}').get_json()
+
+    def test_typo_and_synonym_search(self):
+        data = self.search('q=niacinimide')
+        self.assertEqual([p['name'] for p in data['products']], ['Fuzzy Niacinamide Serum'])
+        self.assertEqual(data['corrected'], 'niacinamide')
+        self.assertEqual(data['facets']['total'], 1)
+        self.assertEqual([p['name'] for p in self.search('q=spf')['products']], ['Fuzzy Mineral Sunscreen'])
+        self.assertIsNone(self.search('q=Serum')['corrected'])
+
+    def test_fuzzy_off(self):
+        data = self.search('q=niacinimide&fuzzy=0')
+        self.assertEqual((data['products'], data['corrected']), ([], None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Tests for ETags, conditional GET and compression on the product/search APIs
+Run: python test_http_caching.py
+"""
+
+import os
+import sys
+import gzip
+import json
+import sqlite3
+import unittest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from database import add_review, create_user, get_user_by_email
+
+DATABASE_NAME = 'skinintel.db'
+
+
+class TestConditionalGet(unittest.TestCase):
+    """Verify weak ETags, 304s and catalog-version invalidation"""
+
+    @classmethod
+    def setUpClass(cls):
+        app.config['TESTING'] = True
+        try:
+            create_user('cacherunner', 'cacherunner@test.com', 'testpass123')
+        except Exception:
+            pass  # User might already exist
+        cls.user_id = get_user_by_email('cacherunner@test.com')['id']
+        cls.product_id = sqlite3.connect(DATABASE_NAME).execute('SELECT MIN(id) FROM Products').fetchone()[0]
+
+    def setUp(self):
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = self.user_id
+
+    def test_product_etag_and_304(self):
+        response = self.client.get(f'/api/product/{self.product_id}')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        self.assertIn('max-age', response.headers['Cache-Control'])
+
+        response = self.client.get(f'/api/product/{self.product_id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+    def test_new_review_changes_etag(self):
+        etag = self.client.get(f'/api/product/{self.product_id}').headers['ETag']
+        review_id = add_review(self.product_id, 'Test', 'Cache test review', 5)
+        try:
+            response = self.client.get(f'/api/product/{self.product_id}', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.headers['ETag'], etag)
+        finally:
+            conn = sqlite3.connect(DATABASE_NAME)
+            conn.execute('DELETE FROM Reviews WHERE id = ?', (review_id,))
+            conn.commit()
+            conn.close()
+
+    def test_search_304_depends_on_args(self):
+        etag = self.client.get('/api/search-products?q=serum').headers['ETag']
+        self.assertEqual(self.client.get('/api/search-products?q=serum', headers={'If-None-Match': etag}).status_code, 304)
+        self.assertEqual(self.client.get('/api/search-products?q=toner', headers={'If-None-Match': etag}).status_code, 200)
+
+
+class TestCompression(unittest.TestCase):
+    """Verify large JSON bodies are compressed and small ones are not"""
+
+    @classmethod
+    def setUpClass(cls):
+        app.config['TESTING'] = True
+        try:
+            create_user('cacherunner', 'cacherunner@test.com', 'testpass123')
+        except Exception:
+            pass  # User might already exist
+
+    def setUp(self):
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = get_user_by_email('cacherunner@test.com')['id']
+
+    def test_large_json_is_gzipped(self):
+        response = self.client.get('/api/search-products?q=', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers.get('Content-Encoding'), 'gzip')
+        data = json.loads(gzip.decompress(response.data))
+        self.assertEqual(data['count'], len(data['products']))
+
+    def test_small_json_is_not_compressed(self):
+        response = self.client.get('/api/user-stats', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn('total_searches', response.get_json())
+
+    def test_no_accept_encoding(self):
+        response = self.client.get('/api/search-products?q=')
+        self.assertNotIn('Content-Encoding', response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,95 @@
+"""
+Tests for preference profiles and personalized ranking
+Run: python test_personalization.py
+"""
+
+import os
+import sys
+import time
+import unittest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import personalization
+from personalization import apply_signal, chatbot_signal, compact, new_state, search_signal
+from database import (
+    create_user, get_user_by_email, get_user_profile, save_chatbot_query, save_search_history,
+    search_products, get_recommended_products
+)
+
+DAY = 86400
+
+
+class TestProfileMath(unittest.TestCase):
+    """Verify signals, decay and the compact profile"""
+
+    def test_chatbot_signal_parses_query(self):
+        signal = chatbot_signal('Skin: oily, Hair: curly, Issues: acne, Goal: glow, Type: haircare_routine, '
+                                'Preferences: Vegan, Cruelty-Free')
+        self.assertEqual(set(signal.terms), {'oily', 'curly', 'acne', 'glow'})
+        self.assertEqual(signal.category, 'Hair Care')
+        self.assertTrue(signal.vegan and signal.cruelty_free)
+
+    def test_recent_interest_outranks_decayed_one(self):
+        state = new_state(0)
+        for _ in range(3):
+            apply_signal(state, search_signal('retinol'), now=0)
+        apply_signal(state, search_signal('sunscreen'), now=60 * DAY)
+        self.assertEqual(list(compact(state).terms), ['sunscreen', 'retinol'])
+
+    def test_repeating_a_search_keeps_the_signature(self):
+        state = apply_signal(new_state(0), search_signal('serum', 'Face Care', vegan=True), now=0)
+        signature = compact(state).signature
+        apply_signal(state, search_signal('serum', 'Face Care', vegan=True), now=10)
+        self.assertEqual(compact(state).signature, signature)
+        self.assertEqual(compact(state).categories, {'Face Care': 1.0})
+        self.assertEqual(compact(state).vegan, 1.0)
+
+
+class TestPersonalizedRanking(unittest.TestCase):
+    """Verify profiles are updated on write and used to re-rank"""
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            create_user('personaltest', 'personaltest@test.com', 'testpass123')
+        except Exception:
+            pass  # User might already exist
+        cls.user_id = get_user_by_email('personaltest@test.com')['id']
+
+    def setUp(self):
+        personalization.clear_cache()
+
+    def test_history_writes_update_profile(self):
+        save_search_history(self.user_id, 'shampoo', 'Hair Care', vegan=True)
+        save_chatbot_query(self.user_id, 'Skin: , Hair: dry, Issues: frizz, Goal: shine, Type: products', 'Recommended 6 products')
+        profile = get_user_profile(self.user_id)
+        self.assertIn('shampoo', profile.terms)
+        self.assertIn('frizz', profile.terms)
+
+    def test_search_reranks_within_window(self):
+        for _ in range(5):
+            save_search_history(self.user_id, 'shampoo', 'Hair Care')
+        plain = search_products('', limit=12)
+        personal = search_products('', limit=12, user_id=self.user_id)
+        self.assertEqual(len(personal), 12)
+        self.assertGreaterEqual(sum(p['category'] == 'Hair Care' for p in personal),
+                                sum(p['category'] == 'Hair Care' for p in plain))
+
+    def test_recommendations_respect_filters(self):
+        products = get_recommended_products(vegan=True, limit=5, user_id=self.user_id)
+        self.assertEqual(len(products), 5)
+        self.assertTrue(all(p['vegan'] for p in products))
+
+    def test_cached_profile_overhead(self):
+        get_user_profile(self.user_id)
+        candidates = search_products('', limit=personalization.RERANK_WINDOW)
+        start = time.perf_counter()
+        for _ in range(100):
+            personalization.rerank(candidates, get_user_profile(self.user_id))
+        self.assertLess((time.perf_counter() - start) / 100, 0.001)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
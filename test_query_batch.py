@@ -0,0 +1,81 @@
+"""
+Tests for concurrent independent reads (run_query_batch)
+Run: python test_query_batch.py
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import database
+
+
+def _slow(value, delay):
+    time.sleep(delay)
+    return value
+
+
+def _fail():
+    raise ValueError('query failed')
+
+
+def _batch_in_child(results):
+    # The parent's worker threads do not exist here, so the inherited executor must not be reused
+    inherited = database._batch_executor
+    with mock.patch.object(database, 'QUERY_BATCH_WORKERS', 4):
+        values = database.run_query_batch((_slow, ('child', 0)), database.get_product_count)
+    results.put((values, database._batch_executor is not inherited))
+
+
+class TestQueryBatch(unittest.TestCase):
+    """Verify order, errors and fork safety on both the threaded and the sequential path"""
+
+    def setUp(self):
+        self.workers = mock.patch.object(database, 'QUERY_BATCH_WORKERS', 4)
+        self.workers.start()
+
+    def tearDown(self):
+        self.workers.stop()
+
+    def test_results_in_call_order(self):
+        # The first call finishes last
+        calls = [(_slow, ('a', 0.05)), (_slow, ('b', 0)), (_slow, ('c', 0.02), {})]
+        self.assertEqual(database.run_query_batch(*calls), ['a', 'b', 'c'])
+        with mock.patch.object(database, 'QUERY_BATCH_WORKERS', 1):
+            self.assertEqual(database.run_query_batch(*calls), ['a', 'b', 'c'])
+
+    def test_matches_sequential_reads(self):
+        batched = database.run_query_batch(database.get_product_count, database.get_all_categories,
+                                           (database.get_product_by_id, (1,)))
+        self.assertEqual(batched, [database.get_product_count(), database.get_all_categories(),
+                                   database.get_product_by_id(1)])
+
+    def test_exception_propagates(self):
+        with self.assertRaisesRegex(ValueError, 'query failed'):
+            database.run_query_batch((_slow, (1, 0)), _fail)
+        with mock.patch.object(database, 'QUERY_BATCH_WORKERS', 1), self.assertRaises(ValueError):
+            database.run_query_batch(_fail)
+        # The shared executor keeps working afterwards
+        self.assertEqual(database.run_query_batch((_slow, (2, 0))), [2])
+
+    def test_executor_replaced_after_fork(self):
+        database.run_query_batch((_slow, (0, 0)))
+        self.assertIsNotNone(database._batch_executor)
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        child = context.Process(target=_batch_in_child, args=(results,))
+        child.start()
+        values, replaced = results.get(timeout=10)
+        child.join()
+        self.assertEqual(values, ['child', database.get_product_count()])
+        self.assertTrue(replaced)
+
+
+if __name__ == '__main__':
+    unittest.main()
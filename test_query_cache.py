@@ -0,0 +1,109 @@
+"""
+Tests for the memoized query cache
+Run: python test_query_cache.py
+"""
+
+import os
+import sys
+import sqlite3
+import threading
+import time
+import unittest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import query_cache
+from app import app
+from database import add_review, get_reviews_for_product, get_product_by_id
+
+DATABASE_NAME = 'skinintel.db'
+
+
+class TestMemoize(unittest.TestCase):
+    """Verify LRU, TTL and single-flight behaviour on a plain function"""
+
+    def test_maxsize_evicts_least_recently_used(self):
+        @query_cache.memoize(maxsize=2)
+        def square(n):
+            return n * n
+
+        square(1), square(2), square(1), square(3)
+        stats = square.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions'], stats['size']), (1, 3, 1, 2))
+        square(1), square(2)
+        self.assertEqual(square.cache.stats()['hits'], 2)
+
+    def test_ttl_expires(self):
+        @query_cache.memoize(ttl=0)
+        def value():
+            return object()
+
+        self.assertIsNot(value(), value())
+
+    def test_single_flight(self):
+        calls = []
+
+        @query_cache.memoize()
+        def slow(n):
+            calls.append(n)
+            time.sleep(0.05)
+            return n
+
+        threads = [threading.Thread(target=slow, args=(7,)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(calls, [7])
+        self.assertEqual(slow.cache.stats()['coalesced'], 4)
+
+    def test_refresh_replaces_cached_result(self):
+        @query_cache.memoize()
+        def roll(n):
+            return object()
+
+        first = roll(1)
+        self.assertIs(roll(1), first)
+        second = roll.cache.refresh(1)
+        self.assertIsNot(second, first)
+        self.assertIs(roll(1), second)
+
+
+class TestCatalogInvalidation(unittest.TestCase):
+    """Verify cached catalog reads are dropped when their tables change"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.product_id = sqlite3.connect(DATABASE_NAME).execute('SELECT MIN(id) FROM Products').fetchone()[0]
+
+    def test_cached_product_read(self):
+        first = get_product_by_id(self.product_id)
+        hits = get_product_by_id.cache.hits
+        self.assertEqual(get_product_by_id(self.product_id)['id'], first['id'])
+        self.assertEqual(get_product_by_id.cache.hits, hits + 1)
+
+    def test_add_review_invalidates(self):
+        before = len(get_reviews_for_product(self.product_id, limit=1000))
+        review_id = add_review(self.product_id, 'Test', 'Query cache test review', 4)
+        try:
+            self.assertEqual(len(get_reviews_for_product(self.product_id, limit=1000)), before + 1)
+        finally:
+            conn = sqlite3.connect(DATABASE_NAME)
+            conn.execute('DELETE FROM Reviews WHERE id = ?', (review_id,))
+            conn.commit()
+            conn.close()
+            query_cache.invalidate()
+
+    def test_cache_stats_api(self):
+        app.config['TESTING'] = True
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = 1
+        stats = client.get('/api/cache-stats').get_json()['functions']
+        self.assertIn('get_product_by_id', stats)
+        self.assertIn('hit_rate', stats['get_reviews_for_product'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
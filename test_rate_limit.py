@@ -0,0 +1,157 @@
+"""
+Tests for API rate limiting and load shedding
+Run: python test_rate_limit.py
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import rate_limit
+from app import app
+from rate_limit import AdmissionStore, Limit
+
+
+def _take_in_child(path):
+    AdmissionStore(path).take('shared', rate=0.001, burst=2)
+
+
+class TestAdmissionStore(unittest.TestCase):
+    """Verify token buckets and concurrency leases in the shared file"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'ratelimit.db')
+        self.store = AdmissionStore(self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_bucket_allows_burst_then_refills(self):
+        self.assertEqual([self.store.take('k', rate=0.5, burst=3) for _ in range(3)], [0, 0, 0])
+        wait = self.store.take('k', rate=0.5, burst=3)
+        self.assertGreater(wait, 1.5)
+        self.assertLessEqual(wait, 2)
+        # Buckets are independent
+        self.assertEqual(self.store.take('other', rate=0.5, burst=3), 0)
+        with mock.patch('rate_limit.time.time', return_value=rate_limit.time.time() + 2):
+            self.assertEqual(self.store.take('k', rate=0.5, burst=3), 0)
+
+    def test_shared_across_processes(self):
+        child = multiprocessing.get_context('fork').Process(target=_take_in_child, args=(self.path,))
+        child.start()
+        child.join()
+        self.assertEqual(self.store.take('shared', rate=0.001, burst=2), 0)
+        self.assertGreater(self.store.take('shared', rate=0.001, burst=2), 0)
+
+    def test_leases(self):
+        leases = [self.store.acquire('search', 2) for _ in range(3)]
+        self.assertIsNone(leases[2])
+        self.assertEqual(self.store.in_flight('search'), 2)
+        self.store.release(leases[0])
+        self.assertIsNotNone(self.store.acquire('search', 2))
+        # Abandoned leases stop counting once they expire
+        with mock.patch('rate_limit.time.time', return_value=rate_limit.time.time() + rate_limit.LEASE_SECONDS + 1):
+            self.assertIsNotNone(self.store.acquire('search', 2))
+
+
+class TestRateLimitedRoutes(unittest.TestCase):
+    """Verify 429 and 503 answers, slot release and the stats API"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        rate_limit.set_store(AdmissionStore(os.path.join(self.directory.name, 'ratelimit.db')))
+        rate_limit.reset_counters()
+        self.limits = mock.patch.dict(rate_limit.LIMITS, {
+            'search': Limit(rate=0.01, burst=3, ip_rate=0.01, ip_burst=100, concurrency=2),
+            'chatbot': Limit(rate=0.01, burst=100, ip_rate=0.01, ip_burst=2, concurrency=1),
+        })
+        self.limits.start()
+        app.config['TESTING'] = True
+        app.config['RATE_LIMIT_ENABLED'] = True
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+
+    def tearDown(self):
+        app.config.pop('RATE_LIMIT_ENABLED')
+        self.limits.stop()
+        rate_limit.set_store(None)
+        rate_limit.reset_counters()
+        self.directory.cleanup()
+
+    def search(self):
+        return self.client.get('/api/search-products?q=serum')
+
+    def bucket_keys(self):
+        return {row[0] for row in rate_limit.get_store()._connection().execute('SELECT key FROM buckets')}
+
+    def test_user_bucket_returns_429(self):
+        self.assertEqual([self.search().status_code for _ in range(3)], [200, 200, 200])
+        response = self.search()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response.headers['Retry-After']), 1)
+        # Every admitted request gave its slot back
+        self.assertEqual(rate_limit.get_store().in_flight('search'), 0)
+
+    def test_ip_bucket_covers_users(self):
+        payload = {'skin_type': 'oily', 'query_type': 'skincare_routine'}
+        self.assertEqual(self.client.post('/api/chatbot', json=payload).status_code, 200)
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 2
+        self.assertEqual(self.client.post('/api/chatbot', json=payload).status_code, 200)
+        self.assertEqual(self.client.post('/api/chatbot', json=payload).status_code, 429)
+
+    def test_forwarded_addresses_behind_proxy(self):
+        wsgi_app = app.wsgi_app
+        rate_limit.init_app(app, proxy_hops=1)
+        try:
+            payload = {'skin_type': 'oily', 'query_type': 'skincare_routine'}
+
+            def ask(user_id, address):
+                with self.client.session_transaction() as sess:
+                    sess['user_id'] = user_id
+                return self.client.post('/api/chatbot', json=payload, headers={'X-Forwarded-For': address},
+                                        environ_base={'REMOTE_ADDR': '10.0.0.1'}).status_code
+
+            # Every request comes from the proxy, but each client address has its own bucket
+            self.assertEqual([ask(user_id, '203.0.113.7') for user_id in (1, 2, 3)], [200, 200, 429])
+            self.assertEqual(ask(4, '198.51.100.9'), 200)
+            self.assertIn('chatbot:ip:198.51.100.9', self.bucket_keys())
+        finally:
+            app.wsgi_app = wsgi_app
+
+    def test_sheds_when_slots_are_taken(self):
+        leases = [rate_limit.get_store().acquire('search', 2) for _ in range(2)]
+        response = self.search()
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+        rate_limit.finish(leases[0])
+        self.assertEqual(self.search().status_code, 200)
+
+    def test_stream_holds_slot_until_closed(self):
+        response = self.client.post('/api/chatbot/stream', json={'query_type': 'skincare_routine'}, buffered=False)
+        self.assertEqual(rate_limit.get_store().in_flight('chatbot'), 1)
+        self.assertEqual(self.client.post('/api/chatbot', json={'query_type': 'skincare_routine'}).status_code, 503)
+        response.get_data()
+        response.close()
+        self.assertEqual(rate_limit.get_store().in_flight('chatbot'), 0)
+
+    def test_stats_api(self):
+        for _ in range(4):
+            self.search()
+        stats = self.client.get('/api/rate-limit-stats').get_json()
+        self.assertTrue(stats['enabled'])
+        search = stats['endpoints']['search']
+        self.assertEqual((search['admitted'], search['limited_user'], search['shed']), (3, 1, 0))
+        self.assertEqual(search['limits']['burst'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Tests for history retention, rollups and lifetime totals
+Run: python test_retention.py
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import database
+import retention
+
+
+class TestHistoryRetention(unittest.TestCase):
+    """Verify caps and age limits fold rows into rollups without touching totals"""
+
+    def setUp(self):
+        self.original_database = database.DATABASE_NAME
+        fd, database.DATABASE_NAME = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        database.init_db()
+        self.conn = database.get_db_connection()
+        self.conn.executemany(
+            "INSERT INTO SearchHistory (user_id, search_term, timestamp) VALUES (?, ?, datetime('now', ?))",
+            [(1, f'old {i}', '-400 days') for i in range(5)] + [(1, f'new {i}', '-1 days') for i in range(20)]
+            + [(2, 'other', '-1 days')]
+        )
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        database.close_read_connections()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(database.DATABASE_NAME + suffix):
+                os.remove(database.DATABASE_NAME + suffix)
+        database.DATABASE_NAME = self.original_database
+
+    def count(self, sql, *params):
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def test_expire_old_rows(self):
+        deleted = retention.expire_old_rows(self.conn, 'SearchHistory', 'search', max_age_days=365, batch_size=2)
+        self.assertEqual(deleted, 5)
+        self.assertEqual(self.count("SELECT COUNT(*) FROM SearchHistory WHERE search_term LIKE 'old%'"), 0)
+        self.assertEqual(self.count("SELECT SUM(count) FROM HistoryRollups WHERE user_id = 1 AND kind = 'search'"), 5)
+
+    def test_row_caps_keep_newest(self):
+        deleted = retention.enforce_row_caps(self.conn, 'SearchHistory', 'search', max_rows=10, batch_size=4)
+        self.assertEqual(deleted, 15)
+        self.assertEqual(self.count('SELECT COUNT(*) FROM SearchHistory WHERE user_id = 1'), 10)
+        self.assertEqual(self.count("SELECT MIN(search_term) FROM SearchHistory WHERE user_id = 1"), 'new 10')
+        self.assertEqual(self.count('SELECT COUNT(*) FROM SearchHistory WHERE user_id = 2'), 1)
+
+    def test_totals_survive_retention(self):
+        retention.run_retention(max_rows=10, max_age_days=365)
+        stats = database.get_user_stats(1)
+        self.assertEqual((stats['total_chatbot_queries'], stats['total_searches']), (0, 25))
+        self.assertEqual(self.count('PRAGMA auto_vacuum'), 2)
+
+    def test_search_terms_capped(self):
+        self.conn.executemany('INSERT INTO UserSearchTermCounts (user_id, term, count) VALUES (?, ?, ?)',
+                              [(1, f'term {i}', i) for i in range(1, 11)] + [(2, 'other', 1), (2, 'more', 1)])
+        self.conn.commit()
+        top_terms = database.get_user_stats(1)['top_search_terms'][:3]
+        summary = retention.run_retention(max_terms=3)
+        self.assertEqual(summary['pruned_search_terms'], 7)
+        self.assertEqual(self.count('SELECT COUNT(*) FROM UserSearchTermCounts WHERE user_id = 1'), 3)
+        self.assertEqual(self.count('SELECT COUNT(*) FROM UserSearchTermCounts WHERE user_id = 2'), 2)
+        self.assertEqual(database.get_user_stats(1)['top_search_terms'], top_terms)
+
+
+# Mimics gunicorn: the master starts the job, then a worker is forked and leaves through sys.exit
+WORKER_EXIT_SCRIPT = """
+import os, sys, time
+import retention
+
+pid = retention.start_retention_process(3600)
+worker = os.fork()
+if worker == 0:
+    sys.exit(0)
+os.waitpid(worker, 0)
+time.sleep(0.2)
+alive = os.waitpid(pid, os.WNOHANG) == (0, 0)
+retention.stop_retention_process(pid)
+print('alive' if alive else 'dead')
+"""
+
+
+class TestRetentionProcess(unittest.TestCase):
+    """Verify the background job outlives the workers forked after it"""
+
+    def test_survives_worker_exit(self):
+        result = subprocess.run([sys.executable, '-c', WORKER_EXIT_SCRIPT], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=60)
+        self.assertEqual(result.stdout.strip(), 'alive', result.stderr)
+
+    def test_disabled_with_zero_interval(self):
+        self.assertIsNone(retention.start_retention_process(0))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
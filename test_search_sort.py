@@ -0,0 +1,81 @@
+"""
+Tests for price-range filters and search sort modes
+Run: python test_search_sort.py
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import database
+import query_cache
+from app import app
+
+
+class TestSearchSort(unittest.TestCase):
+    """Verify each sort mode's order and the price range filter"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        database.close_read_connections()
+        database.CATALOG_DATABASE = os.path.join(self.directory.name, 'catalog.db')
+        query_cache.clear_all()
+        query_cache.invalidate()
+        database.init_db()
+        self.ids = {}
+        for name, price, ratings in (('Sort Cleanser', 300, (3,)), ('Sort Serum', 1200, (5, 5)),
+                                     ('Sort Cream', 800, (5,)), ('Sort Mask', 2500, ())):
+            self.ids[name] = database.add_product(name, price, 'Face Care', 'Sorting test')
+            for rating in ratings:
+                database.add_review(self.ids[name], 'Test', 'Review', rating)
+
+    def tearDown(self):
+        database.close_read_connections()
+        database.CATALOG_DATABASE = None
+        database.PRICE_RANGE_SORT_LIMIT = 2000
+        query_cache.clear_all()
+        query_cache.invalidate()
+        self.directory.cleanup()
+
+    def names(self, **kwargs):
+        return [p['name'] for p in database.search_products('Sort', **kwargs)]
+
+    def test_sort_modes(self):
+        self.assertEqual(self.names(), ['Sort Cleanser', 'Sort Serum', 'Sort Cream', 'Sort Mask'])
+        self.assertEqual(self.names(sort='price_asc'), ['Sort Cleanser', 'Sort Cream', 'Sort Serum', 'Sort Mask'])
+        self.assertEqual(self.names(sort='price_desc'), ['Sort Mask', 'Sort Serum', 'Sort Cream', 'Sort Cleanser'])
+        # Equal averages: more reviews first; unrated products last
+        self.assertEqual(self.names(sort='rating'), ['Sort Serum', 'Sort Cream', 'Sort Cleanser', 'Sort Mask'])
+        self.assertEqual(self.names(sort='newest'), ['Sort Mask', 'Sort Cream', 'Sort Serum', 'Sort Cleanser'])
+        with self.assertRaises(ValueError):
+            self.names(sort='cheapest')
+
+    def test_price_range(self):
+        self.assertEqual(self.names(min_price=500, max_price=1200, sort='price_asc'), ['Sort Cream', 'Sort Serum'])
+        self.assertEqual(self.names(min_price=1000), ['Sort Serum', 'Sort Mask'])
+        self.assertEqual(self.names(max_price=299), [])
+
+    def test_wide_range_gives_same_results(self):
+        # Wide ranges are filtered along the sort index instead of read through the price index
+        narrow = self.names(min_price=500, sort='rating')
+        database.PRICE_RANGE_SORT_LIMIT = 0
+        query_cache.clear_all()
+        self.assertEqual(self.names(min_price=500, sort='rating'), narrow)
+
+    def test_api_parses_sort_and_price(self):
+        app.config['TESTING'] = True
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = 1
+        data = client.get('/api/search-products?q=Sort&sort=price_desc&min_price=500&max_price=abc').get_json()
+        self.assertEqual([p['name'] for p in data['products']], ['Sort Mask', 'Sort Serum', 'Sort Cream'])
+        self.assertEqual(data['facets']['total'], 3)
+        self.assertEqual(client.get('/api/search-products?q=Sort&sort=bogus').get_json()['sort'], 'relevance')
+
+
+if __name__ == '__main__':
+    unittest.main()
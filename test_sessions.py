@@ -0,0 +1,113 @@
+"""
+Tests for the server-side session store
+Run: python test_sessions.py
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sessions
+from app import app
+from database import create_user
+from sessions import ServerSessionInterface, SessionStore
+
+
+class TestSessionFormat(unittest.TestCase):
+    """Verify the stored binary format"""
+
+    def test_round_trip(self):
+        data = {'user_id': 7, 'username': 'ana', '_flashes': [('success', 'Welcome back!')], 'ratio': 0.5}
+        self.assertEqual(sessions.decode(sessions.encode(data)), data)
+
+    def test_unknown_or_corrupt_values_are_empty(self):
+        self.assertEqual(sessions.decode(b'\x02' + sessions.encode({'a': 1})[1:]), {})
+        self.assertEqual(sessions.decode(b'\x01garbage'), {})
+        self.assertEqual(sessions.decode(b''), {})
+
+
+class TestServerSessions(unittest.TestCase):
+    """Verify the cookie carries only a signed id and the data lives in the store"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SessionStore(os.path.join(self.directory.name, 'sessions.db'))
+        self.previous = app.session_interface
+        app.session_interface = ServerSessionInterface(self.store)
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.name = app.config['SESSION_COOKIE_NAME']
+
+    def tearDown(self):
+        app.session_interface = self.previous
+        self.directory.cleanup()
+
+    def login(self, **data):
+        with self.client.session_transaction() as sess:
+            sess.update({'user_id': 1, 'username': 'tester', **data})
+        return self.client.get_cookie(self.name).value
+
+    def test_cookie_is_signed_id_only(self):
+        cookie = self.login(profile={'terms': ['serum'] * 200})
+        self.assertLess(len(cookie), 80)
+        self.assertNotIn('tester', cookie)
+        self.assertEqual(self.store.count(), 1)
+        self.assertEqual(self.client.get('/api/user-stats').status_code, 200)
+
+    def test_unmodified_request_does_not_write(self):
+        self.login()
+        with mock.patch.object(self.store, 'set') as store_set, mock.patch.object(self.store, 'touch') as touch:
+            response = self.client.get('/api/user-stats')
+        self.assertEqual(response.status_code, 200)
+        store_set.assert_not_called()
+        touch.assert_not_called()
+        self.assertNotIn('Set-Cookie', response.headers)
+
+    def test_forged_and_expired_sessions(self):
+        cookie = self.login()
+        sid = cookie.rsplit('.', 1)[0]
+        self.client.set_cookie(self.name, sid + '.forged')
+        self.assertEqual(self.client.get('/api/user-stats').status_code, 302)
+        self.client.set_cookie(self.name, cookie)
+        self.assertEqual(self.client.get('/api/user-stats').status_code, 200)
+        with mock.patch('sessions.time.time', return_value=sessions.time.time() + 10 ** 8):
+            self.assertEqual(self.client.get('/api/user-stats').status_code, 302)
+            # The login session and the one holding the forged request's flash message
+            self.assertEqual(self.store.sweep(), 2)
+
+    def test_login_rotates_session_id(self):
+        try:
+            create_user('sessionrunner', 'sessionrunner@test.com', 'testpass123')
+        except Exception:
+            pass  # User might already exist
+        # A session id planted before login (here holding a flash message)
+        self.client.get('/api/user-stats')
+        planted = self.client.get_cookie(self.name).value
+        self.client.post('/login', data={'email': 'sessionrunner@test.com', 'password': 'testpass123'})
+        self.assertNotEqual(self.client.get_cookie(self.name).value, planted)
+        self.assertEqual(self.client.get('/api/user-stats').status_code, 200)
+        self.client.set_cookie(self.name, planted)
+        self.assertEqual(self.client.get('/api/user-stats').status_code, 302)
+
+    def test_logout_deletes_session(self):
+        cookie = self.login()
+        self.client.get('/logout')
+        # Only the logout flash message remains, under a new id
+        self.assertNotEqual(self.client.get_cookie(self.name).value, cookie)
+        self.assertEqual(self.store.count(), 1)
+        self.client.set_cookie(self.name, cookie)
+        self.assertEqual(self.client.get('/api/user-stats').status_code, 302)
+
+    def test_asgi_reads_same_session(self):
+        cookie = self.login()
+        self.assertEqual(sessions.read_session(app, f'{self.name}={cookie}')['user_id'], 1)
+        self.assertEqual(sessions.read_session(app, ''), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
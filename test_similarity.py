@@ -0,0 +1,76 @@
+"""
+Tests for the precomputed product similarity index
+Run: python test_similarity.py
+"""
+
+import os
+import sys
+import sqlite3
+import unittest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from app import app
+from similarity import SIMILAR_TOP_K, build_feature_matrix, build_similarity_index
+
+DATABASE_NAME = 'skinintel.db'
+
+
+class TestSimilarityIndex(unittest.TestCase):
+    """Verify the feature matrix, the stored neighbours and the API"""
+
+    @classmethod
+    def setUpClass(cls):
+        app.config['TESTING'] = True
+        build_similarity_index(processes=1)
+        cls.product_id = sqlite3.connect(DATABASE_NAME).execute('SELECT MIN(id) FROM Products').fetchone()[0]
+
+    def setUp(self):
+        self.client = app.test_client()
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = 1
+
+    def test_feature_rows_are_normalised(self):
+        products = [
+            {'name': 'Hydrating Serum', 'description': 'Hyaluronic acid serum', 'category': 'Skincare',
+             'price': 499, 'vegan': 1, 'cruelty_free': 1},
+            {'name': 'Hydrating Toner', 'description': 'Hyaluronic acid toner', 'category': 'Skincare',
+             'price': 450, 'vegan': 1, 'cruelty_free': 0},
+            {'name': 'Matte Lipstick', 'description': 'Long wear colour', 'category': 'Makeup',
+             'price': 1200, 'vegan': 0, 'cruelty_free': 0},
+        ]
+        features = build_feature_matrix(products)
+        np.testing.assert_allclose(np.linalg.norm(features, axis=1), 1.0, rtol=1e-5)
+        scores = features @ features.T
+        self.assertGreater(scores[0, 1], scores[0, 2])
+
+    def test_every_product_has_top_k_neighbours(self):
+        conn = sqlite3.connect(DATABASE_NAME)
+        products = conn.execute('SELECT COUNT(*) FROM Products').fetchone()[0]
+        rows = conn.execute('SELECT COUNT(*) FROM ProductSimilarity').fetchone()[0]
+        self_matches = conn.execute('SELECT COUNT(*) FROM ProductSimilarity WHERE product_id = similar_id').fetchone()[0]
+        conn.close()
+        self.assertEqual(rows, products * min(SIMILAR_TOP_K, products - 1))
+        self.assertEqual(self_matches, 0)
+
+    def test_similar_api_is_ordered(self):
+        response = self.client.get(f'/api/product/{self.product_id}/similar?limit=4')
+        self.assertEqual(response.status_code, 200)
+        products = response.get_json()['products']
+        self.assertEqual(len(products), 4)
+        scores = [p['similarity'] for p in products]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertNotIn(self.product_id, [p['id'] for p in products])
+
+    def test_similar_api_limit_is_clamped(self):
+        count = lambda query: self.client.get(f'/api/product/{self.product_id}/similar?{query}').get_json()['count']
+        self.assertEqual(count('limit=abc'), 6)
+        self.assertEqual(count('limit=-3'), 1)
+        self.assertEqual(count('limit=50'), 10)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,47 @@
+"""
+Tests for startup warm-up (startup.boot)
+Run: python test_startup.py
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bitmap_index
+import database
+import fuzzy
+import startup
+from app import app
+
+
+class TestBoot(unittest.TestCase):
+    """Verify boot() leaves templates compiled and search indexes built"""
+
+    def test_boot_warms_templates_and_indexes(self):
+        env = app.jinja_env
+        env.cache.clear()
+        bitmap_index.clear()
+        fuzzy.clear()
+
+        with mock.patch.dict(startup.STARTUP_TIMINGS, clear=True):
+            startup.boot(app)
+            phases = list(startup.get_startup_timings()['phases_ms'])
+        self.assertEqual(phases, ['init_db', 'warm_templates', 'bitmap_index', 'fuzzy_index'])
+
+        cached = {key[1] for key in env.cache.keys()}
+        self.assertEqual(cached, set(env.list_templates(extensions=['html'])))
+        self.assertIn('base.html', cached)
+
+        # The first request reuses what boot() built instead of building its own
+        self.assertIsNotNone(bitmap_index._current[1])
+        self.assertIsNotNone(fuzzy._current[1])
+        self.assertIs(database.get_bitmap_index(), bitmap_index._current[1])
+        self.assertIs(database.get_fuzzy_index(), fuzzy._current[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
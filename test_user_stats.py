@@ -0,0 +1,74 @@
+"""
+Tests for the maintained user statistics counters
+Run: python test_user_stats.py
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import database
+import user_stats
+from app import app
+
+
+class TestUserStats(unittest.TestCase):
+    """Verify counters are kept on write, match a backfill and back the API"""
+
+    def setUp(self):
+        self.original_database = database.DATABASE_NAME
+        fd, database.DATABASE_NAME = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        database.init_db()
+        self.user_id = database.create_user('statsuser', 'statsuser@test.com', 'testpass123')
+        for term in ('Serum', ' serum ', 'toner'):
+            database.save_search_history(self.user_id, term)
+        for _ in range(110):
+            database.save_chatbot_query(self.user_id, 'Skin: oily, Hair: , Issues: , Goal: , Type: products', 'Recommended 6 products')
+        database.save_chatbot_query(self.user_id, 'Skin: oily, Hair: , Issues: , Goal: , Type: skincare_routine',
+                                    'Generated skincare routine', 'skincare_routine')
+
+    def tearDown(self):
+        database.close_read_connections()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(database.DATABASE_NAME + suffix):
+                os.remove(database.DATABASE_NAME + suffix)
+        database.DATABASE_NAME = self.original_database
+
+    def test_counters_updated_on_write(self):
+        stats = database.get_user_stats(self.user_id)
+        self.assertEqual(stats['total_chatbot_queries'], 111)
+        self.assertEqual(stats['total_searches'], 3)
+        self.assertEqual(stats['chatbot_queries_by_type'], {'products': 110, 'skincare_routine': 1})
+        self.assertEqual(stats['top_search_terms'][0], {'term': 'serum', 'count': 2})
+        self.assertLessEqual(stats['first_activity'], stats['last_activity'])
+
+    def test_unknown_query_types_count_as_products(self):
+        for query_type in ('made_up_1', 'made_up_2', None):
+            database.save_chatbot_query(self.user_id, 'Skin: oily', 'Recommended 6 products', query_type)
+        stats = database.get_user_stats(self.user_id)
+        self.assertEqual(stats['chatbot_queries_by_type'], {'products': 113, 'skincare_routine': 1})
+
+    def test_backfill_matches_live_counters(self):
+        live = database.get_user_stats(self.user_id)
+        conn = database.get_db_connection()
+        user_stats.backfill(conn)
+        conn.close()
+        self.assertEqual(database.get_user_stats(self.user_id), live)
+
+    def test_api_user_stats(self):
+        app.config['TESTING'] = True
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = self.user_id
+        data = client.get('/api/user-stats').get_json()
+        self.assertEqual(data['total_chatbot_queries'], 111)
+        self.assertEqual(len(data['top_search_terms']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
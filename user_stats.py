@@ -0,0 +1,151 @@
+"""
+SkinIntell User Statistics
+Per-user activity counters maintained on every history write
+
+Backfill existing data: python user_stats.py
+
+HistoryTotals (lifetime totals plus first/last activity) is kept by triggers
+on the history tables. This module keeps the breakdowns the triggers can't see:
+chatbot queries by type and search counts per normalised term. Record functions
+run inside the caller's write transaction; get_user_stats() answers from the
+counters with primary-key reads, however much history a user has. The
+retention pass (retention.py) trims each user's search terms to their most
+frequent ones.
+"""
+
+import re
+import time
+
+TOP_SEARCH_TERMS = 5
+MAX_TERM_LENGTH = 100
+DEFAULT_QUERY_TYPE = 'products'
+QUERY_TYPES = ('products', 'skincare_routine', 'haircare_routine')  # anything else is answered with products
+
+_QUERY_TYPE_RE = re.compile(r'Type: (\w+)')
+
+# ============== NORMALISATION ==============
+
+def normalise_term(search_term):
+    """Collapse case and whitespace so equivalent searches share a counter"""
+    return ' '.join((search_term or '').lower().split())[:MAX_TERM_LENGTH]
+
+def normalise_query_type(query_type):
+    """One of QUERY_TYPES, so clients can't create counters for arbitrary types"""
+    return query_type if query_type in QUERY_TYPES else DEFAULT_QUERY_TYPE
+
+def parse_query_type(query):
+    """Query type from a chatbot query string as built by build_chatbot_response()"""
+    match = _QUERY_TYPE_RE.search(query or '')
+    return match.group(1) if match else DEFAULT_QUERY_TYPE
+
+# ============== COUNTERS ==============
+
+def record_chatbot_query(conn, user_id, query_type):
+    """Count one chatbot query by type"""
+    conn.execute('''
+        INSERT INTO UserQueryTypeCounts (user_id, query_type, count) VALUES (?, ?, 1)
+        ON CONFLICT(user_id, query_type) DO UPDATE SET count = count + 1
+    ''', (user_id, normalise_query_type(query_type)))
+
+def record_search(conn, user_id, search_term):
+    """Count one search by normalised term"""
+    term = normalise_term(search_term)
+    if not term:
+        return
+    conn.execute('''
+        INSERT INTO UserSearchTermCounts (user_id, term, count) VALUES (?, ?, 1)
+        ON CONFLICT(user_id, term) DO UPDATE SET count = count + 1
+    ''', (user_id, term))
+
+def get_user_stats(conn, user_id):
+    """Read a user's counters: totals, first/last activity, queries by type and top search terms"""
+    totals = conn.execute(
+        'SELECT chatbot_queries, searches, first_activity, last_activity FROM HistoryTotals WHERE user_id = ?',
+        (user_id,)
+    ).fetchone()
+    by_type = conn.execute(
+        'SELECT query_type, count FROM UserQueryTypeCounts WHERE user_id = ?', (user_id,)
+    ).fetchall()
+    top_terms = conn.execute('''
+        SELECT term, count FROM UserSearchTermCounts WHERE user_id = ?
+        ORDER BY count DESC, term LIMIT ?
+    ''', (user_id, TOP_SEARCH_TERMS)).fetchall()
+
+    return {
+        'total_chatbot_queries': totals[0] if totals else 0,
+        'total_searches': totals[1] if totals else 0,
+        'first_activity': totals[2] if totals else None,
+        'last_activity': totals[3] if totals else None,
+        'chatbot_queries_by_type': {row[0]: row[1] for row in by_type},
+        'top_search_terms': [{'term': row[0], 'count': row[1]} for row in top_terms]
+    }
+
+def prune_search_terms(conn, max_terms):
+    """Keep only each user's max_terms most searched terms, committing per user; returns rows deleted.
+
+    Rows are dropped in the reverse of get_user_stats()'s order, so the top terms
+    are unaffected; a pruned term that is searched again starts from 1.
+    """
+    over_cap = conn.execute('''
+        SELECT user_id FROM UserSearchTermCounts GROUP BY user_id HAVING COUNT(*) > ?
+    ''', (max_terms,)).fetchall()
+
+    deleted = 0
+    for (user_id,) in over_cap:
+        deleted += conn.execute('''
+            DELETE FROM UserSearchTermCounts WHERE user_id = ? AND term NOT IN (
+                SELECT term FROM UserSearchTermCounts WHERE user_id = ? ORDER BY count DESC, term LIMIT ?
+            )
+        ''', (user_id, user_id, max_terms)).rowcount
+        conn.commit()
+    return deleted
+
+# ============== BACKFILL ==============
+
+def backfill(conn):
+    """Rebuild every counter from the history tables (and retention rollups); returns users counted.
+
+    Totals and first activity include rows already folded into HistoryRollups;
+    the per-type and per-term breakdowns can only count rows still present.
+    """
+    conn.execute('DELETE FROM HistoryTotals')
+    conn.execute('DELETE FROM UserQueryTypeCounts')
+    conn.execute('DELETE FROM UserSearchTermCounts')
+
+    conn.execute('''
+        INSERT INTO HistoryTotals (user_id, chatbot_queries, searches, first_activity, last_activity)
+        SELECT user_id, SUM(CASE WHEN kind = 'chatbot' THEN n ELSE 0 END),
+               SUM(CASE WHEN kind = 'search' THEN n ELSE 0 END), MIN(first_at), MAX(last_at)
+        FROM (
+            SELECT user_id, 'chatbot' AS kind, COUNT(*) AS n, MIN(timestamp) AS first_at, MAX(timestamp) AS last_at
+            FROM ChatbotHistory WHERE user_id IS NOT NULL GROUP BY user_id
+            UNION ALL
+            SELECT user_id, 'search', COUNT(*), MIN(timestamp), MAX(timestamp)
+            FROM SearchHistory WHERE user_id IS NOT NULL GROUP BY user_id
+            UNION ALL
+            SELECT user_id, kind, SUM(count), MIN(day), MAX(day)
+            FROM HistoryRollups WHERE user_id != 0 GROUP BY user_id, kind
+        )
+        GROUP BY user_id
+    ''')
+
+    for user_id, query in conn.execute('SELECT user_id, query FROM ChatbotHistory WHERE user_id IS NOT NULL'):
+        record_chatbot_query(conn, user_id, parse_query_type(query))
+    for user_id, search_term in conn.execute('SELECT user_id, search_term FROM SearchHistory WHERE user_id IS NOT NULL'):
+        record_search(conn, user_id, search_term)
+
+    conn.commit()
+    return conn.execute('SELECT COUNT(*) FROM HistoryTotals').fetchone()[0]
+
+
+if __name__ == '__main__':
+    import database
+
+    start = time.perf_counter()
+    database.init_db()
+    count = 0
+    for path in database.user_databases():
+        conn = database.get_db_connection(path)
+        count += backfill(conn)
+        conn.close()
+    print(f"[SUCCESS] Statistics backfilled for {count} users in {time.perf_counter() - start:.2f}s")